@@ -1,3 +1,32 @@
 # SPDX-FileCopyrightText: 2024-present Frisco Rose <friscorose@gmail.com>
 #
 # SPDX-License-Identifier: MIT
+"""Unicode glyph faces for terminals: a headless layout engine and Textual widgets.
+
+Importing the package loads nothing else. The names below are imported
+from their modules on first use, so engine users never load Textual.
+"""
+
+_LAZY = {
+    "GlyphEngine": "engine",
+    "measure": "engine",
+    "render_lines": "engine",
+    "render_rows": "engine",
+    "get_compiled": "faces",
+    "get_face": "faces",
+    "preload": "faces",
+    "EnGlyph": "glyphs",
+    "CodePointBrowser": "browser",
+    "Transmoglyphier": "transmoglyphier",
+    }
+
+__all__ = sorted( _LAZY )
+
+def __getattr__( name: str ):
+    module = _LAZY.get( name )
+    if module is None:
+        raise AttributeError( f"module {__name__!r} has no attribute {name!r}" )
+    from importlib import import_module
+    value = getattr( import_module( "." + module, __name__ ), name )
+    globals()[ name ] = value
+    return value
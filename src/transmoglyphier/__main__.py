@@ -0,0 +1,8 @@
+# SPDX-FileCopyrightText: 2024-present Frisco Rose <friscorose@gmail.com>
+#
+# SPDX-License-Identifier: MIT
+import sys
+
+from .cli import main
+
+sys.exit( main() )
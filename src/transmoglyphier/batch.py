@@ -0,0 +1,76 @@
+"""Batch glyph rendering of large text corpora across a process pool.
+
+Input is cut into chunks of strings that are laid out by worker processes,
+each of which compiles its face once. Results come back in input order as
+soon as the next chunk is done, and only a bounded number of chunks are in
+flight, so memory stays flat however long the input is.
+"""
+
+from __future__ import annotations
+
+import os
+
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
+
+from rich.segment import Segment
+
+from .engine import GlyphEngine
+
+_engine: GlyphEngine | None = None
+
+def _init_worker( Face: str, Family: str, bold: bool ) -> None:
+    global _engine
+    _engine = GlyphEngine( Face, Family, bold )
+
+def _render_chunk( texts: list[str], styled: bool ) -> list:
+    engine = _engine
+    if engine is None:
+        raise RuntimeError( "no glyph engine, _init_worker has not run in this process" )
+    if styled:
+        return [ engine.lines( text ) for text in texts ]
+    return [ engine.rows( text ) for text in texts ]
+
+def _chunked( texts: Iterable[str], size: int ) -> Iterator[list[str]]:
+    texts = iter( texts )
+    while chunk := list( islice( texts, size ) ):
+        yield chunk
+
+def render_batch(
+        texts: Iterable[str],
+        Face: str = "basic_latin",
+        Family: str = "block/sans",
+        bold: bool = False,
+        workers: int | None = None,
+        chunk_size: int = 256,
+        max_pending: int | None = None,
+        styled: bool = False
+        ) -> Iterator[list[str] | list[list[Segment]]]:
+    """Lay out every markup string of texts, yielding results in input order.
+
+    Each result is a list of row strings, or with styled a list of segment
+    rows. workers defaults to the CPU count, 1 renders in this process.
+    At most max_pending chunks (default twice the workers) are queued or
+    held back waiting for an earlier chunk, which bounds memory use."""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        _init_worker( Face, Family, bold )
+        for chunk in _chunked( texts, chunk_size ):
+            yield from _render_chunk( chunk, styled )
+        return
+
+    max_pending = max_pending or 2 * workers
+    with ProcessPoolExecutor( workers, initializer=_init_worker, initargs=( Face, Family, bold ) ) as pool:
+        pending: deque[Future] = deque()
+        try:
+            for chunk in _chunked( texts, chunk_size ):
+                pending.append( pool.submit( _render_chunk, chunk, styled ) )
+                if len( pending ) >= max_pending:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
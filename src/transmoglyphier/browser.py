@@ -0,0 +1,266 @@
+"""Virtualized browser of the code points of whole Unicode blocks.
+
+Only the rows in view are ever built: a row's glyph preview in the
+current face and its unicodedata name are made when it scrolls into view
+and kept in a small LRU of rows, so blocks of any size open instantly.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import unicodedata
+
+from collections import OrderedDict
+from functools import lru_cache
+from typing import NamedTuple
+
+from rich.segment import Segment
+from rich.style import Style
+from rich.text import Text
+
+from textual import events
+from textual.binding import Binding
+from textual.geometry import Size
+from textual.message import Message
+from textual.scroll_view import ScrollView
+from textual.strip import Strip
+
+from .engine import GlyphEngine
+from .faces import load_async
+
+class Block( NamedTuple ):
+    """A named range of code points, end inclusive."""
+    start: int
+    end: int
+    name: str
+
+    def __len__( self ) -> int:
+        return self.end - self.start + 1
+
+BLOCKS = (
+    Block( 0x0000, 0x007F, "Basic Latin" ),
+    Block( 0x0080, 0x00FF, "Latin-1 Supplement" ),
+    Block( 0x0100, 0x017F, "Latin Extended-A" ),
+    Block( 0x0180, 0x024F, "Latin Extended-B" ),
+    Block( 0x0250, 0x02AF, "IPA Extensions" ),
+    Block( 0x02B0, 0x02FF, "Spacing Modifier Letters" ),
+    Block( 0x0300, 0x036F, "Combining Diacritical Marks" ),
+    Block( 0x0370, 0x03FF, "Greek and Coptic" ),
+    Block( 0x0400, 0x04FF, "Cyrillic" ),
+    Block( 0x0530, 0x058F, "Armenian" ),
+    Block( 0x0590, 0x05FF, "Hebrew" ),
+    Block( 0x0600, 0x06FF, "Arabic" ),
+    Block( 0x0900, 0x097F, "Devanagari" ),
+    Block( 0x0E00, 0x0E7F, "Thai" ),
+    Block( 0x10A0, 0x10FF, "Georgian" ),
+    Block( 0x1100, 0x11FF, "Hangul Jamo" ),
+    Block( 0x13A0, 0x13FF, "Cherokee" ),
+    Block( 0x16A0, 0x16FF, "Runic" ),
+    Block( 0x1E00, 0x1EFF, "Latin Extended Additional" ),
+    Block( 0x1F00, 0x1FFF, "Greek Extended" ),
+    Block( 0x2000, 0x206F, "General Punctuation" ),
+    Block( 0x2070, 0x209F, "Superscripts and Subscripts" ),
+    Block( 0x20A0, 0x20CF, "Currency Symbols" ),
+    Block( 0x2100, 0x214F, "Letterlike Symbols" ),
+    Block( 0x2150, 0x218F, "Number Forms" ),
+    Block( 0x2190, 0x21FF, "Arrows" ),
+    Block( 0x2200, 0x22FF, "Mathematical Operators" ),
+    Block( 0x2300, 0x23FF, "Miscellaneous Technical" ),
+    Block( 0x2400, 0x243F, "Control Pictures" ),
+    Block( 0x2440, 0x245F, "Optical Character Recognition" ),
+    Block( 0x2460, 0x24FF, "Enclosed Alphanumerics" ),
+    Block( 0x2500, 0x257F, "Box Drawing" ),
+    Block( 0x2580, 0x259F, "Block Elements" ),
+    Block( 0x25A0, 0x25FF, "Geometric Shapes" ),
+    Block( 0x2600, 0x26FF, "Miscellaneous Symbols" ),
+    Block( 0x2700, 0x27BF, "Dingbats" ),
+    Block( 0x27C0, 0x27EF, "Miscellaneous Mathematical Symbols-A" ),
+    Block( 0x27F0, 0x27FF, "Supplemental Arrows-A" ),
+    Block( 0x2800, 0x28FF, "Braille Patterns" ),
+    Block( 0x2900, 0x297F, "Supplemental Arrows-B" ),
+    Block( 0x2980, 0x29FF, "Miscellaneous Mathematical Symbols-B" ),
+    Block( 0x2A00, 0x2AFF, "Supplemental Mathematical Operators" ),
+    Block( 0x2B00, 0x2BFF, "Miscellaneous Symbols and Arrows" ),
+    Block( 0x3000, 0x303F, "CJK Symbols and Punctuation" ),
+    Block( 0x3040, 0x309F, "Hiragana" ),
+    Block( 0x30A0, 0x30FF, "Katakana" ),
+    Block( 0x4E00, 0x9FFF, "CJK Unified Ideographs" ),
+    Block( 0xAC00, 0xD7AF, "Hangul Syllables" ),
+    Block( 0xFF00, 0xFFEF, "Halfwidth and Fullwidth Forms" ),
+    Block( 0xFFF0, 0xFFFF, "Specials" ),
+    Block( 0x1CC00, 0x1CEBF, "Symbols for Legacy Computing Supplement" ),
+    Block( 0x1D100, 0x1D1FF, "Musical Symbols" ),
+    Block( 0x1D400, 0x1D7FF, "Mathematical Alphanumeric Symbols" ),
+    Block( 0x1F000, 0x1F02F, "Mahjong Tiles" ),
+    Block( 0x1F030, 0x1F09F, "Domino Tiles" ),
+    Block( 0x1F0A0, 0x1F0FF, "Playing Cards" ),
+    Block( 0x1F100, 0x1F1FF, "Enclosed Alphanumeric Supplement" ),
+    Block( 0x1F300, 0x1F5FF, "Miscellaneous Symbols and Pictographs" ),
+    Block( 0x1F600, 0x1F64F, "Emoticons" ),
+    Block( 0x1F680, 0x1F6FF, "Transport and Map Symbols" ),
+    Block( 0x1F780, 0x1F7FF, "Geometric Shapes Extended" ),
+    Block( 0x1F800, 0x1F8FF, "Supplemental Arrows-C" ),
+    Block( 0x1FB00, 0x1FBFF, "Symbols for Legacy Computing" ),
+    )
+
+@lru_cache( maxsize=4096 )
+def char_name( point: int ) -> str:
+    """The unicodedata name of a code point, looked up once."""
+    char = chr( point )
+    name = unicodedata.name( char, "" )
+    if not name:
+        category = unicodedata.category( char )
+        name = "<control>" if category == "Cc" else "<unassigned>" if category == "Cn" else "<" + category + ">"
+    return name
+
+class CodePointBrowser( ScrollView, can_focus=True ):
+    """Scrolls the code points of one Unicode block, a glyph row per point.
+
+    Rows are face lines high and show the character, its glyph in the
+    current face, its code point and its name. Only rows in view are
+    built, so jumping to a block costs the same whatever its size."""
+
+    DEFAULT_CSS = """
+    CodePointBrowser {
+        height: 1fr;
+    }
+    CodePointBrowser > .code-point-browser--odd-row {
+        background: $boost;
+    }
+    CodePointBrowser > .code-point-browser--label {
+        color: #B0FC38;
+        text-style: italic;
+    }
+    """
+
+    COMPONENT_CLASSES = {
+        "code-point-browser--odd-row",
+        "code-point-browser--label",
+        }
+
+    BINDINGS = [
+        Binding( "[", "previous_block", "Prev block" ),
+        Binding( "]", "next_block", "Next block" ),
+        ]
+
+    #Bound on the rows kept built
+    ROW_CACHE = 256
+
+    LABEL_WIDTH = 4
+    INFO_WIDTH = 18
+    NAME_WIDTH = 64
+
+    class Selected( Message ):
+        """A code point row was clicked."""
+        def __init__( self, char: str ) -> None:
+            super().__init__()
+            self.char = char
+
+    def __init__( self, *args, **kwargs ) -> None:
+        self.Face = kwargs.pop('Face', "basic_latin")
+        self.Family = kwargs.pop('Family', "block/sans")
+        self.blocks = kwargs.pop('blocks', BLOCKS)
+        super().__init__( *args, **kwargs )
+        self._engine = GlyphEngine( self.Face, self.Family )
+        self._rows: OrderedDict[int, list[Strip]] = OrderedDict()
+        self.block_index = 0
+
+    @property
+    def block( self ) -> Block:
+        return self.blocks[ self.block_index ]
+
+    @property
+    def row_height( self ) -> int:
+        return self._engine.face.lines
+
+    @property
+    def preview_width( self ) -> int:
+        return 2 * self._engine.face.columns + 2
+
+    def on_mount( self ) -> None:
+        self.jump_to_block( self.block_index )
+
+    def jump_to_block( self, block: int | str ) -> None:
+        """Show the block at an index of blocks, or with a name."""
+        if isinstance( block, str ):
+            block = [ b.name for b in self.blocks ].index( block )
+        self.block_index = block % len( self.blocks )
+        self.border_title = self.block.name
+        self._resize()
+        self.scroll_to( 0, 0, animate=False )
+
+    def action_next_block( self ) -> None:
+        self.jump_to_block( self.block_index + 1 )
+
+    def action_previous_block( self ) -> None:
+        self.jump_to_block( self.block_index - 1 )
+
+    def set_face( self, Face: str, Family: str ) -> None:
+        """Preview glyphs in another face."""
+        self._engine.load_glyphs( Face, Family )
+        self.Face = Face
+        self.Family = Family
+        self._resize()
+
+    async def set_face_async( self, Face: str, Family: str ) -> None:
+        """Preview glyphs in another face, loaded on a background thread."""
+        await asyncio.wrap_future( load_async( Face, Family ) )
+        self.set_face( Face, Family )
+
+    def _resize( self ) -> None:
+        self._rows.clear()
+        width = self.LABEL_WIDTH + self.preview_width + self.INFO_WIDTH + self.NAME_WIDTH
+        self.virtual_size = Size( width, len( self.block ) * self.row_height )
+        self.refresh()
+
+    def render_line( self, y: int ) -> Strip:
+        scroll_x, scroll_y = self.scroll_offset
+        row, line = divmod( y + scroll_y, self.row_height )
+        width = self.size.width
+        if row >= len( self.block ):
+            return Strip.blank( width, self.rich_style )
+        return self._row_strips( row )[ line ].crop_extend( scroll_x, scroll_x + width, self.rich_style )
+
+    def _row_strips( self, row: int ) -> list[Strip]:
+        point = self.block.start + row
+        strips = self._rows.get( point )
+        if strips is not None:
+            self._rows.move_to_end( point )
+            return strips
+
+        base = self.rich_style
+        if row % 2:
+            base = base + self.get_component_rich_style( "code-point-browser--odd-row" )
+        label_style = base + self.get_component_rich_style( "code-point-browser--label" )
+        char = chr( point )
+        preview = self._engine.lines( Text( char ) )
+        info: tuple[str, ...] = (
+            f" U+{point:04X} {point:>8} ",
+            " " + char_name( point ),
+            )
+        if self.row_height < len( info ):
+            #Too few face lines for the name to have its own
+            info = ( "".join( info ), )
+        width = self.virtual_size.width
+        strips = []
+        for line in range( self.row_height ):
+            label = char if line == 0 and unicodedata.category( char )[0] not in "CZ" else ""
+            segments = [
+                *Strip( [ Segment( " " + label ) ] ).adjust_cell_length( self.LABEL_WIDTH ),
+                *Strip( preview[ line ] ).adjust_cell_length( self.preview_width ),
+                Segment( info[ line ] if line < len( info ) else "" ),
+                ]
+            strip = Strip( segments ).adjust_cell_length( width ).apply_style( base )
+            if label:
+                strip = Strip.join( [ strip.crop( 0, self.LABEL_WIDTH ).apply_style( label_style ), strip.crop( self.LABEL_WIDTH ) ] )
+            strips.append( strip )
+
+        self._rows[ point ] = strips
+        if len( self._rows ) > self.ROW_CACHE:
+            self._rows.popitem( last=False )
+        return strips
+
+    def on_click( self, event: events.Click ) -> None:
+        row = ( event.y + int( self.scroll_offset.y ) ) // self.row_height
+        if 0 <= row < len( self.block ):
+            self.post_message( self.Selected( chr( self.block.start + row ) ) )
@@ -0,0 +1,135 @@
+"""Command line entry point, `transmoglyphier render` streams stdin as glyphs."""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+
+from collections.abc import Iterable
+from typing import IO, NamedTuple
+
+from rich.color import ColorSystem
+from rich.errors import MarkupError
+from rich.segment import Segment
+from rich.text import Text
+
+from .engine import GlyphEngine, LineEngine
+
+COLOR_SYSTEMS = {
+    "standard": ColorSystem.STANDARD,
+    "256": ColorSystem.EIGHT_BIT,
+    "truecolor": ColorSystem.TRUECOLOR,
+    "none": None,
+    }
+
+class StreamStats( NamedTuple ):
+    """Throughput of one render stream."""
+    lines: int
+    seconds: float
+
+    @property
+    def lines_per_second( self ) -> float:
+        return self.lines / self.seconds if self.seconds else 0.0
+
+def ansi_row( line: list[Segment], color_system: ColorSystem | None ) -> str:
+    """Join one row of segments into a string with ANSI style codes."""
+    if color_system is None:
+        return "".join( seg.text for seg in line )
+    return "".join(
+        seg.style.render( seg.text, color_system=color_system ) if seg.style else seg.text
+        for seg in line
+        )
+
+def stream(
+        source: Iterable[str],
+        out: IO[str],
+        engine: LineEngine,
+        color_system: ColorSystem | None = ColorSystem.TRUECOLOR,
+        markup: bool = True
+        ) -> StreamStats:
+    """Render every line of source as glyph rows on out, flushing per line.
+
+    engine is a GlyphEngine or a render_cache.CachedEngine."""
+    count = 0
+    start = time.perf_counter()
+    for line in source:
+        line = line.rstrip( "\r\n" )
+        text: str | Text = Text( line )
+        if markup:
+            try:
+                engine.spans( line )
+                text = line
+            except MarkupError:
+                pass
+        for row in engine.lines( text ):
+            out.write( ansi_row( row, color_system ) )
+            out.write( "\n" )
+        out.flush()
+        count += 1
+    return StreamStats( count, time.perf_counter() - start )
+
+def _render( args: argparse.Namespace ) -> int:
+    if args.color_system == "auto":
+        from rich.console import COLOR_SYSTEMS as RICH_COLOR_SYSTEMS, Console
+        color_system = RICH_COLOR_SYSTEMS.get( Console( file=sys.stdout ).color_system or "" )
+    else:
+        color_system = COLOR_SYSTEMS[ args.color_system ]
+    engine: LineEngine
+    try:
+        if args.cache is None:
+            engine = GlyphEngine( args.face, args.family, args.bold )
+        else:
+            from .render_cache import CachedEngine, RenderCache
+            engine = CachedEngine( args.face, args.family, args.bold, RenderCache( args.cache or None ) )
+    except LookupError as error:
+        print( "transmoglyphier: " + str( error ), file=sys.stderr )
+        return 2
+    try:
+        stats = stream( sys.stdin, sys.stdout, engine, color_system, not args.no_markup )
+    except LookupError as error:
+        #A cached engine loads its face on the first miss, mid stream
+        print( "transmoglyphier: " + str( error ), file=sys.stderr )
+        return 2
+    if args.stats:
+        print(
+            f"{stats.lines} lines in {stats.seconds:.3f}s ({stats.lines_per_second:.1f} lines/s)",
+            file=sys.stderr
+            )
+    return 0
+
+def _app( args: argparse.Namespace ) -> int:
+    from .transmoglyphier import Transmoglyphier
+    Transmoglyphier().run()
+    return 0
+
+def main( argv: list[str] | None = None ) -> int:
+    parser = argparse.ArgumentParser( prog="transmoglyphier" )
+    commands = parser.add_subparsers( dest="command" )
+
+    render = commands.add_parser( "render", help="render stdin lines as glyph rows on stdout" )
+    render.add_argument( "--face", default="basic_latin" )
+    render.add_argument( "--family", default="block/sans" )
+    render.add_argument( "--bold", action="store_true" )
+    render.add_argument( "--no-markup", action="store_true", help="do not parse console markup" )
+    render.add_argument(
+        "--color-system", default="auto", choices=["auto", *COLOR_SYSTEMS],
+        help="ANSI color codes to emit, auto detects from stdout"
+        )
+    render.add_argument( "--stats", action="store_true", help="report lines per second on stderr" )
+    render.add_argument(
+        "--cache", nargs="?", const="", metavar="PATH",
+        help="reuse rows rendered by earlier runs, from a render cache file (default in the user cache directory)"
+        )
+    render.set_defaults( run=_render )
+
+    app = commands.add_parser( "app", help="run the Transmoglyphier Textual app" )
+    app.set_defaults( run=_app )
+
+    args = parser.parse_args( argv )
+    if args.command is None:
+        return _app( args )
+    return args.run( args )
+
+if __name__ == "__main__":
+    sys.exit( main() )
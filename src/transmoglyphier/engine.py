@@ -0,0 +1,359 @@
+"""Headless glyph layout, usable without a running Textual app.
+
+GlyphEngine turns console markup (or a rich Text) into chunks, rows of
+segments or plain row strings for one face. EnGlyph lays out through the
+same engine, so headless output matches what the widget shows.
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_right
+from collections.abc import Sequence
+from functools import lru_cache
+from itertools import accumulate
+from typing import TYPE_CHECKING, NamedTuple, Protocol
+
+from rich.segment import Segment
+from rich.style import Style
+from rich.text import Text
+
+from .faces import CompiledFace, get_compiled
+
+if TYPE_CHECKING:
+    from rich.console import Console
+
+MARKUP_CACHE_SIZE = 4096
+"""Distinct markup strings whose parsed style runs are kept."""
+
+_console: Console | None = None
+
+def shared_console() -> Console:
+    """The one Console used to resolve span styles, created on first use.
+
+    Only its theme and tab size are used, so it works the same headless
+    and inside an app. rich.console is imported here, not with the
+    module, to keep imports of the engine light."""
+    global _console
+    if _console is None:
+        from rich.console import Console
+        _console = Console()
+    return _console
+
+def text_runs( text: Text ) -> tuple[tuple[str, Style | None], ...]:
+    """Split a rich Text into (text, style) runs.
+
+    Gives the runs Console.render would with no wrapping or cropping, but
+    without building console options, wrapping lines or a trailing newline."""
+    console = shared_console()
+    if text.style or "\n" in text.plain or "\t" in text.plain:
+        lines = text.split( "\n", allow_blank=True )
+        for line in lines:
+            if "\t" in line.plain:
+                line.expand_tabs( text.tab_size or console.tab_size or 8 )
+        text = Text( "\n" ).join( lines )
+    return tuple( ( seg.text, seg.style ) for seg in text.render( console ) )
+
+@lru_cache( maxsize=MARKUP_CACHE_SIZE )
+def markup_text( markup: str ) -> Text:
+    """Console markup parsed to a rich Text, once per distinct string.
+
+    The Text is shared, callers must copy it before changing it."""
+    return Text.from_markup( markup )
+
+@lru_cache( maxsize=MARKUP_CACHE_SIZE )
+def markup_runs( markup: str ) -> tuple[tuple[str, Style | None], ...]:
+    """The (text, style) runs of console markup, once per distinct string.
+
+    Built from markup_text(), so each string is parsed only once. The
+    cache is shared by every engine and widget in the process."""
+    return text_runs( markup_text( markup ) )
+
+@lru_cache( maxsize=1024 )
+def row_style( style: Style | None, role: tuple[bool, bool, bool] ) -> Style | None:
+    """The variant of style for a glyph row with the (cap, x, base) role.
+
+    Overline is kept only on the cap row, strike on the x row and underlines
+    on the base row. Computed once per distinct style and role."""
+    if not style:
+        return style
+    cap, x, base = role
+    if style.overline and not cap:
+        style = style + Style(overline = False)
+    if style.strike and not x:
+        style = style + Style(strike = False)
+    if not base:
+        if style.underline:
+            style = style + Style(underline = False)
+        if style.underline2:
+            style = style + Style(underline2 = False)
+    return style
+
+def chunks_to_lines( chunk_list: list[list[Segment]] ) -> list[list[Segment]]:
+    """Turn a horizontal list of vertical chunks into one segment list per row."""
+    if not chunk_list:
+        return []
+    lines = [[] for i in range(1, len(chunk_list[0])+1)]
+    for chunk in chunk_list:
+        for n, seg in enumerate( chunk ):
+            lines[n].append( seg )
+    return lines
+
+class SpanLayout( NamedTuple ):
+    """Layout of one style run: its per character cells and finished chunk."""
+    text: str
+    style: Style | None
+    last_token: str
+    cells: list[tuple[str, ...]]
+    chunk: list[Segment]
+
+class GlyphLayout( NamedTuple ):
+    """A laid out text that GlyphEngine.relayout can update incrementally."""
+    face: CompiledFace
+    bold: bool
+    spans: list[SpanLayout]
+
+    @property
+    def chunks( self ) -> list[list[Segment]]:
+        return [ span.chunk for span in self.spans ]
+
+class GlyphSize( NamedTuple ):
+    """Cells taken by a laid out text."""
+    width: int
+    height: int
+
+class LineEngine( Protocol ):
+    """The line API shared by GlyphEngine and render_cache.CachedEngine."""
+
+    def spans( self, text: str | Text ) -> Sequence[tuple[str, Style | None]]: ...
+
+    def lines( self, text: str | Text, bold: bool | None = None ) -> list[list[Segment]]: ...
+
+    def rows( self, text: str | Text, bold: bool | None = None ) -> list[str]: ...
+
+class GlyphEngine:
+    """Lays out text in one glyph face, independent of any widget."""
+
+    def __init__( self, Face: str = "basic_latin", Family: str = "block/sans", bold: bool = False ) -> None:
+        self.bold = bold
+        self.load_glyphs( Face, Family )
+
+    def load_glyphs( self, Face: str, Family: str ) -> None:
+        self.face: CompiledFace = get_compiled( Face, Family )
+        self.Face = Face
+        self.Family = Family
+
+    def en_glyph( self, text: str, style: Style | None = None, bold: bool | None = None, last_token: str = " " ) -> list[Segment]:
+        """
+        Engine to layout character strings in a glyph supercell.
+
+        Returns a vertical pile of segments (chunk) that are the 2D
+        supercell of glyphs representing the input text.
+        """
+
+        if bold is None:
+            bold = self.bold
+        return self._chunk( self.face.layout( text, bold, last_token ), style )
+
+    def _chunk( self, g_strings: list[str], style: Style | None ) -> list[Segment]:
+        roles = self.face.row_roles
+        assert len(g_strings) == len(roles), "Too many rows in glyph stack!"
+        return [ Segment( g_string, row_style( style, role ) ) for g_string, role in zip( g_strings, roles ) ]
+
+    def measure( self, text: str | Text, bold: bool | None = None ) -> GlyphSize:
+        """Size of markup text (or a rich Text) once laid out on one band.
+
+        Sums the face's advance table over the plain text, so no rows or
+        segments are built and the console pipeline is not run."""
+        if bold is None:
+            bold = self.bold
+        plain = markup_text( text ).plain if isinstance( text, str ) else text.plain
+        if "\t" in plain:
+            #tabs are expanded by the segment pipeline
+            plain = "".join( span for span, style in self.spans( text ) )
+        return GlyphSize( self.face.measure( plain, bold ), self.face.lines )
+
+    def spans( self, text: str | Text ) -> Sequence[tuple[str, Style | None]]:
+        """Split markup text (or a rich Text) into (text, style) runs.
+
+        Markup strings go through the shared parsed markup cache."""
+        if isinstance( text, str ):
+            return markup_runs( text )
+        return text_runs( text )
+
+    def span_chunks( self, spans: Sequence[tuple[str, Style | None]], bold: bool | None = None, last_token: str = " " ) -> list[list[Segment]]:
+        """Lay out (text, style) runs as a list of chunks, one per run."""
+        chunk_list = []
+        for span, style in spans:
+            chunk_list.append( self.en_glyph( span, style, bold, last_token ) )
+            if span:
+                last_token = span[-1]
+        return chunk_list
+
+    def chunks( self, text: str | Text, bold: bool | None = None ) -> list[list[Segment]]:
+        """Lay out markup text (or a rich Text) as a list of chunks, one per style span."""
+        return self.span_chunks( self.spans( text ), bold )
+
+    def relayout( self, text: str | Text, bold: bool | None = None, previous: GlyphLayout | None = None ) -> GlyphLayout:
+        """Lay out text reusing whatever of a previous layout is unchanged.
+
+        Spans are matched by position. A span whose text, style and leading
+        neighbour are unchanged keeps its chunk, a span of unchanged length
+        re-lays out only the characters that changed or follow a change, any
+        other span is laid out afresh."""
+        if bold is None:
+            bold = self.bold
+        bold = bool( bold )
+        if previous is not None and ( previous.face is not self.face or previous.bold != bold ):
+            previous = None
+        old_spans = previous.spans if previous is not None else ()
+
+        last_token = " "
+        spans = []
+        for n, ( span, style ) in enumerate( self.spans( text ) ):
+            old = old_spans[ n ] if n < len( old_spans ) else None
+            if old is None:
+                cells = self.face.cells( span, bold, last_token )
+            elif span == old.text and last_token == old.last_token:
+                if style == old.style:
+                    spans.append( old )
+                    last_token = span[-1] if span else last_token
+                    continue
+                cells = old.cells
+            elif len( span ) == len( old.text ):
+                cells = list( old.cells )
+                changed = last_token != old.last_token
+                for index, token in enumerate( span ):
+                    if changed or token != old.text[ index ]:
+                        cells[ index ] = self.face.cell( span[ index-1 ] if index else last_token, token, bold )
+                    changed = token != old.text[ index ]
+            else:
+                cells = self.face.cells( span, bold, last_token )
+            spans.append( SpanLayout( span, style, last_token, cells, self._chunk( self.face.join( cells ), style ) ) )
+            if span:
+                last_token = span[-1]
+        return GlyphLayout( self.face, bold, spans )
+
+    def lines( self, text: str | Text, bold: bool | None = None ) -> list[list[Segment]]:
+        """Lay out text as one list of segments per face line."""
+        return chunks_to_lines( self.chunks( text, bold ) ) or [ [] for row in range( self.face.lines ) ]
+
+    def rows( self, text: str | Text, bold: bool | None = None ) -> list[str]:
+        """Lay out text as unstyled row strings."""
+        return [ "".join( seg.text for seg in line ) for line in self.lines( text, bold ) ]
+
+    def strips( self, text: str | Text, bold: bool | None = None ) -> list:
+        """Lay out text as Textual Strips, one per face line."""
+        from textual.strip import Strip
+        return [ Strip( line ) for line in self.lines( text, bold ) ]
+
+def measure( text: str | Text, Face: str = "basic_latin", Family: str = "block/sans", bold: bool = False ) -> GlyphSize:
+    """Size of markup text laid out in a face, without laying it out."""
+    return GlyphEngine( Face, Family, bold ).measure( text )
+
+def render_lines( text: str | Text, Face: str = "basic_latin", Family: str = "block/sans", bold: bool = False ) -> list[list[Segment]]:
+    """Lay out markup text in a face as one list of segments per line."""
+    return GlyphEngine( Face, Family, bold ).lines( text )
+
+def render_rows( text: str | Text, Face: str = "basic_latin", Family: str = "block/sans", bold: bool = False ) -> list[str]:
+    """Lay out markup text in a face as unstyled row strings."""
+    return GlyphEngine( Face, Family, bold ).rows( text )
+
+class GlyphText:
+    """Markup text prepared for windowed and wrapped layout.
+
+    Holds the style runs of the text and the running column offset of every
+    character, so a slice of characters covering any range of columns can
+    be found by bisection and laid out on its own. Only the slice becomes
+    row strings and segments, so the cost of showing a window or a wrapped
+    band follows its width rather than the length of the text."""
+
+    def __init__( self, engine: GlyphEngine, text: str | Text, bold: bool | None = None ) -> None:
+        self.engine = engine
+        self.bold = engine.bold if bold is None else bool( bold )
+        self.spans = engine.spans( text )
+        self.plain = "".join( span for span, style in self.spans )
+        self.span_starts = list( accumulate( ( len(span) for span, style in self.spans ), initial=0 ) )
+        self.offsets = list( accumulate( engine.face.advances( self.plain, self.bold ), initial=0 ) )
+
+    @property
+    def width( self ) -> int:
+        """Columns taken by the whole text laid out on one band."""
+        return self.offsets[-1]
+
+    def index( self, column: int ) -> int:
+        """Index of the character covering column, clamped to the text."""
+        return max( 0, min( bisect_right( self.offsets, column ) - 1, len( self.plain ) ) )
+
+    def slice_spans( self, start: int, end: int ) -> list[tuple[str, Style | None]]:
+        """The style runs of the characters start to end."""
+        spans = []
+        first = max( bisect_right( self.span_starts, start ) - 1, 0 )
+        for n in range( first, len( self.spans ) ):
+            span_start = self.span_starts[ n ]
+            if span_start >= end:
+                break
+            span, style = self.spans[ n ]
+            piece = span[ max( start - span_start, 0 ):end - span_start ]
+            if piece:
+                spans.append( ( piece, style ) )
+        return spans
+
+    def lines( self, start: int, end: int, last_token: str | None = None ) -> list[list[Segment]]:
+        """Lay out characters start to end as one list of segments per face line.
+
+        The characters keep the kerning they have in the whole text unless
+        last_token says what precedes them."""
+        if last_token is None:
+            last_token = self.plain[ start-1 ] if start else " "
+        chunk_list = self.engine.span_chunks( self.slice_spans( start, end ), self.bold, last_token )
+        return chunks_to_lines( chunk_list ) or [ [] for row in range( self.engine.face.lines ) ]
+
+    def window( self, column: int, width: int, margin: int = 0 ) -> tuple[int, list[list[Segment]]]:
+        """Lay out the characters covering columns column to column+width.
+
+        margin extra columns are laid out on both sides so small scrolls can
+        be served by cropping. Returns the column of the first laid out cell
+        and the segment lines."""
+        start = self.index( column - margin )
+        end = min( self.index( column + width + margin ) + 1, len( self.plain ) )
+        return self.offsets[ start ], self.lines( start, end )
+
+    def wrap( self, width: int ) -> list[tuple[int, int]]:
+        """Split the text into (start, end) character bands no wider than width.
+
+        Bands break after the last space that fits and at newlines, words
+        wider than width are broken between characters."""
+        plain = self.plain
+        offsets = self.offsets
+        size = len( plain )
+        bands = []
+        i = 0
+        wrapped = False
+        while i < size:
+            if wrapped:
+                #a wrapped band does not start with the space it broke at
+                while i < size and plain[ i ] == " ":
+                    i += 1
+                if i >= size:
+                    break
+            start = end = i
+            space = None
+            while end < size and plain[ end ] != "\n" and offsets[ end+1 ] - offsets[ start ] <= width:
+                if plain[ end ] == " ":
+                    space = end
+                end += 1
+            if end < size and plain[ end ] not in " \n" and space is not None and space > start:
+                end = space
+            elif end == start and plain[ end ] != "\n":
+                end = start + 1
+            bands.append( ( start, end ) )
+            wrapped = not ( end < size and plain[ end ] == "\n" )
+            i = end if wrapped else end + 1
+        return bands or [ ( 0, 0 ) ]
+
+    def band_lines( self, width: int ) -> list[list[Segment]]:
+        """Lay out the text word wrapped to width, face lines of every band in turn."""
+        lines = []
+        for start, end in self.wrap( width ):
+            lines.extend( self.lines( start, end, " " ) )
+        return lines
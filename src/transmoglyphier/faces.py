@@ -0,0 +1,598 @@
+"""Process wide registry of glyph faces.
+
+Every EnGlyph showing the same (Family, Face) shares one immutable face
+that is read from the packaged assets and published once per process.
+
+A face's 'block' key names its fallback faces, one name or an ordered
+list. A plain name is a face of the same family ("basic latin"), a name
+with slashes gives the family too ("block/serif/basic_latin"). Characters
+a face lacks are looked up along the chain, depth first, when first used;
+nothing is copied between faces.
+
+load_async and prefetch load faces on background threads, so a UI can
+keep drawing while a large face is read and compiled.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import sys
+
+from collections.abc import Iterable, Iterator, Mapping
+from functools import lru_cache
+from threading import RLock
+from types import MappingProxyType
+from typing import TYPE_CHECKING, NamedTuple, Tuple
+
+from rich.cells import cell_len
+
+from . import stats
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future, ThreadPoolExecutor
+
+#typing.Tuple, not tuple, so the alias also evaluates on Python 3.8
+FaceKey = Tuple[str, str]
+
+_faces: dict[FaceKey, Mapping] = {}
+_compiled: dict[FaceKey, CompiledFace] = {}
+_sizes: dict[FaceKey, int] = {}
+_loading: dict[FaceKey, Future] = {}
+_loader: ThreadPoolExecutor | None = None
+_lock = RLock()
+#Bumped by clear(), faces loaded before then are not published after it
+_generation = 0
+
+#Background face loads run at once, more only queue behind them
+LOADER_THREADS = 2
+
+_ASSETS = os.path.join( os.path.dirname( __file__ ), "assets" )
+
+def glyph_assets():
+    """The packaged glyphs directory as an importlib.resources Traversable."""
+    #importlib.resources is slow to import, so it is only loaded when needed
+    from importlib import resources as glyphsource
+    return glyphsource.files( __package__ ).joinpath( "assets", "glyphs" )
+
+def read_asset( Face: str, Family: str ) -> bytes:
+    """The bytes of a face asset, straight from disk when the package is unpacked."""
+    try:
+        with open( os.path.join( _ASSETS, "glyphs", Family, Face + ".json" ), "rb" ) as asset:
+            return asset.read()
+    except OSError:
+        return glyph_assets().joinpath( Family, Face + ".json" ).read_bytes()
+
+def load_jface( Face: str, Family: str ) -> dict | bool:
+    """Read and parse a face asset, False if it is missing or malformed."""
+    jFace = False
+    try:
+        glyph_face = read_asset( Face, Family )
+        jFace = json.loads( glyph_face )
+    finally:
+        return jFace
+
+def shipped_faces() -> Iterator[FaceKey]:
+    """Yield the (Family, Face) key of every face asset in the package."""
+    if os.path.isdir( _ASSETS ):
+        from pathlib import Path
+        root = Path( _ASSETS, "glyphs" )
+    else:
+        root = glyph_assets()
+    def walk( node, family: list[str] ) -> Iterator[FaceKey]:
+        for entry in sorted( node.iterdir(), key=lambda e: e.name ):
+            if entry.is_dir():
+                yield from walk( entry, family + [entry.name] )
+            elif entry.name.endswith( ".json" ):
+                yield ( "/".join( family ), entry.name[:-len(".json")] )
+    yield from walk( root, [] )
+
+def _freeze( data ):
+    if isinstance( data, dict ):
+        return MappingProxyType( { key: _freeze( value ) for key, value in data.items() } )
+    if isinstance( data, list ):
+        return tuple( _freeze( value ) for value in data )
+    return data
+
+def _sizeof( data ) -> int:
+    size = sys.getsizeof( data )
+    if isinstance( data, dict ):
+        for key, value in data.items():
+            size += _sizeof( key ) + _sizeof( value )
+    elif isinstance( data, list ):
+        for value in data:
+            size += _sizeof( value )
+    return size
+
+def fallback_keys( Face: str, Family: str, GLYPHS: Mapping ) -> tuple[FaceKey, ...]:
+    """The (Family, Face) keys named by a face's 'block' key, in order."""
+    names = GLYPHS.get('block', ())
+    if isinstance( names, str ):
+        names = ( names, )
+    keys = []
+    for name in names:
+        name = name.replace(" ", "_")
+        family, _, face = name.rpartition("/")
+        key = ( family or Family, face )
+        if key != ( Family, Face ) and key not in keys:
+            keys.append( key )
+    return tuple( keys )
+
+@lru_cache( maxsize=4096 )
+def placeholder( token: str ) -> Mapping:
+    """The hex box (or boxed ASCII) glyph shown for a character no face has."""
+    #https://gist.github.com/Jonty/6705090 would be better
+    if ord( token ) > 32 and ord( token ) < 127:
+        return _freeze( {"glyph":["┌┬┐","├"+token+"┤","└┴┘"]} )
+    index = "{0:04x}".format( ord(token) )
+    return _freeze( {"glyph":[index[0]+"┬"+index[1],"├ ┤",index[2]+"┴"+index[3]]} )
+
+def get_face( Face: str, Family: str ) -> Mapping:
+    """Return the shared, read only face for Family/Face, without fallbacks.
+
+    Raises LookupError if the face asset can not be loaded. The asset is
+    read and parsed outside the registry lock, which is only taken to
+    publish the result, so lookups of loaded faces never wait on a load."""
+    key = ( Family, Face )
+    face = _faces.get( key )
+    if face is None:
+        generation = _generation
+        start = stats.clock()
+        glyphs = load_jface( Face, Family )
+        if not glyphs:
+            raise LookupError( "unable to load glyph face " + Family + "/" + Face )
+        size = _sizeof( glyphs )
+        face = _freeze( glyphs )
+        with _lock:
+            if generation != _generation:
+                return face
+            published = _faces.get( key )
+            if published is not None:
+                return published
+            _sizes[ key ] = size
+            _faces[ key ] = face
+        if stats.enabled:
+            stats.timed( "face loads", start, stats.face_scope( Family, Face ) )
+    return face
+
+def get_compiled( Face: str, Family: str ) -> CompiledFace:
+    """Return the shared CompiledFace for Family/Face, compiling it on first use.
+
+    Like get_face, compiles outside the registry lock and only publishes under it."""
+    key = ( Family, Face )
+    compiled = _compiled.get( key )
+    if compiled is None:
+        generation = _generation
+        start = stats.clock()
+        GLYPHS = get_face( Face, Family )
+        compiled = CompiledFace( GLYPHS, key, fallback_keys( Face, Family, GLYPHS ) )
+        with _lock:
+            if generation != _generation:
+                return compiled
+            published = _compiled.get( key )
+            if published is not None:
+                return published
+            _compiled[ key ] = compiled
+        if stats.enabled:
+            stats.timed( "registry misses", start, stats.face_scope( Family, Face ) )
+        return compiled
+    if stats.enabled:
+        stats.count( "registry hits", stats.face_scope( Family, Face ) )
+    return compiled
+
+def preload( faces: Iterable[FaceKey] | None = None ) -> list[FaceKey]:
+    """Warm the registry with (Family, Face) keys, by default every shipped face.
+
+    Faces that fail to load are skipped; the keys that loaded are returned."""
+    loaded = []
+    for Family, Face in ( shipped_faces() if faces is None else faces ):
+        try:
+            get_compiled( Face, Family )
+        except LookupError:
+            continue
+        loaded.append( ( Family, Face ) )
+    return loaded
+
+def _load_ready( Face: str, Family: str ) -> CompiledFace:
+    compiled = get_compiled( Face, Family )
+    #Resolve the fallback chain and coverage index here, not on first layout
+    compiled.index
+    return compiled
+
+def load_async( Face: str, Family: str ) -> Future:
+    """Load and compile Family/Face on a background thread.
+
+    Returns a Future of the CompiledFace, ready at once if it is already
+    loaded; concurrent requests for a face share one load. The Future
+    raises LookupError if the face can not be loaded."""
+    global _loader
+    from concurrent.futures import Future, ThreadPoolExecutor
+    key = ( Family, Face )
+    with _lock:
+        compiled = _compiled.get( key )
+        if compiled is not None and compiled._index is not None:
+            ready: Future = Future()
+            ready.set_result( compiled )
+            return ready
+        future = _loading.get( key )
+        if future is None:
+            if _loader is None:
+                _loader = ThreadPoolExecutor( LOADER_THREADS, thread_name_prefix="transmoglyphier-faces" )
+            future = _loading[ key ] = _loader.submit( _load_ready, Face, Family )
+            future.add_done_callback( lambda done: _loading.pop( key ) if _loading.get( key ) is done else None )
+    return future
+
+def prefetch( faces: Iterable[FaceKey] | None = None ) -> list[Future]:
+    """Start background loads of (Family, Face) keys, by default every shipped face.
+
+    Faces already loaded are skipped and load errors are kept in the
+    returned Futures, never raised."""
+    return [
+        load_async( Face, Family )
+        for Family, Face in ( shipped_faces() if faces is None else faces )
+        if ( Family, Face ) not in _compiled
+        ]
+
+def loaded_faces() -> list[FaceKey]:
+    """List the (Family, Face) keys currently held by the registry."""
+    return list( _faces )
+
+def face_memory() -> dict[FaceKey, int]:
+    """Approximate bytes held by each loaded face, keyed by (Family, Face)."""
+    return dict( _sizes )
+
+def clear() -> None:
+    """Drop every loaded face, the next get_face call reloads from assets.
+
+    Loads still in flight finish for their callers but are not kept, and
+    the next load_async of a face starts a new load."""
+    global _generation
+    with _lock:
+        _generation += 1
+        _faces.clear()
+        _compiled.clear()
+        _sizes.clear()
+        _loading.clear()
+
+class CompiledGlyph( NamedTuple ):
+    """Load time layout data of one character of a face.
+
+    rows[bold][after_space] holds the glyph rows already padded to the face
+    height and to the glyph's horizontal place in its supercell. Only the
+    kerning wedge, which depends on the previous character, is left to add.
+    advance[bold][after_space] is the cell width of the widest of those rows."""
+    rows: tuple
+    advance: tuple
+    tracking: float
+    kerning: bool
+    columns: int
+    left: bool
+
+class CompiledFace:
+    """A face turned into per character tables so layout is lookups and joins.
+
+    Rows for every (previous character, character) pair seen are memoized,
+    so laying out text is one dict lookup per character and one str.join
+    per row of the face."""
+
+    #Bound on the memoized character pair cells of one face
+    CELL_LIMIT = 1 << 16
+
+    def __init__( self, GLYPHS: Mapping, key: FaceKey | None = None, fallbacks: Iterable[FaceKey] = () ) -> None:
+        self.key = key
+        self.fallback_keys = tuple( fallbacks )
+        try:
+            self.lines = GLYPHS['fixed lines']
+            self.columns = GLYPHS['fixed columns']
+            self.align = GLYPHS['align']
+            self.tracking = GLYPHS['tracking']
+            self.monospace = GLYPHS['monospace']
+            faces_data = GLYPHS['character']
+        except:
+            raise Exception("missing required glyph face data")
+
+        #Rows that keep overline, strike and underline decorations
+        self.cap_row = GLYPHS.get('cap row', 0)
+        self.x_row = GLYPHS.get('x row', self.lines // 2)
+        self.base_row = GLYPHS.get('base row', self.lines - 1)
+        self.row_roles = tuple(
+            ( row == self.cap_row, row == self.x_row, row == self.base_row )
+            for row in range( self.lines )
+            )
+
+        #Special char pairs that have no proportional spacing
+        self.adjacent = frozenset( GLYPHS.get('adjacent', []) )
+        self.antiadjacent = frozenset( GLYPHS.get('antiadjacent', []) )
+
+        #The face's own characters, fallbacks are resolved through chain
+        self.characters = faces_data
+        self.coverage = frozenset( faces_data )
+        self._chain: tuple[CompiledFace, ...] | None = None
+        self._index: dict[str, CompiledFace] | None = None
+
+        self.glyphs = { token: self._compile_glyph( face ) for token, face in faces_data.items() }
+        #Glyphs compiled on first use from fallback faces or placeholders
+        self._resolved: dict[str, CompiledGlyph] = {}
+        self._pairs: dict[str, int] = {}
+        self._cells: tuple[dict, dict] = ( {}, {} )
+        self._advances: tuple[dict, dict] = ( {}, {} )
+
+    def _compile_glyph( self, face: Mapping ) -> CompiledGlyph:
+        bbox_height = self.lines
+        bbox_width = self.columns
+        Thint = face.get('tracking', self.tracking)
+        #determine if the glyphs are placed in fixed width
+        Mhint = face.get('monospace', self.monospace)
+        #Determine vertical number of cells for the glyphs
+        Hhint = face.get('lines', bbox_height)
+        #The nominal max width of a glyph
+        Whint = face.get('columns', bbox_width)
+        Ahint = face.get('align', self.align)
+        glyph = face.get('glyph', face )
+        if isinstance( glyph, Mapping ):
+            variants = ( glyph.get('normal', glyph ), glyph.get('bold', glyph ) )
+        else:
+            variants = ( glyph, glyph )
+
+        #determine horizontal glyph placement in supercell, after a
+        #non-space and after a space character
+        if Mhint:
+            if Ahint[0] == "left":
+                pads = ( (0, bbox_width - Whint), ) * 2
+            elif Ahint[0] == "right":
+                pads = ( (bbox_width - Whint, 0), ) * 2
+            else:
+                pad = (bbox_width - Whint)/2.0
+                pads = (
+                    ( math.floor(pad), math.ceil(pad) ),
+                    ( math.ceil(pad), math.floor(pad) )
+                    )
+        else:
+            pads = ( (0, 0), ) * 2
+
+        #determine vertical glyph placement in supercell
+        if Hhint == bbox_height:
+            t_pad = 0
+        elif Ahint[1] == "top":
+            t_pad = 0
+        elif Ahint[1] == "bottom":
+            t_pad = bbox_height - Hhint
+        else:
+            t_pad = math.ceil( (bbox_height - Hhint)/2.0 )
+
+        blank = " "*Whint
+        rows = []
+        for variant in variants:
+            data = []
+            for row in range( bbox_height ):
+                g_row = row - t_pad
+                if g_row < 0 or g_row >= Hhint or g_row >= len( variant ):
+                    data.append( blank )
+                else:
+                    data.append( variant[ g_row ] )
+            rows.append( tuple(
+                tuple( " "*l_pad + g_datum + " "*r_pad for g_datum in data )
+                for l_pad, r_pad in pads
+                ) )
+
+        return CompiledGlyph(
+            rows = tuple( rows ),
+            advance = tuple(
+                tuple( max( map( cell_len, padded ) ) for padded in variant )
+                for variant in rows
+                ),
+            tracking = Thint,
+            kerning = face.get('kerning', True),
+            columns = Whint,
+            left = Ahint[0] != "left"
+            )
+
+    @property
+    def chain( self ) -> tuple[CompiledFace, ...]:
+        """This face and its fallbacks in lookup order, resolved on first use.
+
+        Fallback faces that fail to load are left out, and a face reached
+        twice (or in a cycle) is only looked at the first time."""
+        chain = self._chain
+        if chain is None:
+            #Fallbacks are loaded first, outside the lock. The chain is then
+            #built aside and published whole, another thread holding this
+            #face (handed out by get_compiled) must never see part of it
+            loaded = self._load_fallbacks()
+            with _lock:
+                if self._chain is None:
+                    self._chain = self._resolve_chain( frozenset(), loaded )
+                chain = self._chain
+        return chain
+
+    def _load_fallbacks( self ) -> dict[FaceKey, CompiledFace | None]:
+        """Every face reachable through unresolved fallbacks, None for those that fail to load."""
+        loaded: dict[FaceKey, CompiledFace | None] = {}
+        if self.key is not None:
+            loaded[ self.key ] = self
+        pending = list( self.fallback_keys )
+        while pending:
+            key = pending.pop()
+            if key in loaded:
+                continue
+            Family, Face = key
+            try:
+                fallback = loaded[ key ] = get_compiled( Face, Family )
+            except LookupError:
+                loaded[ key ] = None
+                continue
+            if fallback._chain is None:
+                pending.extend( fallback.fallback_keys )
+        return loaded
+
+    def _resolve_chain( self, resolving: frozenset[CompiledFace], loaded: Mapping[FaceKey, CompiledFace | None] ) -> tuple[CompiledFace, ...]:
+        resolving = resolving | { self }
+        chain = [ self ]
+        for key in self.fallback_keys:
+            fallback = loaded.get( key )
+            if fallback is None:
+                continue
+            if fallback._chain is not None:
+                fallbacks = fallback._chain
+            elif fallback in resolving:
+                #A fallback chain that cycles back
+                fallbacks = ( fallback, )
+            else:
+                fallbacks = fallback._resolve_chain( resolving, loaded )
+            for face in fallbacks:
+                if face not in chain:
+                    chain.append( face )
+        return tuple( chain )
+
+    @property
+    def index( self ) -> Mapping[str, CompiledFace]:
+        """Coverage index: the face of the chain that renders each character."""
+        index = self._index
+        if index is None:
+            with _lock:
+                if self._index is None:
+                    index = {}
+                    for face in reversed( self.chain ):
+                        index.update( dict.fromkeys( face.coverage, face ) )
+                    self._index = index
+                index = self._index
+        return index
+
+    def face_for( self, token: str ) -> CompiledFace | None:
+        """The face of the chain that renders token, None if it gets a placeholder."""
+        return self.index.get( token )
+
+    def covers( self, token: str ) -> bool:
+        """True if token has a glyph in this face or a fallback."""
+        return token in self.index
+
+    def missing( self, text: str ) -> set[str]:
+        """The characters of text no face of the chain renders."""
+        return set( text ).difference( self.index )
+
+    def renders( self, text: str ) -> bool:
+        """True if every character of text has a glyph in the chain."""
+        return not self.missing( text )
+
+    def glyph( self, token: str ) -> CompiledGlyph:
+        """The compiled glyph for token, a hex box placeholder if it is missing.
+
+        Characters from a fallback face are compiled to this face's metrics
+        on first use."""
+        compiled = self.glyphs.get( token )
+        if compiled is None:
+            compiled = self._resolved.get( token )
+            if compiled is None:
+                face = self.face_for( token )
+                data = face.characters[ token ] if face is not None else placeholder( token )
+                compiled = self._resolved[ token ] = self._compile_glyph( data )
+        return compiled
+
+    def _wedge( self, last_token: str, token: str ) -> int:
+        glyph = self.glyph( token )
+        pair = last_token + token
+        if pair in self.adjacent or glyph.tracking <= 0:
+            return 0
+        last_glyph = self.glyph( last_token ) if self.covers( last_token ) else None
+        last_Khint = last_glyph.kerning if last_glyph else True
+        last_Whint = last_glyph.columns if last_glyph else self.columns
+        if last_Khint and glyph.kerning:
+            wedge = math.ceil( glyph.tracking )
+        else:
+            wedge = math.ceil( glyph.tracking - last_Whint )
+        if pair in self.antiadjacent:
+            wedge += 1
+        return max( wedge, 0 )
+
+    def wedge( self, last_token: str, token: str ) -> int:
+        """Columns of kerning and tracking space put between two characters."""
+        pair = last_token + token
+        wedge = self._pairs.get( pair )
+        if wedge is None:
+            wedge = self._pairs[ pair ] = self._wedge( last_token, token )
+        return wedge
+
+    def _cell( self, last_token: str, token: str, bold: bool ) -> tuple[str, ...]:
+        glyph = self.glyph( token )
+        rows = glyph.rows[ bold ][ last_token == " " ]
+        wedge = self.wedge( last_token, token )
+        if wedge:
+            space = " "*wedge
+            if glyph.left:
+                rows = tuple( space + row for row in rows )
+            else:
+                rows = tuple( row + space for row in rows )
+        cells = self._cells[ bold ]
+        if len( cells ) >= self.CELL_LIMIT:
+            cells.clear()
+        cells[ last_token + token ] = rows
+        return rows
+
+    def _advance( self, last_token: str, token: str, bold: bool ) -> int:
+        advance = self.glyph( token ).advance[ bold ][ last_token == " " ] + self.wedge( last_token, token )
+        advances = self._advances[ bold ]
+        if len( advances ) >= self.CELL_LIMIT:
+            advances.clear()
+        advances[ last_token + token ] = advance
+        return advance
+
+    def advances( self, text: str, bold: bool = False, last_token: str = " " ) -> list[int]:
+        """Columns advanced by every character of text, kerning included."""
+        bold = bool( bold )
+        advance = self._advances[ bold ].get
+        columns = []
+        for token in text:
+            width = advance( last_token + token )
+            if width is None:
+                width = self._advance( last_token, token, bold )
+            columns.append( width )
+            last_token = token
+        return columns
+
+    def measure( self, text: str, bold: bool = False, last_token: str = " " ) -> int:
+        """Columns text takes once laid out, without building any rows."""
+        bold = bool( bold )
+        advance = self._advances[ bold ].get
+        columns = 0
+        for token in text:
+            width = advance( last_token + token )
+            if width is None:
+                width = self._advance( last_token, token, bold )
+            columns += width
+            last_token = token
+        return columns
+
+    def cell( self, last_token: str, token: str, bold: bool = False ) -> tuple[str, ...]:
+        """The padded rows of token when it follows last_token."""
+        bold = bool( bold )
+        rows = self._cells[ bold ].get( last_token + token )
+        if rows is None:
+            rows = self._cell( last_token, token, bold )
+        return rows
+
+    def cells( self, text: str, bold: bool = False, last_token: str = " " ) -> list[tuple[str, ...]]:
+        """The padded rows of every character of text, one tuple per character."""
+        bold = bool( bold )
+        cell = self._cells[ bold ].get
+        parts = []
+        for token in text:
+            rows = cell( last_token + token )
+            if rows is None:
+                rows = self._cell( last_token, token, bold )
+            parts.append( rows )
+            last_token = token
+        return parts
+
+    def join( self, parts: list[tuple[str, ...]] ) -> list[str]:
+        """Join per character cells into one string per face line."""
+        if not parts:
+            return [ "" ] * self.lines
+        return [ "".join( row ) for row in zip( *parts ) ]
+
+    def layout( self, text: str, bold: bool = False, last_token: str = " " ) -> list[str]:
+        """Lay text out into one string per face line.
+
+        last_token is the character laid out just before text, it decides
+        the kerning and placement of the first character."""
+        return self.join( self.cells( text, bold, last_token ) )
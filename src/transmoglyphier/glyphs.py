@@ -1,93 +1,383 @@
 from __future__ import annotations
 
-from rich.console import Console
-from rich.segment import Segment
-from rich.style import Style
+from rich.cells import cell_len
+from rich.text import Text
 
+from textual.geometry import Region, Size
+from textual.reactive import reactive
 from textual.strip import Strip
 from textual.widgets import Static
 
+import asyncio
 import string
-import json
-import math
 
-#from pkgutil import get_data as LoadGlyphs
-from importlib import resources as glyphsource
-
-from textual import log
-#log("stuff")
+from collections.abc import Sequence
+from itertools import zip_longest
+from typing import TYPE_CHECKING, NamedTuple
+from weakref import WeakValueDictionary
+
+from . import stats
+from .engine import GlyphEngine, GlyphText, chunks_to_lines, markup_text
+from .faces import get_face, load_async
+
+if TYPE_CHECKING:
+    from rich.console import RenderableType
+    from rich.style import StyleType
+    from typing_extensions import Self
+
+class CacheInfo( NamedTuple ):
+    """Layout cache counters of an EnGlyph widget."""
+    hits: int
+    misses: int
+
+class SharedLayout:
+    """Immutable strips and rows of one layout, shared by every widget showing it."""
+    __slots__ = ( "strips", "rows", "chunks", "layout", "__weakref__" )
+
+    def __init__( self, strips: tuple[Strip, ...], rows: tuple[str, ...], chunks: list, layout ) -> None:
+        self.strips = strips
+        self.rows = rows
+        self.chunks = chunks
+        self.layout = layout
+
+class StripPoolInfo( NamedTuple ):
+    """Occupancy of the shared strip pool."""
+    layouts: int
+    strips: int
+    cells: int
+    hits: int
+    misses: int
+
+#Layouts by (source, face, bold, wrap width), alive while a widget shows them
+_strip_pool: WeakValueDictionary[tuple, SharedLayout] = WeakValueDictionary()
+_pool_hits = 0
+_pool_misses = 0
+
+def strip_pool_info() -> StripPoolInfo:
+    """Report the layouts held by the shared strip pool and its lookups."""
+    layouts = list( _strip_pool.values() )
+    return StripPoolInfo(
+        len( layouts ),
+        sum( len( shared.strips ) for shared in layouts ),
+        sum( strip.cell_length for shared in layouts for strip in shared.strips ),
+        _pool_hits,
+        _pool_misses
+        )
+
+def _common_prefix( a: str, b: str ) -> int:
+    """Length of the common prefix of two strings, by bisecting slice compares."""
+    lo, hi = 0, min( len(a), len(b) )
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[:mid] == b[:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+def _common_ends( a: str, b: str ) -> tuple[int, int]:
+    """Lengths of the common prefix and (not overlapping it) suffix of two different strings."""
+    if len(a) != len(b):
+        prefix = _common_prefix( a, b )
+        return prefix, min( _common_prefix( a[::-1], b[::-1] ), min( len(a), len(b) ) - prefix )
+    #Same length: the set bits of the XOR of the strings as UTF-32 integers
+    #mark the differing characters, found without a Python loop
+    diff = int.from_bytes( a.encode( "utf-32-le" ), "little" ) ^ int.from_bytes( b.encode( "utf-32-le" ), "little" )
+    first = ( ( diff & -diff ).bit_length() - 1 ) // 32
+    last = ( diff.bit_length() - 1 ) // 32
+    return first, len(a) - 1 - last
+
+def _dirty_region( old_rows: Sequence[str], new_rows: Sequence[str] ) -> Region | None:
+    """The columns (over all rows) that differ between two row layouts."""
+    height = len( new_rows )
+    width = len( new_rows[0] ) if new_rows else 0
+    old = "".join( old_rows )
+    new = "".join( new_rows )
+    if (
+        len( old_rows ) == height and { *map( len, old_rows ), *map( len, new_rows ) } == { width }
+        and cell_len( old ) == len( old ) and cell_len( new ) == len( new )
+        ):
+        if old == new:
+            return None
+        #Rows of one width in single cell characters: fold the XOR of every
+        #row pair into one, whose set bits are the columns changed in any row
+        diff = int.from_bytes( old.encode( "utf-32-le" ), "little" ) ^ int.from_bytes( new.encode( "utf-32-le" ), "little" )
+        bits = 32 * width
+        mask = ( 1 << bits ) - 1
+        columns = 0
+        while diff:
+            columns |= diff & mask
+            diff >>= bits
+        first = ( ( columns & -columns ).bit_length() - 1 ) // 32
+        return Region( first, 0, ( columns.bit_length() + 31 ) // 32 - first, height )
+    x0 = x1 = None
+    for old, new in zip_longest( old_rows, new_rows, fillvalue="" ):
+        if old == new:
+            continue
+        prefix, suffix = _common_ends( old, new )
+        start = cell_len( new[:prefix] )
+        end = max( cell_len( new[:len(new)-suffix] ), cell_len( old[:len(old)-suffix] ) )
+        x0 = start if x0 is None else min( x0, start )
+        x1 = end if x1 is None else max( x1, end )
+    if x0 is None:
+        return None
+    return Region( x0, 0, x1 - x0, max( len(old_rows), len(new_rows) ) )
 
 class EnGlyph( Static ):
-    """Renders a wXh unicode glyph 'font' for input token characters."""
+    """Renders a wXh unicode glyph 'font' for input token characters.
+
+    With wrap the text is word wrapped into as many glyph bands as the
+    widget width needs. With virtual the text stays on one band that is
+    scrolled by glyph_offset, and only the columns in view (plus
+    virtual_margin columns either side) are ever laid out. With shared
+    (the default) widgets showing the same markup in the same face take
+    their strips from one pooled layout, see strip_pool_info. With
+    incremental, update() marks only the changed columns for repaint
+    rather than relaying out the screen: it cuts the area Textual redraws,
+    not the cost of an update, which takes more work in the widget than a
+    full re-layout."""
     DEFAULT_CSS = """
     EnGlyph {
         height: auto;
     }
 	""" 
 
+    glyph_offset = reactive( 0 )
+    """First text column shown by a virtual widget."""
+
     def __init__( self, *args, **kwargs ) -> None:
         self.Face = kwargs.pop('Face', "basic_latin")
         self.Family = kwargs.pop('Family', "block/sans")
+        self.incremental = kwargs.pop('incremental', False)
+        self.shared = kwargs.pop('shared', True)
+        self.wrap = kwargs.pop('wrap', False)
+        self.virtual = kwargs.pop('virtual', False)
+        self.virtual_margin = kwargs.pop('virtual_margin', 16)
+        self._key_size: Size | None = None
+        self._key_styling: tuple[bool, int] | None = None
         super().__init__( *args, **kwargs )
         self._cache = None
+        self._cache_hits = 0
+        self._cache_misses = 0
+        self._last_token = " "
+        self._glyph_layout = None
+        self._rows = []
+        self._glyph_text = None
+        self._glyph_text_key = None
+        self._window_x = 0
+        self._window_width = 0
+        self._shared = None
+        self._face_request = None
+        self._engine = GlyphEngine( self.Face, self.Family )
         self.load_glyphs(self.Face, self.Family)
 
-    def get_content_height(self, container:size, viewport: size, width:int ) -> int:
-        self.height = self.GLYPHS['fixed lines']
+    @property
+    def renderable(self) -> RenderableType:
+        return self._renderable or ""
+
+    @renderable.setter
+    def renderable(self, renderable: RenderableType) -> None:
+        #Markup is parsed once per distinct string, shared by all widgets
+        if isinstance( renderable, str ) and self.markup:
+            self._markup_source = renderable
+            self._renderable = markup_text( renderable )
+            self.clear_cached_dimensions()
+            return
+        self._markup_source = None
+        Static.renderable.fset( self, renderable )
+
+    @property
+    def _source(self) -> RenderableType:
+        """The markup string the text came from, else the renderable itself."""
+        if self._markup_source is not None:
+            return self._markup_source
+        return self._renderable
+
+    def get_content_width(self, container: Size, viewport: Size) -> int:
+        if self.virtual:
+            return container.width
+        bold = self.styles.text_style.bold
+        if isinstance( self._source, ( str, Text ) ):
+            width = self._engine.measure( self._source, bold ).width
+        else:
+            width = self._engine.face.measure( "".join( span for span, style in self._engine.spans( self._source ) ), bold )
+        if self.wrap:
+            return min( width, container.width )
+        return width
+
+    def get_content_height(self, container:Size, viewport: Size, width:int ) -> int:
+        if self.wrap:
+            self.height = len( self._prepared().wrap( width ) ) * self._engine.face.lines
+        else:
+            self.height = self.GLYPHS['fixed lines']
         return self.height
 
+    def validate_glyph_offset(self, offset: int) -> int:
+        return max( 0, offset )
+
+    def _prepared(self) -> GlyphText:
+        """The text prepared for wrapped or windowed layout, kept until it changes."""
+        key = ( self._source, self.Face, self.Family, bool( self.styles.text_style.bold ) )
+        if self._glyph_text_key != key:
+            self._glyph_text = GlyphText( self._engine, self._source, key[3] )
+            self._glyph_text_key = key
+        return self._glyph_text
+
+
+    def _layout_key(self) -> tuple:
+        """Everything a cached layout depends on, compared by equality.
+
+        Bold and the content width are only looked up again after the
+        widget is resized or refreshed (as every style change does), not
+        for every row painted."""
+        styling = self._key_styling
+        if styling is None or self._key_size != self.outer_size:
+            self._key_size = self.outer_size
+            styling = self._key_styling = ( bool( self.styles.text_style.bold ), self.size.width )
+        return ( self._source, self.Face, self.Family ) + styling
+
+    def refresh(self, *regions: Region, **kwargs) -> Self:
+        #Inline style changes refresh the widget, so look bold and width up again
+        self._key_styling = None
+        return super().refresh( *regions, **kwargs )
+
+    def notify_style_update(self) -> None:
+        self._key_styling = None
+        super().notify_style_update()
 
     def render_line(self, row:int ) -> Strip:
-        if self._cache != self._renderable:
+        key = self._layout_key()
+        if self._cache != key:
+            self._cache_misses += 1
+            if stats.enabled:
+                stats.count( "layout misses", *self._stats_scopes() )
             self._prechunk()
+            self._cache = key
+        else:
+            self._cache_hits += 1
+            if stats.enabled:
+                stats.count( "layout hits", *self._stats_scopes() )
+        if self.virtual:
+            return self._window_strip( row )
+        if row >= len( self._strips ):
+            return Strip.blank( self.size.width )
         return self._strips[ row ]
 
-    def _load_jFace(self, Face, Family) -> None:
-        jFace = False
-        face_path = 'glyphs/' + Family + "/" + Face + ".json"
-        glyph_assets = glyphsource.files()
-        try:
-            glyph_face = glyph_assets.joinpath( "assets", face_path ).read_bytes()
-            jFace = json.loads( glyph_face )
-            self.Face = Face
-            self.Family = Family
-        finally:
-            return jFace
+    def _materialize(self) -> None:
+        """Lay out just the columns around the visible window of a virtual widget."""
+        self._window_x, lines = self._prepared().window( self.glyph_offset, self.size.width, self.virtual_margin )
+        self._lines_to_strips( lines )
+        self._window_width = max( strip.cell_length for strip in self._strips )
+
+    def _window_strip(self, row: int) -> Strip:
+        width = self.size.width
+        start = self.glyph_offset - self._window_x
+        beyond = start + width > self._window_width
+        if start < 0 or ( beyond and self._window_x + self._window_width < self._prepared().width ):
+            self._materialize()
+            start = self.glyph_offset - self._window_x
+        if row >= len( self._strips ):
+            return Strip.blank( width )
+        return self._strips[ row ].crop( start, start + width )
+
+    def cache_info(self) -> CacheInfo:
+        """Report layout cache hits and misses for this widget."""
+        return CacheInfo( self._cache_hits, self._cache_misses )
+
+    def _stats_scopes(self) -> tuple[str, str]:
+        """The stats scopes of this widget and of its current face."""
+        widget = "widget:#" + self.id if self.id else f"widget:{type(self).__name__}@{id(self):x}"
+        return widget, stats.face_scope( self.Family, self.Face )
+
+    def update(self, renderable: RenderableType = "") -> None:
+        """Update the text, with incremental set repainting only the columns that changed.
+
+        A widget that has been laid out before and has incremental set keeps
+        the chunks of unchanged spans and characters, and refreshes just the
+        columns that differ, unless the overall width changed. This saves
+        repaint area, the update itself costs more than a full one."""
+        #The refresh below is not a style change, bold and width still hold
+        styling = self._key_styling
+        if not self.incremental or self.wrap or self.virtual or self._glyph_layout is None:
+            self._cache = None
+            super().update( renderable )
+            self._key_styling = styling
+            return
+        old_rows = self._rows
+        self.renderable = renderable
+        self._prechunk()
+        self._cache = self._layout_key()
+        if cell_len( old_rows[0] if old_rows else "" ) != cell_len( self._rows[0] if self._rows else "" ):
+            self.refresh( layout=True )
+        else:
+            region = _dirty_region( old_rows, self._rows )
+            if region is not None:
+                self.refresh( region )
+        self._key_styling = styling
 
     #def load_glyphs(self, Face="seven_segment", Family="block/sans") -> None:
     def load_glyphs(self, Face: str, Family: str) -> None:
-        self.GLYPHS = self._load_jFace( Face, Family )
-        fallback = self.GLYPHS.get('block', Face).replace(" ", "_")
-        if fallback != Face:
-            faces = self._load_jFace( fallback, Family )
-            if faces:
-                for key in faces['character'].keys():
-                    if key not in self.GLYPHS['character']:
-                        self.GLYPHS['character'][key] = faces['character'][key]
+        """Switch to a face from the shared registry, loading it on first use."""
+        self.GLYPHS = get_face( Face, Family )
+        self._engine.load_glyphs( Face, Family )
+        self.Face = Face
+        self.Family = Family
+        self._cache = None
+        self._glyph_layout = None
+
+    async def load_glyphs_async(self, Face: str, Family: str) -> bool:
+        """Switch face without blocking the event loop.
+
+        The face, its fallback chain and coverage index are loaded on a
+        background thread while the widget keeps showing the current face,
+        which is then swapped in at once and refreshed. Returns False if a
+        later call superseded this one. Raises LookupError, keeping the
+        current face, if the face can not be loaded."""
+        request = self._face_request = ( Face, Family )
+        await asyncio.wrap_future( load_async( Face, Family ) )
+        if self._face_request is not request:
+            return False
+        self._face_request = None
+        self.load_glyphs( Face, Family )
+        self.refresh( layout=True )
+        return True
 
     def __str__(self) -> RenderableType:
         a_string = ""
         for y in range(3):
             for seg in self.render_line( y ):
-                log( repr(seg[0]) )
                 a_string += seg[0]
             a_string += "\n"
         return a_string
 
     def _chunks_to_strips(self) -> None:
-        chunk_list = self._chunk_list
-        lines = [[] for i in range(1, len(chunk_list[0])+1)]
-        for chunk in chunk_list:
-            #log( "Chunks: "+repr( chunk ) )
-            for n, seg in enumerate( chunk ):
-                #log( "Chunk Seg: "+str(n)+", "+repr( seg ) )
-                lines[n].append( seg )
-                #log( "Line n: "+str(n)+", "+repr( lines[n] ) )
+        self._lines_to_strips( chunks_to_lines( self._chunk_list ) )
+
+    def _lines_to_strips(self, lines: list) -> None:
+        if not lines:
+            lines = [[] for row in range( self._engine.face.lines )]
         self._strips = []
-        #log( "Lines: "+repr( lines ) )
+        self._rows = []
         for line in lines:
             self._strips.append( Strip(line) )
+            self._rows.append( "".join( seg.text for seg in line ) )
+        if stats.enabled:
+            stats.count( "strips", *self._stats_scopes(), n=len( lines ) )
+
 
+    def _pool_key(self) -> tuple | None:
+        """Key of the shared layout this widget can use, None if it can not share.
+
+        Only markup strings are pooled and never virtual widgets, whose
+        strips depend on their scroll position."""
+        if not self.shared or self.virtual or not isinstance( self._source, str ):
+            return None
+        return (
+            self._source,
+            self._engine.face,
+            bool( self.styles.text_style.bold ),
+            self.size.width if self.wrap else None
+            )
 
     def _prechunk(self) -> None:
 
@@ -97,16 +387,61 @@ class EnGlyph( Static ):
         arguments, populates an internal chunk list and returns no data. A
         chunk is a vertically oriented list of segments. A chunk list is a
         horizontally oriented list and is useful for possible inline styling,
-        line wrapping and word splits of glyph based text."""
+        line wrapping and word splits of glyph based text. With stats
+        enabled each layout is timed and its characters, fallback and
+        placeholder glyphs counted. Markup already laid out by another
+        widget is taken from the shared strip pool instead."""
+
+        global _pool_hits, _pool_misses
+        key = self._pool_key()
+        if key is not None:
+            shared = _strip_pool.get( key )
+            if shared is not None:
+                _pool_hits += 1
+                if stats.enabled:
+                    stats.count( "pool hits", *self._stats_scopes() )
+                self._adopt( shared )
+                return
+            _pool_misses += 1
+        self._shared = None
+        if stats.enabled:
+            start = stats.clock()
+            self._layout_text()
+            scopes = self._stats_scopes()
+            stats.timed( "layouts", start, *scopes )
+            plain = "".join( span for span, style in self._engine.spans( self._source ) )
+            fallbacks, placeholders = stats.glyph_uses( self._engine.face, plain )
+            stats.count( "chars", *scopes, n=len( plain ) )
+            stats.count( "fallbacks", *scopes, n=fallbacks )
+            stats.count( "placeholders", *scopes, n=placeholders )
+        else:
+            self._layout_text()
+        if key is not None:
+            shared = SharedLayout( tuple( self._strips ), tuple( self._rows ), self._chunk_list, self._glyph_layout )
+            _strip_pool[ key ] = shared
+            self._adopt( shared )
+
+    def _adopt(self, shared: SharedLayout) -> None:
+        self._shared = shared
+        self._last_token = " "
+        self._strips = shared.strips
+        self._rows = shared.rows
+        self._chunk_list = shared.chunks
+        self._glyph_layout = shared.layout
 
+    def _layout_text(self) -> None:
         self._last_token = " "
-        a_con = Console()
-        self._chunk_list = []
-        for seg in a_con.render(renderable=self._renderable): 
-            self._chunk_list.append( self.en_glyph(seg[0], seg[1]) )
-            #log( type(seg), repr( seg ) )
-        #Discard the trailing newline automatically added by render()
-        self._chunk_list.pop()
+        if self.wrap:
+            self._chunk_list = []
+            self._lines_to_strips( self._prepared().band_lines( self.size.width ) )
+            return
+        if self.virtual:
+            self._chunk_list = []
+            self._materialize()
+            return
+        previous = self._glyph_layout if self.incremental else None
+        self._glyph_layout = self._engine.relayout( self._source, self.styles.text_style.bold, previous )
+        self._chunk_list = self._glyph_layout.chunks
         self._chunks_to_strips()
 
     def en_glyph(self, text: str, style: StyleType = "" ) -> list:
@@ -118,128 +453,7 @@ class EnGlyph( Static ):
         supercell of glyphs representing the input text.
         """
 
-        try:
-            bbox_height = self.GLYPHS['fixed lines']
-            bbox_width = self.GLYPHS['fixed columns']
-            bbox_align = self.GLYPHS['align']
-            bbox_tracking = self.GLYPHS['tracking']
-            bbox_monospace = self.GLYPHS['monospace']
-            faces_data = self.GLYPHS['character']
-        except:
-            raise Exception("missing required glyph face data")
-
-        #need logic to set these for > 3 row glyphs
-        bbox_cap_row = 0
-        bbox_x_row = 1
-        bbox_base_row = 2
-
-        g_strings: list[str] = ['']*bbox_height
-        chunk = []
-
-        for token in text:
-            #https://gist.github.com/Jonty/6705090 would be better
-            if ord( token ) > 32 and ord( token ) < 127:
-                default = {"glyph":["┌┬┐","├"+token+"┤","└┴┘"]}
-            else:
-                index = "{0:04x}".format( ord(token) )
-                default = {"glyph":[index[0]+"┬"+index[1],"├ ┤",index[2]+"┴"+index[3]]}
-            face = faces_data.get(token, default)
-            Thint = face.get('tracking', bbox_tracking)
-            #Special char pairs that have no proportional spacing 
-            bbox_apairs = self.GLYPHS.get('adjacent',[])
-            bbox_aapairs = self.GLYPHS.get('antiadjacent',[])
-            #determine if the glyphs are placed in fixed width 
-            Mhint = face.get('monospace', bbox_monospace)
-            #Determine vertical number of cells for the glyphs
-            Hhint = face.get('lines', bbox_height)
-            #The nominal max width of a glyph
-            Whint = face.get('columns', bbox_width)
-            Ahint = face.get('align', bbox_align)
-            glyph = face.get('glyph', face )
-            if isinstance( glyph, dict ):
-                if self.styles.text_style.bold:
-                    glyph = glyph.get('bold', glyph )
-                else:
-                    glyph = glyph.get('normal', glyph )
-
-            #determine horizontal glyph placement in supercell
-            if Mhint:
-                if Ahint[0] == "left":
-                    l_pad = 0
-                    r_pad = bbox_width - Whint
-                elif Ahint[0] == "right":
-                    l_pad = bbox_width - Whint
-                    r_pad = 0
-                else:
-                    pad = (bbox_width - Whint)/2.0
-                    if self._last_token == " ":
-                        l_pad = math.ceil(pad)
-                        r_pad = math.floor(pad)
-                    else:
-                        l_pad = math.floor(pad)
-                        r_pad = math.ceil(pad)
-            else:
-                l_pad = r_pad = 0
-
-            #determine horizontal kerning and tracking adjustment
-            if self._last_token+token not in bbox_apairs and Thint > 0:
-                last_face = faces_data.get(self._last_token, {})
-                Khint = face.get('kerning', True)
-                last_Khint = last_face.get('kerning', True)
-                last_Whint = last_face.get('columns', bbox_width)
-                if last_Khint and Khint:
-                    wedge = math.ceil( Thint )
-                else:
-                    wedge = math.ceil( Thint - last_Whint )
-                if self._last_token+token in bbox_aapairs:
-                    wedge += 1
-                if wedge > 0:
-                    if Ahint[0] == "left":
-                        r_pad += wedge
-                    else:
-                        l_pad += wedge
-
-            #determine vertical glyph placement in supercell
-            if Hhint == bbox_height:
-                t_pad = b_pad = 0
-            else:
-                if Ahint[1] == "top":
-                    t_pad = 0
-                    b_pad = bbox_height - Hhint
-                elif Ahint[1] == "bottom":
-                    t_pad = bbox_height - Hhint
-                    b_pad = 0
-                else:
-                    pad = (bbox_height - Hhint)/2.0
-                    t_pad = math.ceil(pad)
-                    b_pad = math.floor(pad)
-
-            #construct line of glyph supercell sequence
-            for row, row_str in enumerate( g_strings ):
-                if row < t_pad or row >= t_pad+Hhint:
-                    g_datum = " "*Whint
-                else:
-                    g_datum = glyph[row - t_pad] 
-                g_strings[row] += " "*l_pad + g_datum + " "*r_pad
-
-            self._last_token = token
-            #process next token or loop finished
-
-        assert len(g_strings) == bbox_height, "Too many rows in glyph stack!"
-        for g_row, g_string in enumerate(g_strings):
-            g_style = style
-            if g_style and g_style.overline and g_row != bbox_cap_row:
-                g_style = g_style + Style(overline = False)
-            if g_style and g_style.strike and g_row != bbox_x_row:
-                g_style = g_style + Style(strike = False)
-            if g_style and g_row != bbox_base_row:
-                if g_style.underline:
-                    g_style = g_style + Style(underline = False)
-                if g_style.underline2:
-                    g_style = g_style + Style(underline2 = False)
-            chunk.append( Segment(g_string, g_style) )
-
-        assert len(chunk) == bbox_height, "Too many segments in chunk!"
-        #log( repr(chunk) )
+        chunk = self._engine.en_glyph( text, style, self.styles.text_style.bold, self._last_token )
+        if text:
+            self._last_token = text[-1]
         return chunk
-
@@ -0,0 +1,241 @@
+"""Persistent cache of finished glyph rows, shared by every process on a host.
+
+Laid out lines (row text and style runs) are stored in a SQLite database
+opened with a memory mapped read path and write ahead logging, so any
+number of processes can read and add entries at once. Entries are keyed
+by a hash of the text, its style, the face, family and bold, and a digest
+of the packaged glyph assets, so editing or re-versioning any face makes
+older entries unreachable. Stale entries are dropped by purge() and the
+least recently used ones once the cache outgrows max_bytes.
+
+CachedEngine lays out through a cache, loading its face only on a miss:
+
+    engine = CachedEngine( "seven_segment", "block/sans" )
+    lines = engine.lines( "[red]12:34[/red]" )
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+import zlib
+
+from collections.abc import Sequence
+from functools import lru_cache
+from pathlib import Path
+from threading import Lock
+from typing import NamedTuple
+
+from rich.segment import Segment
+from rich.style import Style
+from rich.text import Text
+
+from .engine import GlyphEngine, markup_runs, text_runs
+from .faces import read_asset, shipped_faces
+
+DEFAULT_MAX_BYTES = 32 << 20
+"""Bound on the stored (compressed) bytes of a cache."""
+
+SCHEMA = 1
+
+#Seconds a hit may leave an entry's recency stale, saving a write per hit
+TOUCH_SECONDS = 60
+
+class RenderCacheInfo( NamedTuple ):
+    """Counters of a RenderCache: lookups by this process, entries of all."""
+    hits: int
+    misses: int
+    entries: int
+    bytes: int
+
+def default_path() -> Path:
+    root = os.environ.get( "XDG_CACHE_HOME" ) or Path.home() / ".cache"
+    return Path( root ) / "transmoglyphier" / "render.sqlite"
+
+@lru_cache( maxsize=1 )
+def assets_digest() -> str:
+    """SHA-256 over the names and bytes of every packaged glyph face asset."""
+    digest = hashlib.sha256()
+    for Family, Face in shipped_faces():
+        digest.update( ( Family + "/" + Face ).encode() + b"\0" )
+        digest.update( read_asset( Face, Family ) )
+    return digest.hexdigest()
+
+def face_exists( Face: str, Family: str ) -> bool:
+    try:
+        read_asset( Face, Family )
+    except OSError:
+        return False
+    return True
+
+def render_key( text: str | Text, Face: str, Family: str, bold: bool ) -> str:
+    """The cache key of text laid out in a face."""
+    content: list[str | int | None]
+    if isinstance( text, str ):
+        content = [ "markup", text ]
+    else:
+        content = [ "text", text.markup, str( text.style ), text.tab_size ]
+    data = json.dumps( [ SCHEMA, assets_digest(), Family, Face, bool( bold ), content ], ensure_ascii=False )
+    return hashlib.sha256( data.encode() ).hexdigest()
+
+def encode_lines( lines: list[list[Segment]] ) -> bytes:
+    rows = [ [ [ seg.text, str( seg.style ) if seg.style is not None else None ] for seg in line ] for line in lines ]
+    return zlib.compress( json.dumps( rows, ensure_ascii=False, separators=(",", ":") ).encode() )
+
+def decode_lines( value: bytes ) -> list[list[Segment]]:
+    rows = json.loads( zlib.decompress( value ) )
+    return [ [ Segment( text, Style.parse( style ) if style is not None else None ) for text, style in line ] for line in rows ]
+
+def _storable( lines: list[list[Segment]] ) -> bool:
+    """False if a style would not survive the text round trip (click meta)."""
+    return not any( seg.style is not None and seg.style._meta for line in lines for seg in line )
+
+class RenderCache:
+    """Size bounded, multi process cache of laid out glyph lines."""
+
+    def __init__( self, path: str | Path | None = None, max_bytes: int = DEFAULT_MAX_BYTES ) -> None:
+        self.path = Path( path ) if path is not None else default_path()
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = Lock()
+        self.path.parent.mkdir( parents=True, exist_ok=True )
+        self._db = sqlite3.connect( self.path, timeout=30, isolation_level=None, check_same_thread=False )
+        self._db.execute( "PRAGMA journal_mode=WAL" )
+        self._db.execute( "PRAGMA synchronous=NORMAL" )
+        self._db.execute( f"PRAGMA mmap_size={max( max_bytes * 2, 1 << 20 )}" )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS lines ("
+            " key TEXT PRIMARY KEY, digest TEXT NOT NULL, face TEXT NOT NULL,"
+            " value BLOB NOT NULL, size INTEGER NOT NULL, used REAL NOT NULL )"
+            )
+        self._db.execute( "CREATE INDEX IF NOT EXISTS lines_used ON lines ( used )" )
+        self._total = self._size()
+
+    def get( self, key: str ) -> list[list[Segment]] | None:
+        """The lines stored under key, None if there are none."""
+        with self._lock:
+            row = self._db.execute( "SELECT value, used FROM lines WHERE key = ?", ( key, ) ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            now = time.time()
+            if now - row[1] > TOUCH_SECONDS:
+                self._db.execute( "UPDATE lines SET used = ? WHERE key = ?", ( now, key ) )
+        return decode_lines( row[0] )
+
+    def put( self, key: str, Face: str, Family: str, lines: list[list[Segment]] ) -> None:
+        """Store lines under key, then evict the least recently used past max_bytes."""
+        if not _storable( lines ):
+            return
+        value = encode_lines( lines )
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO lines VALUES ( ?, ?, ?, ?, ?, ? )",
+                ( key, assets_digest(), Family + "/" + Face, value, len( value ), time.time() )
+                )
+            self._total += len( value )
+            if self._total > self.max_bytes:
+                self._evict()
+
+    def _size( self ) -> int:
+        return self._db.execute( "SELECT COALESCE( SUM( size ), 0 ) FROM lines" ).fetchone()[0]
+
+    def _evict( self ) -> None:
+        #The running total misses other processes' writes and counts replaced
+        #entries twice, so it only decides when to take the real sum
+        self._total = self._size()
+        if self._total <= self.max_bytes:
+            return
+        #Drop the oldest entries down to 90% of the bound, not one per put
+        excess = self._total - self.max_bytes * 9 // 10
+        doomed = []
+        for key, size in self._db.execute( "SELECT key, size FROM lines ORDER BY used" ):
+            doomed.append( ( key, ) )
+            excess -= size
+            self._total -= size
+            if excess <= 0:
+                break
+        self._db.executemany( "DELETE FROM lines WHERE key = ?", doomed )
+
+    def invalidate( self, Face: str | None = None, Family: str | None = None ) -> int:
+        """Drop the entries of one face, of a family, or all; returns how many."""
+        with self._lock:
+            if Family is None:
+                cursor = self._db.execute( "DELETE FROM lines" )
+            elif Face is None:
+                cursor = self._db.execute( "DELETE FROM lines WHERE face LIKE ? ESCAPE '\\'", ( _like_prefix( Family + "/" ), ) )
+            else:
+                cursor = self._db.execute( "DELETE FROM lines WHERE face = ?", ( Family + "/" + Face, ) )
+            self._total = self._size()
+        return cursor.rowcount
+
+    def purge( self ) -> int:
+        """Drop entries made from glyph assets other than the installed ones."""
+        with self._lock:
+            cursor = self._db.execute( "DELETE FROM lines WHERE digest != ?", ( assets_digest(), ) )
+            self._total = self._size()
+        return cursor.rowcount
+
+    def info( self ) -> RenderCacheInfo:
+        with self._lock:
+            entries, size = self._db.execute( "SELECT COUNT(*), COALESCE( SUM( size ), 0 ) FROM lines" ).fetchone()
+            self._total = size
+        return RenderCacheInfo( self.hits, self.misses, entries, size )
+
+    def close( self ) -> None:
+        with self._lock:
+            self._db.close()
+
+    def __enter__( self ) -> RenderCache:
+        return self
+
+    def __exit__( self, *exc_info ) -> None:
+        self.close()
+
+def _like_prefix( prefix: str ) -> str:
+    return prefix.replace( "\\", "\\\\" ).replace( "%", "\\%" ).replace( "_", "\\_" ) + "%"
+
+class CachedEngine:
+    """The GlyphEngine line API answered from a RenderCache.
+
+    The face is loaded and an engine made on the first miss only, so a
+    warm process never parses face JSON. Raises LookupError up front if
+    the face asset does not exist, and from the first miss if it exists
+    but does not load."""
+
+    def __init__( self, Face: str = "basic_latin", Family: str = "block/sans", bold: bool = False, cache: RenderCache | None = None ) -> None:
+        if not face_exists( Face, Family ):
+            raise LookupError( "unable to load glyph face " + Family + "/" + Face )
+        self.Face = Face
+        self.Family = Family
+        self.bold = bold
+        self.cache = cache if cache is not None else RenderCache()
+        self._engine: GlyphEngine | None = None
+
+    @property
+    def engine( self ) -> GlyphEngine:
+        if self._engine is None:
+            self._engine = GlyphEngine( self.Face, self.Family, self.bold )
+        return self._engine
+
+    def spans( self, text: str | Text ) -> Sequence[tuple[str, Style | None]]:
+        if isinstance( text, str ):
+            return markup_runs( text )
+        return text_runs( text )
+
+    def lines( self, text: str | Text, bold: bool | None = None ) -> list[list[Segment]]:
+        bold = self.bold if bold is None else bold
+        key = render_key( text, self.Face, self.Family, bold )
+        lines = self.cache.get( key )
+        if lines is None:
+            lines = self.engine.lines( text, bold )
+            self.cache.put( key, self.Face, self.Family, lines )
+        return lines
+
+    def rows( self, text: str | Text, bold: bool | None = None ) -> list[str]:
+        return [ "".join( seg.text for seg in line ) for line in self.lines( text, bold ) ]
@@ -0,0 +1,116 @@
+"""Opt-in counters and timers for the glyph hot paths.
+
+Off by default, when every probe is a single test of stats.enabled. Turn
+it on with enable(), or by setting TRANSMOGLYPHIER_STATS in the
+environment. Events are counted per scope, 'face:Family/Face' for faces
+and 'widget:#id' (or the class name and object id) for widgets, so the
+same layout counts against both the widget and its face. Timed events
+also add up their seconds.
+
+Read the counts back with snapshot(), busiest() or report().
+"""
+
+from __future__ import annotations
+
+import os
+
+from collections import Counter, defaultdict
+from collections.abc import Mapping
+from time import perf_counter as clock
+
+enabled = bool( os.environ.get( "TRANSMOGLYPHIER_STATS" ) )
+
+#Events in report column order, others follow alphabetically
+EVENTS = (
+    "face loads",
+    "registry hits",
+    "registry misses",
+    "layout hits",
+    "layout misses",
+    "layouts",
+    "pool hits",
+    "chars",
+    "strips",
+    "fallbacks",
+    "placeholders",
+    "renders",
+    "cells",
+    )
+
+_counts: defaultdict[str, Counter] = defaultdict( Counter )
+_seconds: defaultdict[str, defaultdict[str, float]] = defaultdict( lambda: defaultdict( float ) )
+
+def enable( on: bool = True ) -> None:
+    """Start (or with on False, stop) counting; counts so far are kept."""
+    global enabled
+    enabled = on
+
+def disable() -> None:
+    enable( False )
+
+def reset() -> None:
+    """Forget every count and time."""
+    _counts.clear()
+    _seconds.clear()
+
+def face_scope( Family: str, Face: str ) -> str:
+    return "face:" + Family + "/" + Face
+
+def count( event: str, *scopes: str, n: int = 1 ) -> None:
+    """Add n to event in every scope."""
+    for scope in scopes:
+        _counts[ scope ][ event ] += n
+
+def timed( event: str, start: float, *scopes: str ) -> None:
+    """Count event in every scope and add the seconds since start, a clock() value."""
+    seconds = clock() - start
+    for scope in scopes:
+        _counts[ scope ][ event ] += 1
+        _seconds[ scope ][ event ] += seconds
+
+def glyph_uses( face, text: str ) -> tuple[int, int]:
+    """Characters of text drawn from a fallback face and as placeholders."""
+    fallbacks = placeholders = 0
+    for char in text:
+        if char in face.glyphs or char == "\n":
+            continue
+        if face.covers( char ):
+            fallbacks += 1
+        else:
+            placeholders += 1
+    return fallbacks, placeholders
+
+def snapshot() -> dict[str, dict[str, float]]:
+    """Counts by scope and event, with total seconds as '<event> seconds'."""
+    result = {}
+    for scope, counts in _counts.items():
+        result[ scope ] = dict( counts )
+        for event, seconds in _seconds[ scope ].items():
+            result[ scope ][ event + " seconds" ] = seconds
+    return result
+
+def busiest( event: str = "layouts", n: int = 10, kind: str = "widget" ) -> list[tuple[str, int]]:
+    """The n scopes of a kind ('widget' or 'face') with the most of an event."""
+    scopes = [ ( scope, counts[ event ] ) for scope, counts in _counts.items() if scope.startswith( kind + ":" ) and counts[ event ] ]
+    return sorted( scopes, key=lambda item: item[1], reverse=True )[:n]
+
+def report( data: Mapping[str, Mapping[str, float]] | None = None ) -> str:
+    """A plain text table of a snapshot, by default the current one."""
+    data = snapshot() if data is None else data
+    if not data:
+        return "no glyph stats" + ( "" if enabled else " (disabled)" )
+    seen = { event for counts in data.values() for event in counts if not event.endswith( " seconds" ) }
+    events = [ event for event in EVENTS if event in seen ] + sorted( seen.difference( EVENTS ) )
+    width = max( len( scope ) for scope in data )
+    lines = [ "scope".ljust( width ) + "".join( f" {event:>16}" for event in events ) ]
+    for scope in sorted( data ):
+        counts = data[ scope ]
+        cells = []
+        for event in events:
+            cell = str( counts.get( event, 0 ) )
+            seconds = counts.get( event + " seconds" )
+            if seconds is not None:
+                cell += f" {seconds*1000:.1f}ms"
+            cells.append( f" {cell:>16}" )
+        lines.append( scope.ljust( width ) + "".join( cells ) )
+    return "\n".join( lines )
@@ -1,14 +1,21 @@
+from __future__ import annotations
+
+import asyncio
 import string
 
 from rich.text import Text
 
-from textual import on
+from textual import on, work
 from textual.app import App, ComposeResult
+from textual.binding import Binding
 from textual.containers import Horizontal, Vertical
 from textual.strip import Strip
-from textual.widgets import Static, Header, Footer, Button, DataTable, Label, Input
+from textual.widgets import Static, Header, Footer, Button, Label, Input, Log, OptionList
 
-from glyphs import EnGlyph
+from . import stats
+from .browser import CodePointBrowser
+from .faces import prefetch
+from .glyphs import EnGlyph
 
 class Glyphograph( Static ):
     def render_line( self ) -> Strip:
@@ -27,6 +34,10 @@ class Transmoglyphier(App[None]):
     """
     CSS_PATH = "transmoglyphier.tcss"
 
+    BINDINGS = [
+        Binding( "f9", "toggle_stats", "Glyph stats" ),
+        ]
+
     test_string = "[red]He[/red]llo [blue]Wo[/blue][green]rld[/green]"
     test_list = [
         string.ascii_uppercase,
@@ -40,7 +51,8 @@ class Transmoglyphier(App[None]):
 
     def compose(self) -> ComposeResult:
         self.input = Input(self.test_string) 
-        self.table = DataTable(zebra_stripes=True)
+        self.browser = CodePointBrowser( Family="block/serif", id="code_points" )
+        self.blocks = OptionList( *( block.name for block in self.browser.blocks ), id="choose_blocks" )
         self.t_glyph = EnGlyph( self.test_string, Family="block/serif", id="test_glyphs")
         #yield EnGlyph( "Hello", Face="seven_segment", id="test_glyphs")
         yield Header()
@@ -59,20 +71,68 @@ class Transmoglyphier(App[None]):
                 yield EnGlyph( self.t_glyph.Family, Family="block/serif", id="family_type")
         with Vertical( id="cruizer" ):
             yield Button( "Code Pt Cruizer", id="select_blocks" )
-            yield self.table
-
-    def on_mount(self) -> None:
-        header = ("name", "Dec", "\\uJSON") 
-        self.table.add_columns( *header )
-        for ucp in range( 128 ):
-            char = chr( ucp )
-            if char in string.printable:
-                label = Text( char, style="#B0FC38 italic")
-                row = ("name", ucp, "\\u{0:04x}".format(ucp) )
-                self.table.add_row(*row, height=3, label=label)
+            yield self.blocks
+            yield self.browser
+        yield Log( id="glyph_stats" )
+
+    def on_mount( self ) -> None:
+        prefetch()
+
+    @work( exclusive=True, group="set_face" )
+    async def set_face( self, Face: str, Family: str ) -> None:
+        """Load a face in the background, then switch the test glyphs and browser to it."""
+        try:
+            loaded = await asyncio.gather(
+                self.t_glyph.load_glyphs_async( Face, Family ),
+                self.browser.set_face_async( Face, Family )
+                )
+        except LookupError as error:
+            self.notify( str( error ), severity="error" )
+            return
+        if not loaded[0]:
+            return
+        self.query_one("#face_type").update( self.t_glyph.Face )
+        self.query_one("#family_type").update( self.t_glyph.Family )
+        self.show_tests()
 
     def toggle_choose_blocks_panel( self ) -> None:
-        pass
+        self.blocks.display = not self.blocks.display
+        if self.blocks.display:
+            self.blocks.highlighted = self.browser.block_index
+            self.blocks.focus()
+        else:
+            self.browser.focus()
+
+    @on( OptionList.OptionSelected, "#choose_blocks" )
+    def choose_block( self, event: OptionList.OptionSelected ) -> None:
+        self.browser.jump_to_block( event.option_index )
+        self.toggle_choose_blocks_panel()
+
+    @on( CodePointBrowser.Selected )
+    def insert_code_point( self, event: CodePointBrowser.Selected ) -> None:
+        self.input.insert_text_at_cursor( event.char )
+        self.show_tests()
+
+    def action_toggle_stats( self ) -> None:
+        """Show the glyph stats panel, counting from when it is first shown."""
+        panel = self.query_one( "#glyph_stats", Log )
+        panel.display = not panel.display
+        if panel.display:
+            stats.enable()
+            self.show_stats()
+            self._stats_timer = self.set_interval( 1, self.show_stats )
+        else:
+            self._stats_timer.stop()
+
+    def show_stats( self ) -> None:
+        report = stats.report()
+        busiest = stats.busiest( "layouts", 3 )
+        if busiest:
+            report += "\nmost layouts: " + ", ".join( f"{scope} {count}" for scope, count in busiest )
+        panel = self.query_one( "#glyph_stats", Log )
+        panel.clear()
+        panel.write( report )
+        self.log( report )
 
     def toggle_test_panel( self ) -> None:
         pass
@@ -93,15 +153,19 @@ class Transmoglyphier(App[None]):
             self.show_tests()
 
         elif event.button.id == "set_face":
-            self.t_glyph.load_glyphs( Face="deco_caps", Family="block/art" )
-            self.query_one("#face_type").update( self.t_glyph.Face )
-            self.query_one("#family_type").update( self.t_glyph.Family )
-            self.show_tests()
+            self.set_face( Face="deco_caps", Family="block/art" )
 
         elif event.button.id == "select_blocks":
             self.toggle_choose_blocks_panel()
 
 
-app = Transmoglyphier()
-if __name__ == "__main__":
-    app.run()
+_app: Transmoglyphier | None = None
+
+def __getattr__( name: str ):
+    #The app is built on first use of `app` (textual run), not on import
+    global _app
+    if name == "app":
+        if _app is None:
+            _app = Transmoglyphier()
+        return _app
+    raise AttributeError( f"module {__name__!r} has no attribute {name!r}" )
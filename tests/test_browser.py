@@ -0,0 +1,115 @@
+# SPDX-FileCopyrightText: 2024-present Frisco Rose <friscorose@gmail.com>
+#
+# SPDX-License-Identifier: MIT
+import asyncio
+
+import pytest
+
+from textual.app import App
+
+from transmoglyphier import faces
+from transmoglyphier.browser import BLOCKS, Block, CodePointBrowser, char_name
+
+SHORT = ( Block( 0x41, 0x43, "ABC" ), Block( 0x61, 0x7A, "a to z" ) )
+
+@pytest.fixture( autouse=True )
+def fresh_faces():
+    faces.clear()
+    yield
+    faces.clear()
+
+class Browse( App[None] ):
+    def __init__( self, **kwargs ) -> None:
+        super().__init__()
+        self.kwargs = kwargs
+        self.selected = []
+
+    def compose( self ):
+        yield CodePointBrowser( **self.kwargs )
+
+    def on_code_point_browser_selected( self, event: CodePointBrowser.Selected ) -> None:
+        self.selected.append( event.char )
+
+def browse( test, size=( 100, 12 ), **kwargs ):
+    async def run():
+        app = Browse( **kwargs )
+        async with app.run_test( size=size ) as pilot:
+            await pilot.pause()
+            await test( app.query_one( CodePointBrowser ), pilot )
+    asyncio.run( run() )
+
+@pytest.mark.parametrize( "point, name", [
+    ( 0x41, "LATIN CAPITAL LETTER A" ),
+    ( 0x00, "<control>" ),
+    ( 0x0378, "<unassigned>" ),
+    ( 0xE000, "<Co>" ),
+    ( 0xD800, "<Cs>" ),
+    ] )
+def test_char_name( point, name ):
+    assert char_name( point ) == name
+
+def test_jump_to_block_by_name():
+    async def test( browser, pilot ):
+        browser.scroll_to( 0, 9, animate=False )
+        browser.jump_to_block( "Arrows" )
+        await pilot.pause()
+        assert browser.block.name == browser.border_title == "Arrows"
+        assert browser.virtual_size.height == len( browser.block ) * browser.row_height
+        assert browser.scroll_offset.y == 0
+        with pytest.raises( ValueError ):
+            browser.jump_to_block( "No Such Block" )
+    browse( test )
+
+def test_rows_past_the_block_end_are_blank():
+    async def test( browser, pilot ):
+        height = len( browser.block ) * browser.row_height
+        assert "U+0043" in browser.render_line( height - browser.row_height ).text
+        blank = browser.render_line( height )
+        assert blank.text.strip() == ""
+        assert blank.cell_length == browser.size.width
+    browse( test, blocks=SHORT )
+
+def test_row_cache_is_bounded():
+    async def test( browser, pilot ):
+        browser.ROW_CACHE = 4
+        browser._rows.clear()
+        for row in range( 10 ):
+            browser._row_strips( row )
+        assert list( browser._rows ) == [ 0x61 + row for row in range( 6, 10 ) ]
+        #A cached row is used again and becomes the most recent
+        strips = browser._row_strips( 6 )
+        assert browser._row_strips( 6 ) is strips
+        assert list( browser._rows )[-1] == 0x61 + 6
+    browse( test, blocks=SHORT[1:] )
+
+def test_click_maps_rows_under_scroll():
+    async def test( browser, pilot ):
+        browser.scroll_to( 0, 7, animate=False )
+        await pilot.pause()
+        #Screen line 1 is virtual line 8, the third line of row 2
+        await pilot.click( CodePointBrowser, offset=( 5, 1 ) )
+        await pilot.click( CodePointBrowser, offset=( 5, 2 ) )
+        await pilot.pause()
+        assert pilot.app.selected == [ "c", "d" ]
+    browse( test, blocks=SHORT[1:] )
+
+def test_one_line_face_shows_the_name( monkeypatch ):
+    def load( Face, Family ):
+        return {
+            "fixed lines": 1,
+            "fixed columns": 1,
+            "align": [ "center", "bottom" ],
+            "tracking": 0,
+            "monospace": True,
+            "character": { "A": { "glyph": [ "A" ] } },
+            }
+    monkeypatch.setattr( faces, "load_jface", load )
+    async def test( browser, pilot ):
+        assert browser.row_height == 1
+        line = browser.render_line( 0 ).text
+        assert "U+0041" in line and "LATIN CAPITAL LETTER A" in line
+    browse( test, blocks=SHORT )
+
+def test_blocks_are_ordered_and_disjoint():
+    for block, following in zip( BLOCKS, BLOCKS[1:] ):
+        assert block.start <= block.end < following.start
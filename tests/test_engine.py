@@ -0,0 +1,112 @@
+# SPDX-FileCopyrightText: 2024-present Frisco Rose <friscorose@gmail.com>
+#
+# SPDX-License-Identifier: MIT
+import pytest
+
+from rich.cells import cell_len
+from rich.text import Text
+
+from transmoglyphier.engine import GlyphEngine, GlyphText, chunks_to_lines
+
+UPDATES = [
+    ( "00012", "00013" ),
+    ( "12:59", "13:00" ),
+    ( "Hello", "Help!" ),
+    ( "Hello", "Hello World" ),
+    ( "Hello World", "Hi" ),
+    ( "[red]CPU[/red] 45%", "[red]CPU[/red] 46%" ),
+    ( "[red]CPU[/red] 45%", "[blue]CPU[/blue] 45%" ),
+    ( "[red]CPU[/red] 45% [b]MEM[/b] 3G", "[red]CPU[/red] 45% [b]MEM[/b] 4G" ),
+    ( "[red]CPU[/red] 45% [b]MEM[/b] 3G", "[red]RAM[/red] 45% [b]MEM[/b] 3G" ),
+    ( "AV", "AW" ),
+    ( "A V", "AV" ),
+    ( "", "x" ),
+    ( "x", "" ),
+    ]
+
+def lines( layout ):
+    return chunks_to_lines( layout.chunks )
+
+@pytest.mark.parametrize( "Face", [ "basic_latin", "seven_segment" ] )
+@pytest.mark.parametrize( "bold", [ False, True ] )
+@pytest.mark.parametrize( "before, after", UPDATES )
+def test_relayout_matches_fresh_layout( Face, bold, before, after ):
+    engine = GlyphEngine( Face )
+    previous = engine.relayout( before, bold )
+    assert lines( engine.relayout( after, bold, previous ) ) == lines( engine.relayout( after, bold ) )
+
+def test_relayout_keeps_unchanged_spans():
+    engine = GlyphEngine()
+    previous = engine.relayout( "[red]CPU[/red] 45% [b]MEM[/b] 3G" )
+    layout = engine.relayout( "[red]CPU[/red] 46% [b]MEM[/b] 3G", previous=previous )
+    assert [ new is old for new, old in zip( layout.spans, previous.spans ) ] == [ True, False, True, True ]
+
+def test_relayout_ignores_layout_of_other_face_or_weight():
+    engine = GlyphEngine()
+    other = GlyphEngine( "seven_segment" ).relayout( "12" )
+    assert lines( engine.relayout( "12", previous=other ) ) == engine.lines( "12" )
+    bold = engine.relayout( "12", True )
+    assert lines( engine.relayout( "12", False, bold ) ) == engine.lines( "12", False )
+
+def test_relayout_of_text():
+    engine = GlyphEngine()
+    previous = engine.relayout( Text( "Hello", style="red" ) )
+    text = Text( "Jello", style="red" )
+    assert lines( engine.relayout( text, previous=previous ) ) == engine.lines( text )
+
+TEXTS = [
+    "The Five Boxing Wizards Jump Quickly AV AW 0123",
+    "[red]CPU[/red] 45% [b]MEM[/b] 3G",
+    "one\ntwo  three\n\nfour",
+    "a\tb",
+    ]
+
+def rows( lines ):
+    return [ "".join( seg.text for seg in line ) for line in lines ]
+
+@pytest.mark.parametrize( "Face", [ "basic_latin", "seven_segment" ] )
+@pytest.mark.parametrize( "bold", [ False, True ] )
+@pytest.mark.parametrize( "text", TEXTS )
+def test_measure_matches_laid_out_width( Face, bold, text ):
+    engine = GlyphEngine( Face )
+    size = engine.measure( text, bold )
+    assert size.width == cell_len( engine.rows( text, bold )[0] )
+    assert size.height == engine.face.lines
+    assert GlyphText( engine, text, bold ).width == size.width
+
+@pytest.mark.parametrize( "Face", [ "basic_latin", "seven_segment" ] )
+@pytest.mark.parametrize( "text", TEXTS[:2] )
+def test_window_matches_full_layout( Face, text ):
+    engine = GlyphEngine( Face )
+    full = engine.rows( text )
+    glyph_text = GlyphText( engine, text )
+    for column in range( 0, glyph_text.width, 3 ):
+        for width in ( 1, 5, 17 ):
+            for margin in ( 0, 4 ):
+                start_x, window = glyph_text.window( column, width, margin )
+                window = rows( window )
+                end_x = start_x + cell_len( window[0] )
+                assert start_x <= max( column - margin, 0 )
+                assert end_x >= min( column + width + margin, glyph_text.width )
+                assert window == [ row[ start_x:end_x ] for row in full ]
+
+@pytest.mark.parametrize( "Face", [ "basic_latin", "seven_segment" ] )
+@pytest.mark.parametrize( "width", [ 4, 10, 25 ] )
+@pytest.mark.parametrize( "text", TEXTS )
+def test_wrapped_bands_fit_width( Face, width, text ):
+    engine = GlyphEngine( Face )
+    glyph_text = GlyphText( engine, text )
+    bands = glyph_text.wrap( width )
+    lines = rows( glyph_text.band_lines( width ) )
+    assert len( lines ) == len( bands ) * engine.face.lines
+    assert all( cell_len( line ) <= width for line in lines )
+    #Only the spaces and newlines bands break at are dropped
+    kept = "".join( glyph_text.plain[ start:end ] for start, end in bands )
+    assert "".join( kept.split() ) == "".join( glyph_text.plain.split() )
+
+def test_wrap_breaks_at_spaces_and_newlines():
+    glyph_text = GlyphText( GlyphEngine(), "ab cd\nef" )
+    width = glyph_text.offsets[5]
+    assert [ glyph_text.plain[ start:end ] for start, end in glyph_text.wrap( width ) ] == [ "ab cd", "ef" ]
+    width = glyph_text.offsets[4] - glyph_text.offsets[3]
+    assert [ glyph_text.plain[ start:end ] for start, end in glyph_text.wrap( width ) ] == [ "a", "b", "c", "d", "e", "f" ]
@@ -0,0 +1,174 @@
+# SPDX-FileCopyrightText: 2024-present Frisco Rose <friscorose@gmail.com>
+#
+# SPDX-License-Identifier: MIT
+import threading
+import time
+
+import pytest
+
+from transmoglyphier import faces
+
+@pytest.fixture( autouse=True )
+def fresh_faces():
+    faces.clear()
+    yield
+    faces.clear()
+
+def test_layout_while_fallbacks_load_in_background( monkeypatch ):
+    loading = threading.Event()
+    load_jface = faces.load_jface
+    def slow_load( Face, Family ):
+        if Face == "basic_latin":
+            loading.set()
+            time.sleep( 0.2 )
+        return load_jface( Face, Family )
+    monkeypatch.setattr( faces, "load_jface", slow_load )
+    future = faces.load_async( "seven_segment", "block/sans" )
+    assert loading.wait( 5 )
+    #Handed out by the registry before its fallback chain is resolved
+    compiled = faces.get_compiled( "seven_segment", "block/sans" )
+    rows = compiled.layout( "#+" )
+    assert future.result( 5 ) is compiled
+    assert compiled.covers( "#" )
+    assert compiled.chain == ( compiled, faces.get_compiled( "basic_latin", "block/sans" ) )
+    monkeypatch.undo()
+    faces.clear()
+    assert rows == faces.get_compiled( "seven_segment", "block/sans" ).layout( "#+" )
+
+@pytest.fixture
+def held_loads( monkeypatch ):
+    #load_jface of seven_segment waits until the returned event is set
+    release = threading.Event()
+    loading = threading.Event()
+    load_jface = faces.load_jface
+    def held_load( Face, Family ):
+        if Face == "seven_segment":
+            loading.set()
+            assert release.wait( 5 )
+        return load_jface( Face, Family )
+    monkeypatch.setattr( faces, "load_jface", held_load )
+    yield loading, release
+    release.set()
+
+def test_loaded_faces_do_not_wait_on_background_loads( held_loads ):
+    loading, release = held_loads
+    basic_latin = faces.get_compiled( "basic_latin", "block/sans" )
+    future = faces.load_async( "seven_segment", "block/sans" )
+    assert loading.wait( 5 )
+    looked_up = []
+    def look_up():
+        looked_up.append( faces.get_face( "basic_latin", "block/sans" ) )
+        looked_up.append( faces.load_async( "basic_latin", "block/sans" ).result() )
+        looked_up.append( faces.get_compiled( "basic_latin", "block/sans" ).chain )
+    thread = threading.Thread( target=look_up )
+    thread.start()
+    thread.join( 2 )
+    assert not thread.is_alive() and len( looked_up ) == 3
+    assert looked_up[1] is basic_latin
+    assert not future.done()
+    release.set()
+    assert future.result( 5 ) is faces.get_compiled( "seven_segment", "block/sans" )
+
+def test_clear_drops_loads_in_flight( held_loads ):
+    loading, release = held_loads
+    stale = faces.load_async( "seven_segment", "block/sans" )
+    assert loading.wait( 5 )
+    faces.clear()
+    fresh = faces.load_async( "seven_segment", "block/sans" )
+    assert fresh is not stale
+    release.set()
+    #The load begun before clear() still answers its caller, but is not kept
+    assert stale.result( 5 ) is not fresh.result( 5 )
+    assert faces.get_compiled( "seven_segment", "block/sans" ) is fresh.result()
+
+def synthetic_face( characters, block=() ):
+    return {
+        "fixed lines": 3,
+        "fixed columns": 3,
+        "align": [ "center", "bottom" ],
+        "tracking": 0,
+        "monospace": True,
+        "block": list( block ),
+        "character": { char: { "glyph": [ char * 3 ] * 3 } for char in characters },
+        }
+
+@pytest.fixture
+def synthetic( monkeypatch ):
+    #Made up faces of the test family, specs[ Face ] is ( characters, fallbacks )
+    specs = {}
+    def load( Face, Family ):
+        if Family != "test" or Face not in specs:
+            return False
+        return synthetic_face( *specs[ Face ] )
+    monkeypatch.setattr( faces, "load_jface", load )
+    def face( Face ):
+        return faces.get_compiled( Face, "test" )
+    face.specs = specs
+    return face
+
+def test_fallback_chain_order( synthetic ):
+    synthetic.specs.update( {
+        "a": ( "a", [ "b", "c" ] ),
+        "b": ( "ab", [ "d" ] ),
+        "c": ( "cd", [ "d" ] ),
+        "d": ( "d", [] ),
+        } )
+    a, b, c, d = map( synthetic, "abcd" )
+    assert a.chain == ( a, b, d, c )
+    assert b.chain == ( b, d )
+    assert a.fallback_keys == ( ( "test", "b" ), ( "test", "c" ) )
+
+def test_coverage_follows_chain_order( synthetic ):
+    synthetic.specs.update( {
+        "a": ( "a", [ "b", "c" ] ),
+        "b": ( "ab", [ "d" ] ),
+        "c": ( "cd", [] ),
+        "d": ( "d", [] ),
+        } )
+    a, b, c, d = map( synthetic, "abcd" )
+    assert [ a.face_for( char ) for char in "abcdz" ] == [ a, b, c, d, None ]
+    assert a.covers( "c" ) and not a.covers( "z" )
+    assert a.missing( "abcdz!" ) == { "z", "!" }
+    assert a.renders( "dcba" ) and not a.renders( "az" )
+    assert not b.covers( "c" )
+
+def test_fallback_glyphs_and_placeholders( synthetic ):
+    synthetic.specs.update( {
+        "a": ( "a", [ "b" ] ),
+        "b": ( "b", [] ),
+        } )
+    a, b = map( synthetic, "ab" )
+    assert a.layout( "b" ) == b.layout( "b" ) == [ "bbb" ] * 3
+    assert a.layout( "z" ) == list( faces.placeholder( "z" )["glyph"] )
+    assert a.layout( "é" ) == list( faces.placeholder( "é" )["glyph"] )
+
+def test_missing_fallback_is_skipped( synthetic ):
+    synthetic.specs.update( {
+        "a": ( "a", [ "gone", "b" ] ),
+        "b": ( "b", [ "gone" ] ),
+        } )
+    a, b = map( synthetic, "ab" )
+    assert a.chain == ( a, b )
+    assert b.chain == ( b, )
+    assert a.covers( "b" )
+    with pytest.raises( LookupError ):
+        synthetic( "gone" )
+
+@pytest.mark.parametrize( "first", "abc" )
+def test_fallback_cycles( synthetic, first ):
+    synthetic.specs.update( {
+        "a": ( "a", [ "b" ] ),
+        "b": ( "b", [ "c" ] ),
+        "c": ( "c", [ "a" ] ),
+        "x": ( "x", [ "y" ] ),
+        "y": ( "y", [ "x", "y" ] ),
+        } )
+    #Whichever face of the cycle is resolved first
+    synthetic( first ).chain
+    a, b, c, x, y = map( synthetic, "abcxy" )
+    assert a.chain == ( a, b, c )
+    assert b.chain == ( b, c, a )
+    assert c.chain == ( c, a, b )
+    assert x.chain == ( x, y ) and y.chain == ( y, x )
+    assert all( face.renders( "abc" ) for face in ( a, b, c ) )
+    assert y.face_for( "x" ) is x and y.face_for( "y" ) is y
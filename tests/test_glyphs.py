@@ -0,0 +1,178 @@
+# SPDX-FileCopyrightText: 2024-present Frisco Rose <friscorose@gmail.com>
+#
+# SPDX-License-Identifier: MIT
+import asyncio
+import gc
+
+import pytest
+
+from textual.app import App
+from textual.geometry import Region
+
+from transmoglyphier import glyphs
+from transmoglyphier.glyphs import EnGlyph, _common_ends, _dirty_region, strip_pool_info
+
+@pytest.mark.parametrize( "a, b, ends", [
+    ( "abcdef", "abXdef", ( 2, 3 ) ),
+    ( "abcdef", "Xbcdef", ( 0, 5 ) ),
+    ( "abcdef", "abcdeX", ( 5, 0 ) ),
+    ( "abcdef", "aXcdXf", ( 1, 1 ) ),
+    ( "▀▄█▀", "▀██▀", ( 1, 2 ) ),
+    ( "a𝄞b", "a𝄢b", ( 1, 1 ) ),
+    ( "abcdef", "abXef", ( 2, 2 ) ),
+    ( "aaa", "aaaa", ( 3, 0 ) ),
+    ( "", "ab", ( 0, 0 ) ),
+    ] )
+def test_common_ends( a, b, ends ):
+    assert _common_ends( a, b ) == ends
+
+def test_dirty_region_unchanged():
+    assert _dirty_region( [ "ab", "cd" ], [ "ab", "cd" ] ) is None
+
+def test_dirty_region_spans_every_row():
+    old = [ "abcdef", "ghijkl", "mnopqr" ]
+    new = [ "abXdef", "ghijkl", "mnopYr" ]
+    assert _dirty_region( old, new ) == Region( 2, 0, 3, 3 )
+
+def test_dirty_region_of_longer_and_shorter_rows():
+    assert _dirty_region( [ "abc" ], [ "abcde" ] ) == Region( 3, 0, 2, 1 )
+    assert _dirty_region( [ "abcde" ], [ "abc" ] ) == Region( 3, 0, 2, 1 )
+
+def test_dirty_region_counts_cells_not_characters():
+    assert _dirty_region( [ "全角a" ], [ "全角b" ] ) == Region( 4, 0, 1, 1 )
+
+def test_dirty_region_of_shared_rows():
+    assert _dirty_region( ( "ab", "cd" ), [ "ab", "cd" ] ) is None
+    assert _dirty_region( ( "abc", "def" ), [ "abc", "dXf" ] ) == Region( 1, 0, 1, 2 )
+
+class Counters( App[None] ):
+    CSS = """
+    .heavy { text-style: bold; }
+    """
+
+    def compose( self ):
+        yield EnGlyph( "00012", Face="seven_segment", incremental=True, id="incremental" )
+        yield EnGlyph( "00012", Face="seven_segment", id="full" )
+
+def rows( widget ):
+    return [ widget.render_line( row ).text for row in range( widget._engine.face.lines ) ]
+
+@pytest.mark.parametrize( "texts", [
+    [ "00013", "00099", "00100" ],
+    [ "[red]00012[/red]", "[red]000[/red]13", "12345678" ],
+    ] )
+def test_incremental_update_matches_full_update( texts ):
+    async def run():
+        app = Counters()
+        async with app.run_test() as pilot:
+            await pilot.pause()
+            incremental = app.query_one( "#incremental", EnGlyph )
+            full = app.query_one( "#full", EnGlyph )
+            rows( incremental )
+            for text in texts:
+                incremental.update( text )
+                full.update( text )
+                await pilot.pause()
+                assert rows( incremental ) == rows( full )
+                assert [ strip._segments for strip in incremental._strips ] == [ strip._segments for strip in full._strips ]
+    asyncio.run( run() )
+
+def test_incremental_update_repaints_changed_columns():
+    async def run():
+        app = Counters()
+        async with app.run_test() as pilot:
+            await pilot.pause()
+            widget = app.query_one( "#incremental", EnGlyph )
+            rows( widget )
+            painted = []
+            widget.refresh = lambda *regions, **kwargs: painted.extend( regions or [ None ] )
+            widget.update( "00013" )
+            assert painted and painted[0] is not None
+            assert painted[0].width < widget.size.width
+    asyncio.run( run() )
+
+def test_layout_follows_style_changes():
+    async def run():
+        app = Counters()
+        async with app.run_test() as pilot:
+            await pilot.pause()
+            widget = app.query_one( "#full", EnGlyph )
+            assert rows( widget ) == widget._engine.rows( "00012", False )
+            widget.styles.text_style = "bold"
+            await pilot.pause()
+            assert rows( widget ) == widget._engine.rows( "00012", True )
+    asyncio.run( run() )
+
+def test_layout_follows_css_class_changes():
+    async def run():
+        app = Counters()
+        async with app.run_test() as pilot:
+            await pilot.pause()
+            widget = app.query_one( "#full", EnGlyph )
+            rows( widget )
+            widget.add_class( "heavy" )
+            await pilot.pause()
+            assert rows( widget ) == widget._engine.rows( "00012", True )
+            widget.remove_class( "heavy" )
+            await pilot.pause()
+            assert rows( widget ) == widget._engine.rows( "00012", False )
+    asyncio.run( run() )
+
+class Wrapped( App[None] ):
+    def compose( self ):
+        yield EnGlyph( "The Five Boxing Wizards", wrap=True )
+
+def test_wrapped_layout_follows_resize():
+    async def run():
+        app = Wrapped()
+        async with app.run_test( size=( 80, 24 ) ) as pilot:
+            await pilot.pause()
+            widget = app.query_one( EnGlyph )
+            wide = len( widget._strips )
+            await pilot.resize_terminal( 30, 24 )
+            await pilot.pause()
+            rows( widget )
+            assert len( widget._strips ) > wide
+            assert max( strip.cell_length for strip in widget._strips ) <= 30
+    asyncio.run( run() )
+
+class Twins( App[None] ):
+    def compose( self ):
+        yield EnGlyph( "[red]Twin[/red] peaks", id="one" )
+        yield EnGlyph( "[red]Twin[/red] peaks", id="two" )
+        yield EnGlyph( "[red]Twin[/red] peaks", shared=False, id="alone" )
+
+def test_identical_widgets_share_one_pooled_layout():
+    async def run():
+        app = Twins()
+        async with app.run_test() as pilot:
+            await pilot.pause()
+            one, two, alone = ( app.query_one( f"#{name}", EnGlyph ) for name in ( "one", "two", "alone" ) )
+            assert rows( one ) == rows( two ) == rows( alone )
+            key = one._pool_key()
+            assert key == two._pool_key() and alone._pool_key() is None
+            assert one._shared is two._shared is glyphs._strip_pool[ key ]
+            assert one._strips is two._strips
+            assert alone._shared is None
+            hits = strip_pool_info().hits
+            two.update( "[red]Twin[/red] peaks" )
+            rows( two )
+            assert strip_pool_info().hits == hits + 1
+            assert two._shared is one._shared
+    asyncio.run( run() )
+
+def test_pooled_layout_lives_while_a_widget_shows_it():
+    #Unmounted, so nothing but the widgets holds their layout
+    one = EnGlyph( "[blue]Twin[/blue] lakes" )
+    two = EnGlyph( "[blue]Twin[/blue] lakes" )
+    assert rows( one ) == rows( two )
+    key = one._pool_key()
+    assert one._shared is two._shared is glyphs._strip_pool[ key ]
+    layouts = strip_pool_info().layouts
+    del one
+    gc.collect()
+    assert key in glyphs._strip_pool
+    del two
+    gc.collect()
+    assert key not in glyphs._strip_pool
+    assert strip_pool_info().layouts == layouts - 1
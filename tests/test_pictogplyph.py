@@ -0,0 +1,139 @@
+# SPDX-FileCopyrightText: 2024-present Frisco Rose <friscorose@gmail.com>
+#
+# SPDX-License-Identifier: MIT
+import re
+
+import pytest
+
+np = pytest.importorskip( "numpy" )
+Image = pytest.importorskip( "PIL.Image" )
+pytest.importorskip( "rich_pixels" )
+
+import pictogplyph  # noqa: E402
+from pictogplyph import FrameRenderer, FrameStats, GlyphAtlas, OctantCellRenderer, QuadrantCellRenderer, SextantCellRenderer  # noqa: E402
+
+from PIL import ImageFont  # noqa: E402
+from rich.segment import Segment  # noqa: E402
+
+RENDERERS = [ OctantCellRenderer, SextantCellRenderer, QuadrantCellRenderer ]
+
+def noise( width, height ):
+    pixels = np.random.default_rng( 7 ).integers( 0, 256, ( height, width, 4 ), dtype=np.uint8 )
+    return Image.fromarray( pixels, "RGBA" )
+
+def banded( renderer, image, resize, band_rows ):
+    segments = []
+    for row in renderer.render_bands( image, resize, band_rows=band_rows ):
+        segments.extend( row )
+        segments.append( Segment( "\n", renderer.null_style ) )
+    return segments
+
+@pytest.mark.parametrize( "Renderer", RENDERERS )
+@pytest.mark.parametrize( "size, resize", [
+    ( (161, 97), None ),
+    ( (300, 200), None ),
+    ( (640, 480), (161, 97) ),
+    ( (120, 90), (300, 200) ),
+    ] )
+@pytest.mark.parametrize( "band_rows", [ 1, 7, 16 ] )
+def test_bands_match_whole_render( Renderer, size, resize, band_rows ):
+    image = noise( *size )
+    renderer = Renderer()
+    assert banded( renderer, image, resize, band_rows ) == renderer.render( image, resize )
+
+@pytest.fixture
+def default_font( monkeypatch ):
+    #Pillow's bundled font stands in for a font file under any path
+    monkeypatch.setattr( pictogplyph, "load_font", lambda font_path, size: ImageFont.load_default( size ) )
+
+def test_atlas_hits_cached_bitmaps( default_font ):
+    atlas = GlyphAtlas()
+    bitmap = atlas.bitmap( "any.ttf", 12, "A" )
+    assert ( atlas.hits, atlas.misses ) == ( 0, 1 )
+    assert bitmap.dtype == bool and bitmap.shape == ( 15, 8 ) and bitmap.any()
+    assert atlas.bitmap( "any.ttf", 12, "A" ) is bitmap
+    assert ( atlas.hits, atlas.misses ) == ( 1, 1 )
+    #Size is part of the key
+    assert atlas.bitmap( "any.ttf", 16, "A" ) is not bitmap
+    assert ( atlas.hits, atlas.misses ) == ( 1, 2 )
+    phrase = atlas.phrase( "any.ttf", 12, "AA" )
+    assert ( phrase == np.hstack( [ bitmap, bitmap ] ) ).all()
+    assert ( atlas.hits, atlas.misses ) == ( 3, 2 )
+    atlas.clear()
+    assert ( atlas.hits, atlas.misses ) == ( 0, 0 )
+    assert atlas.bitmap( "any.ttf", 12, "A" ) is not bitmap
+
+def test_atlas_evicts_least_recently_used( default_font ):
+    atlas = GlyphAtlas( maxsize=2 )
+    a = atlas.bitmap( "any.ttf", 12, "a" )
+    b = atlas.bitmap( "any.ttf", 12, "b" )
+    #Using a makes b the least recent, so c evicts b
+    assert atlas.bitmap( "any.ttf", 12, "a" ) is a
+    atlas.bitmap( "any.ttf", 12, "c" )
+    assert list( atlas._bitmaps ) == [ ( "any.ttf", 12, "a" ), ( "any.ttf", 12, "c" ) ]
+    assert atlas.bitmap( "any.ttf", 12, "a" ) is a
+    assert atlas.bitmap( "any.ttf", 12, "b" ) is not b
+    assert ( atlas.hits, atlas.misses ) == ( 2, 4 )
+
+def test_atlas_cells_are_keyed_by_renderer_settings( default_font ):
+    atlas = GlyphAtlas()
+    cells = atlas.cells( "any.ttf", 12, "A", OctantCellRenderer() )
+    #Bitmap then cells missed
+    assert ( atlas.hits, atlas.misses ) == ( 0, 2 )
+    assert len( cells ) == 4 and all( len( row ) == 4 for row in cells )
+    assert atlas.cells( "any.ttf", 12, "A", OctantCellRenderer() ) is cells
+    assert ( atlas.hits, atlas.misses ) == ( 1, 2 )
+    #Other settings render the cached bitmap again
+    assert atlas.cells( "any.ttf", 12, "A", OctantCellRenderer( mono=True ) ) is not cells
+    assert ( atlas.hits, atlas.misses ) == ( 2, 3 )
+
+ANSI = re.compile( r"\x1b\[[0-9;]*[Hm]" )
+
+def moves( text ):
+    return re.findall( r"\x1b\[(\d+);(\d+)H", text )
+
+def repaint( image, x, y, renderer ):
+    #Fill one cell with a color noise never gives it
+    pixels = np.array( image )
+    pixels[ y * renderer.y_pixels:( y + 1 ) * renderer.y_pixels, x * renderer.x_pixels:( x + 1 ) * renderer.x_pixels ] = ( 1, 2, 3, 255 )
+    return Image.fromarray( pixels, "RGBA" )
+
+@pytest.mark.parametrize( "Renderer", RENDERERS )
+def test_unchanged_frame_emits_nothing( Renderer ):
+    image = noise( 24, 24 )
+    frames = FrameRenderer( Renderer() )
+    first = frames.frame( image )
+    columns, rows = 24 // frames.renderer.x_pixels, 24 // frames.renderer.y_pixels
+    assert frames.last.cells == columns * rows
+    assert len( ANSI.sub( "", first ) ) == columns * rows
+    assert frames.frame( image.copy() ) == ""
+    assert frames.last == FrameStats( 0, 0 )
+
+@pytest.mark.parametrize( "Renderer", RENDERERS )
+def test_changed_cell_repaints_only_its_cell( Renderer ):
+    image = noise( 24, 24 )
+    frames = FrameRenderer( Renderer(), origin=( 2, 5 ) )
+    frames.frame( image )
+    text = frames.frame( repaint( image, 3, 1, frames.renderer ) )
+    assert moves( text ) == [ ( "4", "9" ) ]
+    assert len( ANSI.sub( "", text ) ) == 1
+    assert frames.last == FrameStats( 1, len( text.encode( "utf-8" ) ) )
+
+def test_adjacent_changed_cells_share_one_move():
+    image = noise( 24, 24 )
+    frames = FrameRenderer( OctantCellRenderer() )
+    frames.frame( image )
+    renderer = frames.renderer
+    text = frames.frame( repaint( repaint( repaint( image, 4, 2, renderer ), 5, 2, renderer ), 1, 4, renderer ) )
+    assert moves( text ) == [ ( "3", "5" ), ( "5", "2" ) ]
+    assert len( ANSI.sub( "", text ) ) == 3
+    assert frames.last.cells == 3
+
+def test_reset_and_delta_off_redraw_every_cell():
+    image = noise( 24, 24 )
+    frames = FrameRenderer( OctantCellRenderer() )
+    full = frames.frame( image )
+    frames.reset()
+    assert frames.frame( image ) == full
+    frames.delta = False
+    assert frames.frame( image ) == full
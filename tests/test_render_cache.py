@@ -0,0 +1,106 @@
+# SPDX-FileCopyrightText: 2024-present Frisco Rose <friscorose@gmail.com>
+#
+# SPDX-License-Identifier: MIT
+import io
+import sys
+
+import pytest
+
+from transmoglyphier import faces, render_cache
+from transmoglyphier.cli import main
+from transmoglyphier.engine import GlyphEngine
+from transmoglyphier.render_cache import CachedEngine, RenderCache
+
+@pytest.fixture( autouse=True )
+def fresh_faces():
+    faces.clear()
+    yield
+    faces.clear()
+
+@pytest.fixture
+def cache( tmp_path ):
+    with RenderCache( tmp_path / "render.sqlite" ) as cache:
+        yield cache
+
+def test_miss_then_hit( cache ):
+    engine = CachedEngine( "seven_segment", "block/sans", cache=cache )
+    expected = GlyphEngine( "seven_segment", "block/sans" ).lines( "[red]12[/red]:34" )
+    assert engine.lines( "[red]12[/red]:34" ) == expected
+    assert engine.lines( "[red]12[/red]:34" ) == expected
+    info = cache.info()
+    assert ( info.hits, info.misses, info.entries ) == ( 1, 1, 1 )
+
+def test_hit_does_not_load_face( cache ):
+    CachedEngine( cache=cache ).rows( "Hello" )
+    warm = CachedEngine( cache=cache )
+    assert warm.rows( "Hello" ) == GlyphEngine().rows( "Hello" )
+    assert warm._engine is None
+
+def test_keys_differ_by_face_and_bold( cache ):
+    keys = {
+        render_cache.render_key( "12", Face, "block/sans", bold )
+        for Face in ( "basic_latin", "seven_segment" )
+        for bold in ( False, True )
+        }
+    assert len( keys ) == 4
+
+def test_evicts_least_recently_used( tmp_path ):
+    engine = GlyphEngine()
+    lines = engine.lines( "The Five Boxing Wizards Jump Quickly 0123456789" )
+    with RenderCache( tmp_path / "render.sqlite", max_bytes=1 << 20 ) as cache:
+        cache.put( "probe", "basic_latin", "block/sans", lines )
+        size = cache.info().bytes
+    with RenderCache( tmp_path / "small.sqlite", max_bytes=size * 5 ) as cache:
+        for n in range( 20 ):
+            cache.put( f"key{n}", "basic_latin", "block/sans", lines )
+            assert cache.info().bytes <= cache.max_bytes
+        assert cache.get( "key0" ) is None
+        assert cache.get( "key19" ) == lines
+        assert cache._total == cache.info().bytes
+
+def test_replacing_an_entry_does_not_evict( tmp_path ):
+    lines = GlyphEngine().lines( "Hello" )
+    with RenderCache( tmp_path / "render.sqlite", max_bytes=1 << 20 ) as cache:
+        cache.put( "probe", "basic_latin", "block/sans", lines )
+        size = cache.info().bytes
+    with RenderCache( tmp_path / "small.sqlite", max_bytes=size * 3 ) as cache:
+        cache.put( "kept", "basic_latin", "block/sans", lines )
+        for n in range( 10 ):
+            cache.put( "replaced", "basic_latin", "block/sans", lines )
+        assert cache.get( "kept" ) == lines
+        assert cache.info().entries == 2
+
+def test_invalidate( cache ):
+    for Family, Face in ( ( "block/sans", "basic_latin" ), ( "block/sans", "seven_segment" ), ( "block/serif", "basic_latin" ) ):
+        CachedEngine( Face, Family, cache=cache ).lines( "12" )
+    assert cache.invalidate( "seven_segment", "block/sans" ) == 1
+    assert cache.invalidate( Family="block/sans" ) == 1
+    assert cache.info().entries == 1
+    assert cache.invalidate() == 1
+    assert cache.info().entries == 0
+    assert cache._total == 0
+
+def test_invalidate_family_is_a_prefix_not_a_pattern( cache ):
+    CachedEngine( "basic_latin", "block/serif", cache=cache ).lines( "12" )
+    assert cache.invalidate( Family="block_serif" ) == 0
+    assert cache.info().entries == 1
+
+def test_purge_drops_other_assets( cache, monkeypatch ):
+    engine = CachedEngine( cache=cache )
+    monkeypatch.setattr( render_cache, "assets_digest", lambda: "older" )
+    engine.lines( "old" )
+    monkeypatch.undo()
+    engine.lines( "new" )
+    assert cache.purge() == 1
+    assert cache.info().entries == 1
+
+def test_unknown_face():
+    with pytest.raises( LookupError ):
+        CachedEngine( "no_such_face" )
+
+def test_cli_reports_face_that_fails_to_load( tmp_path, monkeypatch, capsys ):
+    monkeypatch.setattr( faces, "load_jface", lambda Face, Family: False )
+    monkeypatch.setattr( sys, "stdin", io.StringIO( "Hello\n" ) )
+    status = main( [ "render", "--cache", str( tmp_path / "render.sqlite" ), "--color-system", "none" ] )
+    assert status == 2
+    assert "unable to load glyph face block/sans/basic_latin" in capsys.readouterr().err
@@ -0,0 +1,89 @@
+# SPDX-FileCopyrightText: 2024-present Frisco Rose <friscorose@gmail.com>
+#
+# SPDX-License-Identifier: MIT
+import pytest
+
+from transmoglyphier import faces, stats
+from transmoglyphier.glyphs import EnGlyph
+
+@pytest.fixture( autouse=True )
+def fresh_stats():
+    enabled = stats.enabled
+    stats.reset()
+    faces.clear()
+    yield
+    stats.enable( enabled )
+    stats.reset()
+    faces.clear()
+
+def show( widget ):
+    return [ widget.render_line( row ) for row in range( 3 ) ]
+
+def test_disabled_probes_count_nothing():
+    stats.disable()
+    show( EnGlyph( "Hello #1", id="quiet" ) )
+    faces.get_compiled( "basic_latin", "block/sans" )
+    assert stats.snapshot() == {}
+    assert stats.busiest() == []
+    assert stats.report() == "no glyph stats (disabled)"
+
+def test_enabled_probes_count_faces_and_widgets():
+    stats.enable()
+    widget = EnGlyph( "Hi ☃", Face="seven_segment", shared=False, id="loud" )
+    show( widget )
+    show( widget )
+    data = stats.snapshot()
+    face = data[ stats.face_scope( "block/sans", "seven_segment" ) ]
+    assert face[ "face loads" ] == 1 and face[ "face loads seconds" ] > 0
+    assert face[ "registry misses" ] == 1
+    counts = data[ "widget:#loud" ]
+    assert counts[ "layouts" ] == 1
+    assert counts[ "layout misses" ] == 1 and counts[ "layout hits" ] == 5
+    assert counts[ "chars" ] == 4
+    assert counts[ "strips" ] == 3
+    assert counts[ "placeholders" ] == 1
+    #The widget's layout also counts against its face
+    assert face[ "layouts" ] == 1
+
+def test_count_and_timed():
+    stats.count( "chars", "widget:#a", "face:x/y", n=3 )
+    stats.count( "chars", "widget:#a" )
+    stats.timed( "layouts", stats.clock(), "widget:#a" )
+    data = stats.snapshot()
+    assert data[ "widget:#a" ][ "chars" ] == 4
+    assert data[ "face:x/y" ] == { "chars": 3 }
+    assert data[ "widget:#a" ][ "layouts" ] == 1
+    assert data[ "widget:#a" ][ "layouts seconds" ] >= 0
+    stats.reset()
+    assert stats.snapshot() == {}
+
+def test_glyph_uses():
+    face = faces.get_compiled( "seven_segment", "block/sans" )
+    assert face.chain[1:] and "#" not in face.glyphs and face.covers( "#" )
+    assert stats.glyph_uses( face, "AB#☃☂\n" ) == ( 1, 2 )
+
+def test_busiest():
+    for scope, n in ( ( "widget:#a", 2 ), ( "widget:#b", 5 ), ( "widget:#c", 1 ), ( "face:x/y", 9 ) ):
+        stats.count( "layouts", scope, n=n )
+    stats.count( "chars", "widget:#d" )
+    assert stats.busiest() == [ ( "widget:#b", 5 ), ( "widget:#a", 2 ), ( "widget:#c", 1 ) ]
+    assert stats.busiest( n=1 ) == [ ( "widget:#b", 5 ) ]
+    assert stats.busiest( kind="face" ) == [ ( "face:x/y", 9 ) ]
+    assert stats.busiest( "chars" ) == [ ( "widget:#d", 1 ) ]
+
+def test_report():
+    stats.enable()
+    stats.count( "zebras", "widget:#a" )
+    stats.count( "chars", "widget:#a", n=12 )
+    stats.count( "face loads", "face:x/y" )
+    stats.timed( "layouts", stats.clock() - 0.5, "widget:#a" )
+    header, face, widget = stats.report().splitlines()
+    #Known events in column order, others after them
+    assert header.split() == [ "scope", "face", "loads", "layouts", "chars", "zebras" ]
+    assert face.split()[:2] == [ "face:x/y", "1" ]
+    scope, loads, layouts, seconds, chars, zebras = widget.split()
+    assert ( scope, loads, layouts, chars, zebras ) == ( "widget:#a", "0", "1", "12", "1" )
+    assert seconds.endswith( "ms" ) and float( seconds[:-2] ) >= 500
+    assert stats.report( { "widget:#z": { "renders": 2 } } ).splitlines()[1].split() == [ "widget:#z", "2" ]
+    stats.reset()
+    assert stats.report() == "no glyph stats"
@@ -0,0 +1,63 @@
+"""Time to first row and peak memory of banded against whole image rendering.
+
+Renders a tall image (the reference image resized to --size) with the
+octant renderer in one piece and through render_bands, in process and
+with a worker pool, reporting time to the first row, total time and the
+peak traced Python memory of a second run. Output rows are consumed and
+dropped, as a streaming writer would. Run from the repository root:
+
+    python tooling/bench_bands.py [--size 640 8000] [--band-rows 16] [--workers 4]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import time
+import tracemalloc
+
+from collections.abc import Callable, Iterable
+from pathlib import Path
+
+from PIL import Image
+
+from pictogplyph import OctantCellRenderer, cell_style
+
+def measure( rows: Callable[[], Iterable] ) -> tuple[float, float, float]:
+    """Time to first row and total, then peak MiB in a second traced run."""
+    start = time.perf_counter()
+    first = None
+    for row in rows():
+        if first is None:
+            first = time.perf_counter() - start
+    took = time.perf_counter() - start
+    cell_style.cache_clear()
+    tracemalloc.start()
+    for row in rows():
+        pass
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return first or took, took, peak / 2**20
+
+def main() -> None:
+    parser = argparse.ArgumentParser( description=__doc__.splitlines()[0] )
+    parser.add_argument( "--image", default=str( Path( __file__ ).with_name( "north-pole.png" ) ) )
+    parser.add_argument( "--size", type=int, nargs=2, default=(640, 8000) )
+    parser.add_argument( "--band-rows", type=int, default=16 )
+    parser.add_argument( "--workers", type=int, default=os.cpu_count() or 1 )
+    args = parser.parse_args()
+
+    with Image.open( args.image ) as image:
+        image = image.convert( "RGB" ).resize( tuple( args.size ) )
+    renderer = OctantCellRenderer()
+
+    runs = {
+        "whole image": lambda: iter( renderer.render( image, None ) ),
+        "bands": lambda: renderer.render_bands( image, band_rows=args.band_rows ),
+        f"bands workers={args.workers}": lambda: renderer.render_bands( image, band_rows=args.band_rows, workers=args.workers ),
+        }
+    for label, rows in runs.items():
+        first, took, peak = measure( rows )
+        print( f"{label:20} first row {first*1000:9.1f}ms  total {took:7.2f}s  peak {peak:8.1f}MiB" )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Scaling benchmark of batch glyph rendering across worker processes.
+
+Times a corpus of short banner strings rendered by a single process
+calling GlyphEngine.en_glyph directly (layout only, no markup) and
+GlyphEngine.rows (the full pipeline), then through render_batch with 1 to
+N workers. Every run starts cold: the parsed markup caches and the face
+registry (with each face's memoized pair cells) are cleared first, so no
+run, and no worker forked for it, reuses layout done by an earlier one.
+Speedups are against the cold single process full pipeline. Run with the
+package installed (pip install -e .):
+
+    python tooling/bench_batch.py [--count 100000] [--workers 8]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import string
+import time
+
+from transmoglyphier import faces
+from transmoglyphier.batch import render_batch
+from transmoglyphier.engine import GlyphEngine, markup_runs, markup_text, row_style
+
+
+def corpus( count: int, seed: int = 1 ) -> list[str]:
+    rng = random.Random( seed )
+    words = [ "OK", "WARN", "FAIL", "Node", "[red]down[/red]", "[green]up[/green]", "12:34", "Disk", "Load" ]
+    lines = []
+    for n in range( count ):
+        lines.append( " ".join( rng.choice( words ) for w in range( rng.randint( 1, 5 ) ) )
+                      + " " + "".join( rng.choice( string.digits ) for d in range( 3 ) ) )
+    return lines
+
+
+def cold() -> None:
+    """Drop every process wide cache a run could inherit from the one before."""
+    markup_text.cache_clear()
+    markup_runs.cache_clear()
+    row_style.cache_clear()
+    faces.placeholder.cache_clear()
+    faces.clear()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser( description=__doc__.splitlines()[0] )
+    parser.add_argument( "--count", type=int, default=100000, help="strings in the corpus" )
+    parser.add_argument( "--workers", type=int, default=os.cpu_count() or 1, help="largest pool size" )
+    parser.add_argument( "--chunk-size", type=int, default=256 )
+    parser.add_argument( "--face", default="basic_latin" )
+    parser.add_argument( "--family", default="block/sans" )
+    args = parser.parse_args()
+
+    texts = corpus( args.count )
+
+    #Engines are made inside the timed span, as render_batch's workers do
+    cold()
+    start = time.perf_counter()
+    engine = GlyphEngine( args.face, args.family )
+    for text in texts:
+        engine.en_glyph( text )
+    took = time.perf_counter() - start
+    print( f"{'single process en_glyph':24} {took:8.2f}s {args.count/took:10.0f} strings/s" )
+
+    cold()
+    start = time.perf_counter()
+    engine = GlyphEngine( args.face, args.family )
+    for text in texts:
+        engine.rows( text )
+    base = time.perf_counter() - start
+    print( f"{'single process rows':24} {base:8.2f}s {args.count/base:10.0f} strings/s" )
+
+    workers = 1
+    while True:
+        cold()
+        start = time.perf_counter()
+        for rows in render_batch( texts, args.face, args.family, workers=workers, chunk_size=args.chunk_size ):
+            pass
+        took = time.perf_counter() - start
+        print( f"{'render_batch workers=' + str(workers):24} {took:8.2f}s {args.count/took:10.0f} strings/s {base/took:6.2f}x" )
+        if workers >= args.workers:
+            break
+        workers = min( workers * 2, args.workers )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Layouts and memory of a dashboard of repeated EnGlyph labels.
+
+Mounts a grid of widgets cycling through a handful of labels (status
+words, units, column headers) in the seven_segment and block/serif faces,
+paints every row once, and reports the layouts done, the time taken and
+the Python memory the painted layouts hold, with the shared strip pool
+and with every widget laying out its own copy. Run with the package
+installed (pip install -e .):
+
+    python tooling/bench_dashboard.py [--widgets 400]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+import time
+import tracemalloc
+
+from textual.app import App, ComposeResult
+
+from transmoglyphier import stats
+from transmoglyphier.glyphs import EnGlyph, strip_pool_info
+
+LABELS = [
+    ( "OK", "seven_segment", "block/sans" ),
+    ( "FAIL", "seven_segment", "block/sans" ),
+    ( "kPa", "basic_latin", "block/serif" ),
+    ( "[bold]Node[/bold]", "basic_latin", "block/serif" ),
+    ( "[red]Load[/red]", "basic_latin", "block/serif" ),
+    ( "12:00", "seven_segment", "block/sans" ),
+    ]
+
+class Dashboard( App[None] ):
+    def __init__( self, widgets: int, shared: bool ) -> None:
+        super().__init__()
+        self.count = widgets
+        self.shared = shared
+
+    def compose( self ) -> ComposeResult:
+        self.labels = []
+        for n in range( self.count ):
+            text, Face, Family = LABELS[ n % len( LABELS ) ]
+            self.labels.append( EnGlyph( text, Face=Face, Family=Family, shared=self.shared ) )
+        yield from self.labels
+
+async def run( widgets: int, shared: bool ) -> tuple[int, float, float, int]:
+    app = Dashboard( widgets, shared )
+    async with app.run_test( size=(40, 30) ) as pilot:
+        await pilot.pause()
+        for label in app.labels:
+            label._cache = None
+            label._strips = label._rows = label._chunk_list = label._glyph_layout = label._shared = None
+        gc.collect()
+        stats.reset()
+        stats.enable()
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        for label in app.labels:
+            for row in range( label._engine.face.lines ):
+                label.render_line( row )
+        took = time.perf_counter() - start
+        held = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+        stats.disable()
+        layouts = sum( counts.get( "layouts", 0 ) for scope, counts in stats.snapshot().items() if scope.startswith( "widget:" ) )
+        pooled = strip_pool_info().layouts
+    return layouts, took, held / 2**10, pooled
+
+def main() -> None:
+    parser = argparse.ArgumentParser( description=__doc__.splitlines()[0] )
+    parser.add_argument( "--widgets", type=int, default=400 )
+    args = parser.parse_args()
+    for shared in ( False, True ):
+        layouts, took, held, pooled = asyncio.run( run( args.widgets, shared ) )
+        label = "shared" if shared else "per widget"
+        print( f"{label:11} {layouts:6} layouts {took*1000:8.1f}ms {held:9.1f}KiB held  {pooled:4} pooled layouts" )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Frames per second and bytes per frame of full against delta frame rendering.
+
+Animates a sprite moving over a still reference image, or plays the
+frames of an animated image, through FrameRenderer with every frame
+redrawn in full and with deltas of the changed cells only, drawing as
+fast as possible into a discarded buffer. Run from the repository root:
+
+    python tooling/bench_frames.py [--image anim.gif] [--size 320 240] [--frames 200]
+"""
+from __future__ import annotations
+
+import argparse
+import io
+
+from pathlib import Path
+
+from PIL import Image, ImageDraw
+
+from pictogplyph import FrameRenderer, OctantCellRenderer, SextantCellRenderer, image_frames
+
+RENDERERS = {
+    "octant": OctantCellRenderer,
+    "sextant": SextantCellRenderer,
+    }
+
+def sprite_frames( background: Image.Image, count: int ) -> list[Image.Image]:
+    frames = []
+    width, height = background.size
+    for n in range( count ):
+        frame = background.copy()
+        x = ( 3 * n ) % width
+        ImageDraw.Draw( frame ).ellipse( (x, height // 3, x + width // 10, height // 3 + height // 8), fill=(230, 40, 40) )
+        frames.append( frame )
+    return frames
+
+def main() -> None:
+    parser = argparse.ArgumentParser( description=__doc__.splitlines()[0] )
+    parser.add_argument( "--image", default=str( Path( __file__ ).with_name( "north-pole.png" ) ) )
+    parser.add_argument( "--size", type=int, nargs=2, default=(320, 240) )
+    parser.add_argument( "--frames", type=int, default=200, help="sprite frames over a still image" )
+    args = parser.parse_args()
+
+    with Image.open( args.image ) as image:
+        if getattr( image, "n_frames", 1 ) > 1:
+            frames = [ frame.convert( "RGB" ).resize( tuple( args.size ) ) for frame in image_frames( image ) ]
+        else:
+            frames = sprite_frames( image.convert( "RGB" ).resize( tuple( args.size ) ), args.frames )
+
+    for name, renderer in RENDERERS.items():
+        for delta in ( False, True ):
+            stats = FrameRenderer( renderer(), delta=delta ).play( frames, io.StringIO(), fps=0 )
+            label = f"{name} {'delta' if delta else 'full'}"
+            print( f"{label:14} {stats.fps:8.1f} fps {stats.bytes_per_frame:11.0f} bytes/frame" )
+
+if __name__ == "__main__":
+    main()
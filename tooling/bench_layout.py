@@ -0,0 +1,152 @@
+"""Before/after benchmark of glyph layout on long strings.
+
+Compares the original per character en_glyph loop, kept here verbatim as
+legacy_layout, with CompiledFace.layout from transmoglyphier.faces. Run
+from a checkout with the package installed (pip install -e .):
+
+    python tooling/bench_layout.py [--length 20000] [--repeat 5]
+"""
+from __future__ import annotations
+
+import argparse
+import math
+import string
+import timeit
+
+from transmoglyphier.faces import get_compiled, get_face, preload
+
+
+def merged_face( Face: str, Family: str ) -> dict:
+    """The face with the characters of its fallback chain copied in, the
+    way the registry used to merge faces for the legacy layout."""
+    compiled = get_compiled( Face, Family )
+    characters = {}
+    for face in reversed( compiled.chain ):
+        characters.update( face.characters )
+    return { **get_face( Face, Family ), 'character': characters }
+
+def legacy_layout( GLYPHS, text: str, bold: bool = False, last_token: str = " " ) -> list[str]:
+    """Row strings exactly as the pre-compiled en_glyph computed them."""
+    bbox_height = GLYPHS['fixed lines']
+    bbox_width = GLYPHS['fixed columns']
+    bbox_align = GLYPHS['align']
+    bbox_tracking = GLYPHS['tracking']
+    bbox_monospace = GLYPHS['monospace']
+    faces_data = GLYPHS['character']
+
+    g_strings: list[str] = ['']*bbox_height
+    for token in text:
+        if ord( token ) > 32 and ord( token ) < 127:
+            default = {"glyph":["┌┬┐","├"+token+"┤","└┴┘"]}
+        else:
+            index = "{0:04x}".format( ord(token) )
+            default = {"glyph":[index[0]+"┬"+index[1],"├ ┤",index[2]+"┴"+index[3]]}
+        face = faces_data.get(token, default)
+        Thint = face.get('tracking', bbox_tracking)
+        bbox_apairs = GLYPHS.get('adjacent',[])
+        bbox_aapairs = GLYPHS.get('antiadjacent',[])
+        Mhint = face.get('monospace', bbox_monospace)
+        Hhint = face.get('lines', bbox_height)
+        Whint = face.get('columns', bbox_width)
+        Ahint = face.get('align', bbox_align)
+        glyph = face.get('glyph', face )
+        if hasattr( glyph, "get" ):
+            if bold:
+                glyph = glyph.get('bold', glyph )
+            else:
+                glyph = glyph.get('normal', glyph )
+
+        if Mhint:
+            if Ahint[0] == "left":
+                l_pad = 0
+                r_pad = bbox_width - Whint
+            elif Ahint[0] == "right":
+                l_pad = bbox_width - Whint
+                r_pad = 0
+            else:
+                pad = (bbox_width - Whint)/2.0
+                if last_token == " ":
+                    l_pad = math.ceil(pad)
+                    r_pad = math.floor(pad)
+                else:
+                    l_pad = math.floor(pad)
+                    r_pad = math.ceil(pad)
+        else:
+            l_pad = r_pad = 0
+
+        if last_token+token not in bbox_apairs and Thint > 0:
+            last_face = faces_data.get(last_token, {})
+            Khint = face.get('kerning', True)
+            last_Khint = last_face.get('kerning', True)
+            last_Whint = last_face.get('columns', bbox_width)
+            if last_Khint and Khint:
+                wedge = math.ceil( Thint )
+            else:
+                wedge = math.ceil( Thint - last_Whint )
+            if last_token+token in bbox_aapairs:
+                wedge += 1
+            if wedge > 0:
+                if Ahint[0] == "left":
+                    r_pad += wedge
+                else:
+                    l_pad += wedge
+
+        if Hhint == bbox_height:
+            t_pad = b_pad = 0
+        else:
+            if Ahint[1] == "top":
+                t_pad = 0
+                b_pad = bbox_height - Hhint
+            elif Ahint[1] == "bottom":
+                t_pad = bbox_height - Hhint
+                b_pad = 0
+            else:
+                pad = (bbox_height - Hhint)/2.0
+                t_pad = math.ceil(pad)
+                b_pad = math.floor(pad)
+
+        for row, row_str in enumerate( g_strings ):
+            if row < t_pad or row >= t_pad+Hhint:
+                g_datum = " "*Whint
+            else:
+                g_datum = glyph[row - t_pad]
+            g_strings[row] += " "*l_pad + g_datum + " "*r_pad
+
+        last_token = token
+    return g_strings
+
+
+def sample( length: int ) -> str:
+    corpus = string.ascii_letters + string.digits + " .,:;-_!?é→"
+    pangram = "The Five Boxing Wizards Jump Quickly " + corpus + " "
+    return ( pangram * ( length // len(pangram) + 1 ) )[:length]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser( description=__doc__.splitlines()[0] )
+    parser.add_argument( "--length", type=int, default=20000, help="characters per string" )
+    parser.add_argument( "--repeat", type=int, default=5, help="timed runs, best is reported" )
+    args = parser.parse_args()
+
+    text = sample( args.length )
+    print( f"{'face':28} {'bold':>5} {'legacy ms':>10} {'compiled ms':>12} {'speedup':>8}" )
+    for Family, Face in preload():
+        GLYPHS = merged_face( Face, Family )
+        compiled = get_compiled( Face, Family )
+        for bold in ( False, True ):
+            try:
+                expected = legacy_layout( GLYPHS, text, bold )
+            except IndexError:
+                #malformed glyph rows, the compiled face pads them instead
+                expected = None
+            if expected is not None:
+                assert compiled.layout( text, bold ) == expected, f"{Family}/{Face} layout differs"
+                legacy = min( timeit.repeat( lambda: legacy_layout( GLYPHS, text, bold ), number=1, repeat=args.repeat ) )
+            else:
+                legacy = math.nan
+            fast = min( timeit.repeat( lambda: compiled.layout( text, bold ), number=1, repeat=args.repeat ) )
+            print( f"{Family + '/' + Face:28} {str(bold):>5} {legacy*1000:10.2f} {fast*1000:12.2f} {legacy/fast:7.1f}x" )
+
+
+if __name__ == "__main__":
+    main()
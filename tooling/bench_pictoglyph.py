@@ -0,0 +1,57 @@
+"""Image to cell glyph conversion, per cell renderers against vectorized ones.
+
+Renders an image resized to 640x480 with the Octant, Sextant and Quadrant
+cell renderers, once one cell at a time through get_pixel and once with
+the NumPy array pipeline, in mono and color, and checks that both give the
+same segments. Run from the repository root:
+
+    python tooling/bench_pictoglyph.py [--image tooling/north-pole.png] [--size 640 480]
+"""
+from __future__ import annotations
+
+import argparse
+import time
+
+from pathlib import Path
+
+from PIL import Image
+
+from pictogplyph import OctantCellRenderer, QuadrantCellRenderer, SextantCellRenderer
+
+RENDERERS = {
+    "octant": OctantCellRenderer,
+    "sextant": SextantCellRenderer,
+    "quadrant": QuadrantCellRenderer,
+    }
+
+def best_time( render, repeat: int ) -> tuple[float, list]:
+    best = None
+    for n in range( repeat ):
+        start = time.perf_counter()
+        segments = render()
+        took = time.perf_counter() - start
+        best = took if best is None else min( best, took )
+    return best, segments
+
+def main() -> None:
+    parser = argparse.ArgumentParser( description=__doc__.splitlines()[0] )
+    parser.add_argument( "--image", default=str( Path( __file__ ).with_name( "north-pole.png" ) ) )
+    parser.add_argument( "--size", type=int, nargs=2, default=(640, 480) )
+    parser.add_argument( "--repeat", type=int, default=3, help="runs per renderer, best is reported" )
+    args = parser.parse_args()
+
+    with Image.open( args.image ) as image:
+        image = image.convert( "RGBA" ).resize( tuple( args.size ) )
+
+    for name, renderer in RENDERERS.items():
+        for mono in ( True, False ):
+            per_cell, expected = best_time( lambda: renderer( mono=mono, vectorized=False ).render( image, None ), args.repeat )
+            vectorized, segments = best_time( lambda: renderer( mono=mono, vectorized=True ).render( image, None ), args.repeat )
+            label = f"{name} {'mono' if mono else 'color'}"
+            print(
+                f"{label:16} per cell {per_cell*1000:9.1f}ms  vectorized {vectorized*1000:8.1f}ms"
+                f" {per_cell/vectorized:6.1f}x  {len(segments):6} segments  same={segments == expected}"
+                )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Two color quantization of all bright cells, PIL per cell against batched splits.
+
+Collects the all bright cells (the ones needing a two color split) of
+every reference image at 640x480 for each cell renderer, then splits them
+with PIL convert('P', colors=2) one cell at a time and with the batched
+kmeans and median modes. Closeness is the mean RGB distance per pixel
+between each mode's rendering of a cell (fg where a bit is set, bg
+elsewhere) and PIL's, next to each mode's own distance from the source
+pixels. Run from the repository root:
+
+    python tooling/bench_quantize.py [images ...] [--size 640 480]
+"""
+from __future__ import annotations
+
+import argparse
+import time
+
+from pathlib import Path
+
+import numpy as np
+
+from PIL import Image
+
+from pictogplyph import QUANTIZE_MODES, OctantCellRenderer, QuadrantCellRenderer, SextantCellRenderer
+
+HERE = Path( __file__ ).parent
+IMAGES = [ HERE / "north-pole.png", HERE / "240px-Grace_M._Hopper.jpg", HERE / "textual_logo_light.png" ]
+
+RENDERERS = {
+    "octant": OctantCellRenderer,
+    "sextant": SextantCellRenderer,
+    "quadrant": QuadrantCellRenderer,
+    }
+
+def bright_cells( renderer, image: Image.Image ) -> np.ndarray:
+    """The N x pixels x RGBA cells of image that are all above the weight."""
+    cells = renderer._cell_array( np.asarray( image ) )
+    r, g, b, a = ( cells[..., channel] for channel in range( 4 ) )
+    bright = ( (0.2126*r + 0.7152*g + 0.0722*b)*a/255 ).astype( np.int64 ) > renderer.weight
+    return cells[ bright.all( axis=-1 ) ]
+
+def split( renderer, cells: np.ndarray ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    if renderer.quantize == "pil":
+        results = [ renderer._quantize_cell( [ tuple( pixel ) for pixel in cell ] ) for cell in cells.tolist() ]
+        return tuple( np.array( column, dtype=np.int64 ).reshape( -1 ) for column in zip( *results ) ) if results else ( np.zeros( 0, np.int64 ), ) * 3
+    return renderer._split_cells( cells )
+
+def painted( cells: np.ndarray, offsets: np.ndarray, fg: np.ndarray, bg: np.ndarray ) -> np.ndarray:
+    """The RGB of every cell pixel as drawn: fg where its bit is set, else bg."""
+    bits = ( offsets[:, None] >> np.arange( cells.shape[1] ) ) & 1
+    color = np.where( bits == 1, fg[:, None], bg[:, None] )
+    return np.stack( ( color >> 16, ( color >> 8 ) & 0xFF, color & 0xFF ), axis=-1 )
+
+def distance( a: np.ndarray, b: np.ndarray ) -> float:
+    return float( np.sqrt( ( ( a - b )**2 ).sum( axis=-1 ) ).mean() ) if len( a ) else 0.0
+
+def main() -> None:
+    parser = argparse.ArgumentParser( description=__doc__.splitlines()[0] )
+    parser.add_argument( "images", nargs="*", default=[ str( path ) for path in IMAGES ] )
+    parser.add_argument( "--size", type=int, nargs=2, default=(640, 480) )
+    args = parser.parse_args()
+
+    for path in args.images:
+        with Image.open( path ) as image:
+            image = image.convert( "RGBA" ).resize( tuple( args.size ) )
+        for name, renderer in RENDERERS.items():
+            cells = bright_cells( renderer(), image )
+            print( f"{Path( path ).name} {name}: {len( cells )} all bright cells" )
+            reference = None
+            for mode in reversed( QUANTIZE_MODES ):
+                start = time.perf_counter()
+                result = split( renderer( quantize=mode ), cells )
+                took = time.perf_counter() - start
+                drawn = painted( cells, *result )
+                if reference is None:
+                    reference, base = drawn, took
+                print(
+                    f"  {mode:8} {took*1000:9.1f}ms {base/took:7.1f}x"
+                    f"  distance to pil {distance( drawn, reference ):6.1f}  to source {distance( drawn, cells[..., :3] ):6.1f}"
+                    )
+
+if __name__ == "__main__":
+    main()
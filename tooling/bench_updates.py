@@ -0,0 +1,87 @@
+"""Updates per second of live counter EnGlyph widgets.
+
+Mounts a column of seven_segment counters in a headless app, then
+updates every counter each frame (usually only the last digit changes)
+and fetches its rows the way a repaint does, once with incremental
+re-layout and once with full re-layout on every update. Textual's own
+compositing is left out so the widget's share of a frame is measured,
+along with the screen cells each update marks for repaint. With
+--composite every frame is also painted by Textual, which lays out the
+screen again after each full update, and frames per second are reported.
+Run with the package installed (pip install -e .):
+
+    python tooling/bench_updates.py [--widgets 24] [--frames 1000] [--composite]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+
+from textual.app import App, ComposeResult
+
+from transmoglyphier.glyphs import EnGlyph
+
+
+class Counter( EnGlyph ):
+    """EnGlyph that tallies the cells it asks Textual to repaint."""
+    painted = 0
+
+    def refresh( self, *regions, **kwargs ):
+        Counter.painted += sum( region.area for region in regions ) if regions else self.size.area
+        return super().refresh( *regions, **kwargs )
+
+
+class Counters( App[None] ):
+    def __init__( self, widgets: int, incremental: bool ) -> None:
+        super().__init__()
+        self.count = widgets
+        self.incremental = incremental
+
+    def compose( self ) -> ComposeResult:
+        self.counters = [
+            Counter( "00000", Face="seven_segment", incremental=self.incremental )
+            for n in range( self.count )
+            ]
+        yield from self.counters
+
+
+async def run( widgets: int, frames: int, incremental: bool, composite: bool = False ) -> tuple[float, float]:
+    app = Counters( widgets, incremental )
+    async with app.run_test( size=(120, 3*widgets+2) ) as pilot:
+        await pilot.pause()
+        Counter.painted = 0
+        start = time.perf_counter()
+        for frame in range( frames ):
+            for n, counter in enumerate( app.counters ):
+                counter.update( f"{frame + n:05d}" )
+                if not composite:
+                    for row in range( 3 ):
+                        counter.render_line( row )
+            if composite:
+                await pilot.pause()
+        took = time.perf_counter() - start
+    return frames / took, Counter.painted / ( frames * widgets )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser( description=__doc__.splitlines()[0] )
+    parser.add_argument( "--widgets", type=int, default=24 )
+    parser.add_argument( "--frames", type=int, default=1000 )
+    parser.add_argument( "--repeat", type=int, default=3, help="runs per mode, best is reported" )
+    parser.add_argument( "--composite", action="store_true", help="paint every frame through Textual and report frames/s" )
+    args = parser.parse_args()
+
+    for incremental in ( False, True ):
+        rate, painted = max( asyncio.run( run( args.widgets, args.frames, incremental ) ) for n in range( args.repeat ) )
+        label = "incremental" if incremental else "full re-layout"
+        print( f"{label:16} {rate:8.1f} updates/s per widget ({rate*args.widgets:9.1f} total) {painted:7.1f} cells repainted per update" )
+    if args.composite:
+        for incremental in ( False, True ):
+            rate, painted = max( asyncio.run( run( args.widgets, args.frames, incremental, True ) ) for n in range( args.repeat ) )
+            label = "incremental" if incremental else "full re-layout"
+            print( f"{label:16} {rate:8.1f} composited frames/s" )
+
+
+if __name__ == "__main__":
+    main()
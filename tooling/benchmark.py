@@ -0,0 +1,322 @@
+"""Benchmark suite for imports, glyph layout, face loading, streaming, widget repaints and images.
+
+Runs offline in one command and writes seconds per operation of every
+benchmark as JSON. Import times are of fresh interpreters, and the run
+fails if a headless module (engine, faces, cli) imports Textual. With
+--baseline the results are compared against an earlier run and the
+command exits 1 if anything got slower than the threshold allows. Image
+benchmarks need numpy, Pillow and rich-pixels and are skipped without
+them. Run from the repository root:
+
+    python tooling/benchmark.py [-o benchmark.json] [--baseline old.json] [-k layout] [--quick]
+
+or through hatch, which brings the image dependencies along:
+
+    hatch run bench:run --baseline old.json
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import datetime
+import io
+import json
+import math
+import os
+import platform
+import string
+import subprocess
+import sys
+import time
+import timeit
+
+from collections.abc import Callable
+from pathlib import Path
+
+import transmoglyphier
+
+from transmoglyphier import faces
+from transmoglyphier.__about__ import __version__
+from transmoglyphier.engine import GlyphEngine, markup_runs, markup_text
+
+HERE = Path( __file__ ).parent
+
+TEXTS = {
+    "short": "Hello",
+    "long": ( "The Five Boxing Wizards Jump Quickly " + string.ascii_letters + string.digits + " " ) * 20,
+    "markup": " ".join( f"[{color}]{word}[/{color}]" for color, word in zip(
+        [ "red", "bold", "blue", "u", "green", "i", "yellow", "s" ] * 16,
+        [ "Node", "OK", "12:34", "WARN", "Disk", "up", "down", "Load" ] * 16
+        ) ),
+    }
+
+IMAGE_SIZES = [ (160, 120), (320, 240), (640, 480) ]
+
+#Lines piped through cli.stream per timed run
+STREAM_LINES = 1000
+
+#Modules timed on import, True for those that must not import Textual
+IMPORTS = {
+    "transmoglyphier": True,
+    "transmoglyphier.faces": True,
+    "transmoglyphier.engine": True,
+    "transmoglyphier.cli": True,
+    "transmoglyphier.glyphs": False,
+    "transmoglyphier.transmoglyphier": False,
+    }
+
+class Suite:
+    """Times benchmarks whose names contain a filter, best of repeat runs."""
+
+    def __init__( self, repeat: int = 5, budget: float = 0.2, select: str = "" ) -> None:
+        self.repeat = repeat
+        self.budget = budget
+        self.select = select
+        self.results: dict[str, dict] = {}
+        self.skipped: dict[str, str] = {}
+        self.failures: list[str] = []
+
+    def wanted( self, name: str ) -> bool:
+        return self.select in name
+
+    def time( self, name: str, func: Callable[[], object], number: int | None = None ) -> None:
+        """Record the best seconds per call of func."""
+        if not self.wanted( name ):
+            return
+        timer = timeit.Timer( func )
+        if number is None:
+            number = 1
+            while True:
+                took = timer.timeit( number )
+                if took >= self.budget / 10 or number >= 1 << 20:
+                    break
+                number *= 2
+        best = min( timer.repeat( self.repeat, number ) ) / number
+        self.record( name, best, number )
+
+    def record( self, name: str, seconds: float, number: int = 1 ) -> None:
+        self.results[ name ] = { "seconds": seconds, "number": number }
+        print( f"{name:56} {seconds*1e6:14.2f} us", file=sys.stderr )
+
+    def skip( self, name: str, reason: str ) -> None:
+        if self.wanted( name ):
+            self.skipped[ name ] = reason
+            print( f"{name:56} skipped: {reason}", file=sys.stderr )
+
+def python( code: str, stdin: str = "" ) -> str:
+    """Run code in a fresh interpreter that imports this transmoglyphier."""
+    env = dict( os.environ )
+    src = os.path.dirname( os.path.dirname( transmoglyphier.__file__ ) )
+    env["PYTHONPATH"] = os.pathsep.join( filter( None, [ src, env.get( "PYTHONPATH" ) ] ) )
+    done = subprocess.run( [ sys.executable, "-c", code ], input=stdin, capture_output=True, text=True, env=env, check=True )
+    return done.stdout
+
+def bench_imports( suite: Suite ) -> None:
+    """Import time of each module and start up of a one line render, in fresh interpreters."""
+    for module, headless in IMPORTS.items():
+        name = f"imports/{module}"
+        if not suite.wanted( name ):
+            continue
+        best = math.inf
+        for run in range( suite.repeat ):
+            seconds, textual = json.loads( python(
+                "import sys, time\n"
+                f"start = time.perf_counter(); import {module}\n"
+                "seconds = time.perf_counter() - start\n"
+                "import json; print( json.dumps( [ seconds, 'textual' in sys.modules ] ) )"
+                ) )
+            best = min( best, seconds )
+        suite.record( name, best )
+        if headless and textual:
+            suite.failures.append( f"{module} imports Textual" )
+    if suite.wanted( "startup/render" ):
+        best = math.inf
+        for run in range( suite.repeat ):
+            start = time.perf_counter()
+            python( "import sys\nfrom transmoglyphier.cli import main\nsys.exit( main( [ 'render', '--color-system', 'none' ] ) )", "Hello\n" )
+            best = min( best, time.perf_counter() - start )
+        suite.record( "startup/render", best )
+
+def bench_layout( suite: Suite ) -> None:
+    """Row layout of short, long and markup heavy text in every shipped face."""
+    for Family, Face in faces.shipped_faces():
+        name = f"layout/{Family}/{Face}"
+        try:
+            engine = GlyphEngine( Face, Family )
+        except LookupError as error:
+            suite.skip( name, str( error ) )
+            continue
+        for label, text in TEXTS.items():
+            suite.time( f"{name}/{label}", lambda: engine.rows( text ) )
+        plain = markup_text( TEXTS["long"] ).plain
+        suite.time( f"{name}/en_glyph", lambda: engine.en_glyph( plain ) )
+    suite.time( "layout/markup-parse", lambda: ( markup_text.cache_clear(), markup_runs.cache_clear(), markup_runs( TEXTS["markup"] ) ) )
+
+def bench_faces( suite: Suite ) -> None:
+    """Cold face loads (registry cleared, read from assets and compiled) and warm lookups."""
+    for Family, Face in faces.shipped_faces():
+        name = f"faces/{Family}/{Face}"
+        try:
+            faces.get_compiled( Face, Family )
+        except LookupError as error:
+            suite.skip( name, str( error ) )
+            continue
+        suite.time( f"{name}/cold", lambda: ( faces.clear(), faces.get_compiled( Face, Family ) ) )
+        suite.time( f"{name}/warm", lambda: faces.get_compiled( Face, Family ) )
+    faces.clear()
+
+def bench_stream( suite: Suite ) -> None:
+    """Lines per second of the render command's stream, from distinct markup lines to ANSI text."""
+    if not suite.wanted( "stream/" ):
+        return
+    from rich.color import ColorSystem
+    from transmoglyphier.cli import stream
+    lines = [ f"[red]CPU[/red] {n % 100:02d}% [b]MEM[/b] {n % 7}G up {n}s\n" for n in range( STREAM_LINES ) ]
+    engine = GlyphEngine()
+    for label, color_system in ( ( "truecolor", ColorSystem.TRUECOLOR ), ( "none", None ) ):
+        name = f"stream/{label}"
+        if not suite.wanted( name ):
+            continue
+        best = math.inf
+        for run in range( suite.repeat ):
+            markup_text.cache_clear()
+            markup_runs.cache_clear()
+            stats = stream( lines, io.StringIO(), engine, color_system )
+            best = min( best, stats.seconds / stats.lines )
+        suite.record( name, best, len( lines ) )
+        suite.results[ name ][ "lines_per_second" ] = 1 / best
+        print( f"{'':56} {1/best:14.0f} lines/s", file=sys.stderr )
+
+def bench_widget( suite: Suite ) -> None:
+    """EnGlyph repaint costs in a headless app."""
+    if not any( suite.wanted( f"widget/{case}" ) for case in ( "prechunk", "chunks_to_strips", "update", "load_glyphs" ) ):
+        return
+    from textual.app import App, ComposeResult
+    from transmoglyphier.glyphs import EnGlyph
+
+    class Bench( App[None] ):
+        def compose( self ) -> ComposeResult:
+            #Not incremental, or _prechunk would time reuse of the previous layout
+            yield EnGlyph( TEXTS["markup"], shared=False, incremental=False, id="markup" )
+            yield EnGlyph( TEXTS["markup"], incremental=False, id="pooled" )
+            yield EnGlyph( "00000", Face="seven_segment", id="counter" )
+
+    def repaint( widget: EnGlyph ) -> None:
+        for row in range( widget._engine.face.lines ):
+            widget.render_line( row )
+
+    async def run() -> None:
+        app = Bench()
+        async with app.run_test( size=(200, 10) ) as pilot:
+            await pilot.pause()
+            markup = app.query_one( "#markup", EnGlyph )
+            counter = app.query_one( "#counter", EnGlyph )
+            suite.time( "widget/prechunk", markup._prechunk )
+            suite.time( "widget/prechunk/pooled", app.query_one( "#pooled", EnGlyph )._prechunk )
+            suite.time( "widget/chunks_to_strips", markup._chunks_to_strips )
+            for incremental in ( False, True ):
+                counter.incremental = incremental
+                frames = iter( range( 1 << 30 ) )
+                def update() -> None:
+                    counter.update( f"{next( frames ) % 100000:05d}" )
+                    repaint( counter )
+                suite.time( f"widget/update/{'incremental' if incremental else 'full'}", update )
+            families = iter( [ ( "basic_latin", "block/serif" ), ( "basic_latin", "block/sans" ) ] * ( 1 << 20 ) )
+            def switch() -> None:
+                markup.load_glyphs( *next( families ) )
+                repaint( markup )
+            suite.time( "widget/load_glyphs", switch )
+
+    asyncio.run( run() )
+
+def bench_images( suite: Suite ) -> None:
+    """Cell renderer image conversion at several resolutions."""
+    if not suite.wanted( "images/" ):
+        return
+    try:
+        sys.path.insert( 0, str( HERE ) )
+        from PIL import Image
+        from pictogplyph import OctantCellRenderer, QuadrantCellRenderer, SextantCellRenderer
+    except ImportError as error:
+        suite.skip( "images/", f"missing {error.name}" )
+        return
+    renderers = { "octant": OctantCellRenderer, "sextant": SextantCellRenderer, "quadrant": QuadrantCellRenderer }
+    with Image.open( HERE / "north-pole.png" ) as source:
+        source = source.convert( "RGBA" )
+        for width, height in IMAGE_SIZES:
+            image = source.resize( (width, height) )
+            for name, renderer in renderers.items():
+                for mono in ( True, False ):
+                    suite.time(
+                        f"images/{name}/{width}x{height}/{'mono' if mono else 'color'}",
+                        lambda: renderer( mono=mono ).render( image, None )
+                        )
+
+BENCHMARKS = [ bench_imports, bench_layout, bench_faces, bench_stream, bench_widget, bench_images ]
+
+def compare( results: dict, baseline: dict, threshold: float, select: str = "" ) -> int:
+    """Print current against baseline seconds, returning the number of regressions."""
+    regressions = 0
+    old = baseline.get( "results", {} )
+    print( f"{'benchmark':56} {'baseline us':>12} {'current us':>12} {'ratio':>7}" )
+    for name, result in results.items():
+        if name not in old:
+            print( f"{name:56} {'-':>12} {result['seconds']*1e6:12.2f}     new" )
+            continue
+        ratio = result["seconds"] / old[ name ]["seconds"]
+        mark = ""
+        if ratio > 1 + threshold:
+            mark = "slower"
+            regressions += 1
+        elif ratio < 1 - threshold:
+            mark = "faster"
+        print( f"{name:56} {old[ name ]['seconds']*1e6:12.2f} {result['seconds']*1e6:12.2f} {ratio:7.2f} {mark}" )
+    for name in sorted( old.keys() - results.keys() ):
+        if select not in name:
+            continue
+        print( f"{name:56} {old[ name ]['seconds']*1e6:12.2f} {'-':>12}     gone" )
+    return regressions
+
+def main() -> int:
+    parser = argparse.ArgumentParser( description=__doc__.splitlines()[0] )
+    parser.add_argument( "-o", "--output", type=Path, default=Path( "benchmark.json" ), help="results JSON file" )
+    parser.add_argument( "--baseline", type=Path, help="results JSON of an earlier run to compare against" )
+    parser.add_argument( "--threshold", type=float, default=0.10, help="slowdown ratio counted as a regression" )
+    parser.add_argument( "-k", "--select", default="", help="only run benchmarks whose name contains this" )
+    parser.add_argument( "--repeat", type=int, default=5, help="timed runs per benchmark, best is kept" )
+    parser.add_argument( "--quick", action="store_true", help="fewer and shorter runs, for a smoke test" )
+    args = parser.parse_args()
+
+    suite = Suite( repeat=2 if args.quick else args.repeat, budget=0.02 if args.quick else 0.2, select=args.select )
+    start = time.perf_counter()
+    for benchmark in BENCHMARKS:
+        benchmark( suite )
+
+    report = {
+        "meta": {
+            "version": __version__,
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "date": datetime.datetime.now( datetime.timezone.utc ).isoformat( timespec="seconds" ),
+            "seconds": time.perf_counter() - start,
+            },
+        "results": suite.results,
+        "skipped": suite.skipped,
+        "failures": suite.failures,
+        }
+    args.output.write_text( json.dumps( report, indent=1 ) + "\n" )
+    print( f"{len( suite.results )} benchmarks written to {args.output}", file=sys.stderr )
+    for failure in suite.failures:
+        print( "failed: " + failure, file=sys.stderr )
+
+    if args.baseline:
+        regressions = compare( suite.results, json.loads( args.baseline.read_text() ), args.threshold, args.select )
+        if regressions:
+            print( f"{regressions} benchmarks slower than the baseline by more than {args.threshold:.0%}", file=sys.stderr )
+            return 1
+    return 1 if suite.failures else 0
+
+if __name__ == "__main__":
+    sys.exit( main() )
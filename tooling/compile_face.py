@@ -0,0 +1,192 @@
+"""Compile a TTF/WOFF font into an EnGlyph face JSON, offline.
+
+Every code point in range is rasterized at the given pixel size, turned
+into block cells by a pictogplyph cell renderer and written as a face in
+the schema faces.load_jface reads ('fixed lines', 'fixed columns',
+'character' -> 'glyph' rows, 'tracking', ...). Code points are split into
+chunks compiled across worker processes. Results are cached on disk,
+keyed by the SHA-256 of the font file plus every compile parameter, so
+re-running with the same inputs is just a file copy. Run from the
+repository root:
+
+    python tooling/compile_face.py FONT --size 12 --renderer sextant \\
+        --code-points 20-7e --face terminus --family sextant \\
+        -o src/transmoglyphier/assets/glyphs/sextant/terminus.json
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import unicodedata
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from pictogplyph import GlyphAtlas, OctantCellRenderer, QuadrantCellRenderer, SextantCellRenderer
+
+#Bumped whenever compiled output changes for the same inputs
+COMPILER_VERSION = 1
+
+RENDERERS = {
+    "octant": OctantCellRenderer,
+    "sextant": SextantCellRenderer,
+    "quadrant": QuadrantCellRenderer,
+    }
+
+#A noncharacter, rendered as the font's .notdef glyph
+NOTDEF = "￿"
+
+def parse_code_points( spec: str ) -> list[int]:
+    """Code points of comma separated hex values and lo-hi ranges, e.g. 20-7e,a0-ff."""
+    points = []
+    for part in spec.split( "," ):
+        part = part.strip()
+        if not part:
+            continue
+        lo, _, hi = part.partition( "-" )
+        points.extend( range( int( lo, 16 ), int( hi or lo, 16 ) + 1 ) )
+    return sorted( set( points ) )
+
+def code_point_ranges( points: list[int] ) -> str:
+    """The '_code points' note of a face, character ranges like A-Z,a-z,"""
+    ranges = []
+    for point in points:
+        if ranges and ranges[-1][1] == point - 1:
+            ranges[-1][1] = point
+        else:
+            ranges.append( [ point, point ] )
+    return "".join( chr( lo ) + ( "-" + chr( hi ) if hi != lo else "" ) + "," for lo, hi in ranges )
+
+def font_hash( font_path: str ) -> str:
+    digest = hashlib.sha256()
+    with open( font_path, "rb" ) as font:
+        for block in iter( lambda: font.read( 1 << 20 ), b"" ):
+            digest.update( block )
+    return digest.hexdigest()
+
+def cache_dir() -> Path:
+    root = os.environ.get( "XDG_CACHE_HOME" ) or Path.home() / ".cache"
+    return Path( root ) / "transmoglyphier" / "faces"
+
+def _compile_chunk( font_path: str, size: int, renderer: str, pips: bool, weight: int, points: list[int] ) -> dict[str, list[str]]:
+    """Glyph rows of every code point in points that the font has."""
+    atlas = GlyphAtlas( maxsize=len( points ) + 1 )
+    cell_renderer = RENDERERS[ renderer ]( mono=True, pips=pips, Weight=weight )
+    notdef = atlas.bitmap( font_path, size, NOTDEF )
+    glyphs = {}
+    for point in points:
+        char = chr( point )
+        if unicodedata.category( char ) in ( "Cc", "Cs", "Co", "Cn" ):
+            continue
+        bitmap = atlas.bitmap( font_path, size, char )
+        if not char.isspace() and ( not bitmap.any() or ( bitmap.shape == notdef.shape and ( bitmap == notdef ).all() ) ):
+            continue
+        rows = atlas.cells( font_path, size, char, cell_renderer )
+        if rows and rows[0]:
+            glyphs[ char ] = [ "".join( segment.text for segment in row ) for row in rows ]
+    return glyphs
+
+def compile_face(
+        font_path: str,
+        size: int = 12,
+        renderer: str = "octant",
+        code_points: list[int] | None = None,
+        Face: str | None = None,
+        Family: str | None = None,
+        pips: bool = False,
+        weight: int = 96,
+        workers: int | None = None,
+        chunk_size: int = 64,
+        cache: Path | None = None
+        ) -> dict:
+    """Compile font_path into a face dict, reusing the on-disk cache."""
+    code_points = code_points or list( range( 0x20, 0x7f ) )
+    Face = Face or Path( font_path ).stem.lower().replace( "-", "_" )
+    Family = Family or renderer
+    source = {
+        "font": Path( font_path ).name,
+        "sha256": font_hash( font_path ),
+        "size": size,
+        "renderer": renderer,
+        "pips": pips,
+        "weight": weight,
+        "compiler": COMPILER_VERSION,
+        }
+    key = hashlib.sha256( json.dumps( [ source, code_points, Face, Family ], sort_keys=True ).encode() ).hexdigest()
+    cache = cache_dir() if cache is None else cache
+    cached = cache / ( key + ".json" )
+    if cached.exists():
+        return json.loads( cached.read_text( encoding="utf-8" ) )
+
+    chunks = [ code_points[ n:n+chunk_size ] for n in range( 0, len( code_points ), chunk_size ) ]
+    glyphs = {}
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        results = ( _compile_chunk( font_path, size, renderer, pips, weight, chunk ) for chunk in chunks )
+        for result in results:
+            glyphs.update( result )
+    else:
+        with ProcessPoolExecutor( workers ) as pool:
+            futures = [ pool.submit( _compile_chunk, font_path, size, renderer, pips, weight, chunk ) for chunk in chunks ]
+            for future in futures:
+                glyphs.update( future.result() )
+
+    widths = [ len( rows[0] ) for rows in glyphs.values() ]
+    face = {
+        "__comment__": f"compiled from {source['font']} at {size}px by tooling/compile_face.py",
+        "block": Face,
+        "_code points": code_point_ranges( [ ord( char ) for char in glyphs ] ),
+        "_version": COMPILER_VERSION,
+        "_family": Family.replace( "/", " " ),
+        "_face": Face,
+        "_source": source,
+        "monospace": len( set( widths ) ) <= 1,
+        "tracking": 0,
+        "align": ["left", "top"],
+        "fixed columns": max( widths, default=1 ),
+        "fixed lines": max( ( len( rows ) for rows in glyphs.values() ), default=1 ),
+        "character": {
+            char: { "columns": len( rows[0] ), "glyph": rows }
+            for char, rows in glyphs.items()
+            },
+        }
+
+    cache.mkdir( parents=True, exist_ok=True )
+    partial = cached.with_suffix( ".tmp" + str( os.getpid() ) )
+    partial.write_text( json.dumps( face, ensure_ascii=False, indent=1 ), encoding="utf-8" )
+    os.replace( partial, cached )
+    return face
+
+def main() -> int:
+    parser = argparse.ArgumentParser( description=__doc__.splitlines()[0] )
+    parser.add_argument( "font", help="TTF, OTF or WOFF font file" )
+    parser.add_argument( "--size", type=int, default=12, help="font size in pixels" )
+    parser.add_argument( "--renderer", default="octant", choices=list( RENDERERS ) )
+    parser.add_argument( "--pips", action="store_true", help="use the pip (braille style) glyph set" )
+    parser.add_argument( "--weight", type=int, default=96, help="intensity threshold of a set pixel" )
+    parser.add_argument( "--code-points", default="20-7e", help="hex code points and ranges, e.g. 20-7e,a0-ff" )
+    parser.add_argument( "--face", help="face name, default from the font file name" )
+    parser.add_argument( "--family", help="family name, default the renderer" )
+    parser.add_argument( "--workers", type=int, default=None, help="worker processes, default the CPU count" )
+    parser.add_argument( "--cache-dir", type=Path, default=None, help=f"default {cache_dir()}" )
+    parser.add_argument( "-o", "--output", type=Path, help="face JSON path, default stdout" )
+    args = parser.parse_args()
+
+    face = compile_face(
+        args.font, args.size, args.renderer, parse_code_points( args.code_points ),
+        args.face, args.family, args.pips, args.weight, args.workers, cache=args.cache_dir
+        )
+    text = json.dumps( face, ensure_ascii=False, indent=1 )
+    if args.output:
+        args.output.parent.mkdir( parents=True, exist_ok=True )
+        args.output.write_text( text + "\n", encoding="utf-8" )
+    else:
+        sys.stdout.write( text + "\n" )
+    print( f"{len( face['character'] )} glyphs, {face['fixed lines']} lines", file=sys.stderr )
+    return 0
+
+if __name__ == "__main__":
+    sys.exit( main() )
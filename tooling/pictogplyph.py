@@ -1,27 +1,66 @@
 from rich_pixels import Pixels, Renderer
-from typing import Callable, Tuple
+from typing import IO, Callable, Iterable, Iterator, NamedTuple, Tuple
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import lru_cache
 
+from rich.color import ColorSystem
 from rich.console import Console
 from rich.segment import Segment
 from rich.style import Style
 
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageDraw, ImageFont, ImageSequence
+from PIL.Image import Resampling
+import numpy as np
 import string
+import time
+
+try:
+    from transmoglyphier import stats
+except ImportError:
+    stats = None
 
 
 RGBA = Tuple[int, int, int, int]
 GetPixel = Callable[[Tuple[int, int]], RGBA]
 
+#Packed 0xRRGGBB cell color, or DEFAULT for the terminal default color
+DEFAULT = -1
+
+#Two color splits of all bright cells: batched 2-means or luminance
+#median split over all cells at once, or PIL quantization per cell
+QUANTIZE_MODES = ( "kmeans", "median", "pil" )
+
+@lru_cache( maxsize=1 << 16 )
+def cell_style( fg: int, bg: int ) -> Style:
+    """Style of a cell from packed fg/bg colors, parsed once per color pair."""
+    colors = [ "default" if color == DEFAULT else f"rgb({color >> 16},{(color >> 8) & 0xFF},{color & 0xFF})" for color in ( fg, bg ) ]
+    return Style.parse( " on ".join( colors ) )
+
 class CellRenderer( Renderer ):
+    #Glyphs indexed by the bit packed bright pixels of a cell
+    glyph_lut = ""
+    pips_lut = ""
+
     def __init__( self, *args, **kwargs ) -> None:
         self.weight = kwargs.pop('Weight', 96)
         self.mono = kwargs.pop('mono', False)
         self.x_pixels = kwargs.pop( 'x_pixels', 2 )
         self.y_pixels = kwargs.pop( 'y_pixels', 4 )
         self.pips = kwargs.pop( 'pips', False )
+        self.vectorized = kwargs.pop( 'vectorized', True )
+        self.quantize = kwargs.pop( 'quantize', "kmeans" )
+        self.quantize_passes = kwargs.pop( 'quantize_passes', 4 )
+        if self.quantize not in QUANTIZE_MODES:
+            raise ValueError( f"quantize must be one of {', '.join( QUANTIZE_MODES )}" )
         super().__init__( *args, **kwargs )
 
-    def render( self, image: Image, resize: tuple[int, int] | None) -> list[Segment]:
+    @property
+    def lut( self ) -> str:
+        return self.pips_lut if self.pips else self.glyph_lut
+
+    def _target_size( self, image: Image, resize: tuple[int, int] | None ) -> tuple[int, int]:
+        """Size the image is rendered at, resize grown to whole cells."""
         target_width = resize[0] if resize else image.size[0]
         while target_width % self.x_pixels != 0:
             target_width += 1
@@ -29,11 +68,207 @@ class CellRenderer( Renderer ):
         target_height = resize[1] if resize else image.size[1]
         while target_height % self.y_pixels != 0:
             target_height += 1
+        return target_width, target_height
 
+    def render( self, image: Image, resize: tuple[int, int] | None) -> list[Segment]:
+        if stats is not None and stats.enabled:
+            start = stats.clock()
+            segments = self._render( image, resize )
+            target_width, target_height = self._target_size( image, resize )
+            stats.timed( "renders", start, self._stats_scope )
+            stats.count( "cells", self._stats_scope, n=( target_width // self.x_pixels ) * ( target_height // self.y_pixels ) )
+            return segments
+        return self._render( image, resize )
+
+    @property
+    def _stats_scope( self ) -> str:
+        return "renderer:" + type( self ).__name__
+
+    def _render( self, image: Image, resize: tuple[int, int] | None) -> list[Segment]:
+        target_width, target_height = self._target_size( image, resize )
         if image.size[0] != target_width or image.size[1] != target_height:
             resize = (target_width, target_height)
 
-        return super().render(image, resize)
+        if not self.vectorized:
+            return super().render(image, resize)
+
+        rgba_image = image.convert( "RGBA" )
+        if resize:
+            rgba_image = rgba_image.resize( resize, resample=Resampling.NEAREST )
+        return self._render_array( np.asarray( rgba_image ) )
+
+    def _cell_array( self, pixels: np.ndarray ) -> np.ndarray:
+        """Regroup a HxWx4 image into rows x columns x cell pixels x RGBA.
+
+        Cell pixels are in row major order, the same order as the bits of a
+        glyph index."""
+        height, width = pixels.shape[:2]
+        rows, cols = height // self.y_pixels, width // self.x_pixels
+        cells = pixels.reshape( rows, self.y_pixels, cols, self.x_pixels, 4 ).swapaxes( 1, 2 )
+        return cells.reshape( rows, cols, self.y_pixels * self.x_pixels, 4 ).astype( np.int64 )
+
+    def render_bands(
+            self,
+            image: Image,
+            resize: tuple[int, int] | None = None,
+            band_rows: int = 16,
+            workers: int = 1,
+            max_pending: int | None = None
+            ) -> Iterator[list[Segment]]:
+        """Yield the image as rows of cell segments, band_rows rows at a time.
+
+        Each band is cut from exactly the source rows a whole image resize
+        picks for it, then resized across and converted on its own, so the
+        output matches render() but only a band of RGBA pixels and cells
+        exists at any time, whatever the image height. With workers > 1
+        bands are rendered in a process pool, at most max_pending (default
+        twice the workers) at once, and yielded in order."""
+        target_width, target_height = self._target_size( image, resize )
+        band_height = band_rows * self.y_pixels
+        if stats is not None and stats.enabled:
+            stats.count( "renders", self._stats_scope )
+            stats.count( "cells", self._stats_scope, n=( target_width // self.x_pixels ) * ( target_height // self.y_pixels ) )
+        source_rows = _source_rows( image.size[1], target_height )
+
+        def bands() -> Iterator[np.ndarray]:
+            for top in range( 0, target_height, band_height ):
+                rows = source_rows[ top:top + band_height ]
+                first, last = int( rows[0] ), int( rows[-1] ) + 1
+                band = image.crop( (0, first, image.size[0], last) ).convert( "RGBA" )
+                if band.size[0] != target_width:
+                    band = band.resize( (target_width, last - first), resample=Resampling.NEAREST )
+                yield np.asarray( band )[ rows - first ]
+
+        if workers <= 1:
+            for pixels in bands():
+                yield from self._cell_rows( pixels )
+            return
+
+        max_pending = max_pending or 2 * workers
+        with ProcessPoolExecutor( workers ) as pool:
+            pending: deque[Future] = deque()
+            try:
+                for pixels in bands():
+                    pending.append( pool.submit( _render_band, self, pixels ) )
+                    if len( pending ) >= max_pending:
+                        yield from pending.popleft().result()
+                while pending:
+                    yield from pending.popleft().result()
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def _render_array( self, pixels: np.ndarray ) -> list[Segment]:
+        """Render a whole RGBA image array, rows separated by newlines."""
+        segments = []
+        for row in self._cell_rows( pixels ):
+            segments.extend( row )
+            segments.append( Segment( "\n", self.null_style ) )
+        return segments
+
+    def _cell_rows( self, pixels: np.ndarray ) -> list[list[Segment]]:
+        """Render an RGBA image array as one list of cell segments per row."""
+        offsets, fg, bg = self._cell_info( self._cell_array( pixels ) )
+        offsets, fg, bg = offsets.tolist(), fg.tolist(), bg.tolist()
+        lut = self.lut
+        return [
+            [
+                Segment( lut[ offset ], cell_style( fg_color, bg_color ) )
+                for offset, fg_color, bg_color in zip( line_offsets, line_fg, line_bg )
+                ]
+            for line_offsets, line_fg, line_bg in zip( offsets, fg, bg )
+            ]
+
+    def _cell_info( self, cells: np.ndarray ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Glyph offsets and packed fg and bg colors of ... x pixels x RGBA cells.
+
+        Luminance threshold, bit packing of every cell into its glyph index,
+        bright/dark color averages and the two color split of all bright
+        cells are done for all cells at once, unless quantize is "pil"."""
+        count = cells.shape[-2]
+        r, g, b, a = ( cells[..., channel] for channel in range( 4 ) )
+        bright = ( (0.2126*r + 0.7152*g + 0.0722*b)*a/255 ).astype( np.int64 ) > self.weight
+        offsets = bright @ ( 1 << np.arange( count, dtype=np.int64 ) )
+
+        n_bright = bright.sum( axis=-1 )
+        n_dark = count - n_bright
+        bright_sum = ( cells * bright[..., None] ).sum( axis=-2 )
+        dark_sum = cells.sum( axis=-2 ) - bright_sum
+        fg = self._pack_colors( bright_sum // np.maximum( n_bright, 1 )[..., None] )
+        bg = self._pack_colors( dark_sum // np.maximum( n_dark, 1 )[..., None] )
+        fg[ n_bright == 0 ] = DEFAULT
+        #All bright cells keep default colors with every bit set when mono
+        all_bright = n_dark == 0
+        fg[ all_bright ] = DEFAULT
+        bg[ all_bright ] = DEFAULT
+        if not self.mono and all_bright.any():
+            if self.quantize == "pil":
+                for index in zip( *np.nonzero( all_bright ) ):
+                    celllist = [ tuple( pixel ) for pixel in cells[ index ].tolist() ]
+                    offsets[ index ], fg[ index ], bg[ index ] = self._quantize_cell( celllist )
+            else:
+                offsets[ all_bright ], fg[ all_bright ], bg[ all_bright ] = self._split_cells( cells[ all_bright ] )
+        return offsets, fg, bg
+
+    @staticmethod
+    def _pack_colors( colors: np.ndarray ) -> np.ndarray:
+        """Pack ...x4 RGBA averages into 0xRRGGBB, DEFAULT where transparent."""
+        packed = ( colors[..., 0] << 16 ) | ( colors[..., 1] << 8 ) | colors[..., 2]
+        return np.where( colors[..., 3] > 0, packed, DEFAULT )
+
+    def _split_cells( self, cells: np.ndarray ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Split N cells x pixels x RGBA into two colors each, as array math.
+
+        Pixels go to the brighter (fg, bit set) or darker (bg) group by a
+        luminance median split or by quantize_passes rounds of 2-means on
+        RGB seeded with the darkest and brightest pixel. Returns glyph
+        offsets and packed fg and bg colors, a one group cell uses its color
+        for both."""
+        count = cells.shape[1]
+        rgb = cells[..., :3]
+        lum = rgb @ np.array( (0.2126, 0.7152, 0.0722) )
+        if self.quantize == "median":
+            upper = lum > np.median( lum, axis=-1, keepdims=True )
+        else:
+            points = rgb.astype( np.float64 )
+            index = np.arange( len( points ) )
+            centers = np.stack( ( points[ index, lum.argmin( -1 ) ], points[ index, lum.argmax( -1 ) ] ), axis=1 )
+            for n in range( self.quantize_passes ):
+                dist = ( ( points[:, :, None, :] - centers[:, None, :, :] )**2 ).sum( axis=-1 )
+                upper = dist[..., 1] < dist[..., 0]
+                groups = np.stack( ( ~upper, upper ), axis=1 ).astype( np.float64 )
+                sizes = groups.sum( axis=-1 )[..., None]
+                centers = np.where( sizes > 0, ( groups @ points ) / np.maximum( sizes, 1 ), centers )
+
+        n_upper = upper.sum( axis=-1 )[..., None]
+        fg_sum = ( rgb * upper[..., None] ).sum( axis=-2 )
+        bg_sum = rgb.sum( axis=-2 ) - fg_sum
+        fg = fg_sum // np.maximum( n_upper, 1 )
+        bg = bg_sum // np.maximum( count - n_upper, 1 )
+        fg = np.where( n_upper == 0, bg, fg )
+        bg = np.where( n_upper == count, fg, bg )
+        offsets = upper @ ( 1 << np.arange( count, dtype=np.int64 ) )
+        pack = lambda colors: ( colors[..., 0] << 16 ) | ( colors[..., 1] << 8 ) | colors[..., 2]
+        return offsets, pack( fg ), pack( bg )
+
+    def _quantize_cell( self, celllist: list ) -> tuple[int, int, int]:
+        """Reduce a cell to its dominant 2 colors, returning the glyph
+        offset and packed fg and bg colors."""
+        if self.quantize != "pil":
+            offsets, fg, bg = self._split_cells( np.array( [ celllist ], dtype=np.int64 ) )
+            return int( offsets[0] ), int( fg[0] ), int( bg[0] )
+        offset = 0
+        cellimg = Image.new( 'RGBA', (self.x_pixels, self.y_pixels) )
+        cellimg.putdata( celllist )
+        cellbiimg = cellimg.convert( 'P', dither=None, colors=2 )
+        palette = cellbiimg.getpalette()
+        cellbilist = list( cellbiimg.getdata() )
+        for exp, pixel in enumerate( cellbilist ):
+            if pixel:
+                offset += 2**exp
+        bg_color = ( palette[0] << 16 ) | ( palette[1] << 8 ) | palette[2]
+        fg_color = ( palette[3] << 16 ) | ( palette[4] << 8 ) | palette[5]
+        return offset, fg_color, bg_color
 
     def _get_intensity( self, pixel: GetPixel ) -> int:
         """calculate intensity approximation of an RGBA PIL getpixel.
@@ -43,7 +278,7 @@ class CellRenderer( Renderer ):
 
     def _get_range(self, height: int) -> range:
         return range(0, height, self.y_pixels)
-    
+
     def _get_cellpix( self, x: int, y: int, get_pixel: GetPixel ) -> list:
         #pixlist index is the power of 2 for the pixel bit offset
         pixlist = []
@@ -63,7 +298,7 @@ class CellRenderer( Renderer ):
         brightlist = []
         darklist = []
         colors = []
-        
+
         """ Process current cell pixels for brightness (intensity) bilevel 'coloring'. """
         celllist = self._get_cellpix(x,y,get_pixel)
         for exp, pixel in enumerate( celllist ):
@@ -82,17 +317,9 @@ class CellRenderer( Renderer ):
             """ All bright condition, reprocess cell for dominant 2 color pattern.
                 A possibly better approach here would be use adjacent cells in a
                 Floyd-Steinberg esque 2-color dithering downsampling."""
-            offset = 0
-            cellimg = Image.new( 'RGBA', (self.x_pixels, self.y_pixels) )
-            cellimg.putdata( celllist )
-            cellbiimg = cellimg.convert( 'P', dither=None, colors=2 )
-            palette = cellbiimg.getpalette()
-            cellbilist = list( cellbiimg.getdata() )
-            for exp, pixel in enumerate( cellbilist ):
-                if pixel:
-                    offset += 2**exp
-            bg_color = self._get_color( (palette[0], palette[1], palette[2], 255) )
-            fg_color = self._get_color( (palette[3], palette[4], palette[5], 255) )
+            offset, fg, bg = self._quantize_cell( celllist )
+            fg_color = self._get_color( ( fg >> 16, (fg >> 8) & 0xFF, fg & 0xFF, 255 ) )
+            bg_color = self._get_color( ( bg >> 16, (bg >> 8) & 0xFF, bg & 0xFF, 255 ) )
 
         if fg_color is not None:
             colors.append( fg_color )
@@ -102,11 +329,28 @@ class CellRenderer( Renderer ):
             colors.append( bg_color )
         else:
             colors.append( "default" )
-        style = Style.parse(" on ".join(colors)) 
+        style = Style.parse(" on ".join(colors))
         return( offset, style )
 
+@lru_cache( maxsize=64 )
+def _source_rows( height: int, target_height: int ) -> np.ndarray:
+    """The source row a NEAREST resize from height to target_height picks for each row.
+
+    Taken from PIL itself, by resizing a column of row numbers, so bands
+    cut with it match a whole image resize at every seam."""
+    column = Image.fromarray( np.arange( height, dtype=np.int32 ).reshape( height, 1 ) )
+    rows = np.asarray( column.resize( (1, target_height), resample=Resampling.NEAREST ) )[:, 0].astype( np.intp )
+    rows.setflags( write=False )
+    return rows
+
+def _render_band( renderer: CellRenderer, pixels: np.ndarray ) -> list[list[Segment]]:
+    return renderer._cell_rows( pixels )
+
 class OctantCellRenderer( CellRenderer ):
     """ Render to Block Octant in Unicode 16.0: Extend to braille glyphs? """
+    pips_lut = "⠀⠁⠈⠉⠂⠃⠊⠋⠐⠑⠘⠙⠒⠓⠚⠛⠄⠅⠌⠍⠆⠇⠎⠏⠔⠕⠜⠝⠖⠗⠞⠟⠠⠡⠨⠩⠢⠣⠪⠫⠰⠱⠸⠹⠲⠳⠺⠻⠤⠥⠬⠭⠦⠧⠮⠯⠴⠵⠼⠽⠶⠷⠾⠿⡀⡁⡈⡉⡂⡃⡊⡋⡐⡑⡘⡙⡒⡓⡚⡛⡄⡅⡌⡍⡆⡇⡎⡏⡔⡕⡜⡝⡖⡗⡞⡟⡠⡡⡨⡩⡢⡣⡪⡫⡰⡱⡸⡹⡲⡳⡺⡻⡤⡥⡬⡭⡦⡧⡮⡯⡴⡵⡼⡽⡶⡷⡾⡿⢀⢁⢈⢉⢂⢃⢊⢋⢐⢑⢘⢙⢒⢓⢚⢛⢄⢅⢌⢍⢆⢇⢎⢏⢔⢕⢜⢝⢖⢗⢞⢟⢠⢡⢨⢩⢢⢣⢪⢫⢰⢱⢸⢹⢲⢳⢺⢻⢤⢥⢬⢭⢦⢧⢮⢯⢴⢵⢼⢽⢶⢷⢾⢿⣀⣁⣈⣉⣂⣃⣊⣋⣐⣑⣘⣙⣒⣓⣚⣛⣄⣅⣌⣍⣆⣇⣎⣏⣔⣕⣜⣝⣖⣗⣞⣟⣠⣡⣨⣩⣢⣣⣪⣫⣰⣱⣸⣹⣲⣳⣺⣻⣤⣥⣬⣭⣦⣧⣮⣯⣴⣵⣼⣽⣶⣷⣾⣿"
+    glyph_lut = " 𜺨𜺫🮂𜴀▘𜴁𜴂𜴃𜴄▝𜴅𜴆𜴇𜴈▀𜴉𜴊𜴋𜴌🯦𜴍𜴎𜴏𜴐𜴑𜴒𜴓𜴔𜴕𜴖𜴗𜴘𜴙𜴚𜴛𜴜𜴝𜴞𜴟🯧𜴠𜴡𜴢𜴣𜴤𜴥𜴦𜴧𜴨𜴩𜴪𜴫𜴬𜴭𜴮𜴯𜴰𜴱𜴲𜴳𜴴𜴵🮅𜺣𜴶𜴷𜴸𜴹𜴺𜴻𜴼𜴽𜴾𜴿𜵀𜵁𜵂𜵃𜵄▖𜵅𜵆𜵇𜵈▌𜵉𜵊𜵋𜵌▞𜵍𜵎𜵏𜵐▛𜵑𜵒𜵓𜵔𜵕𜵖𜵗𜵘𜵙𜵚𜵛𜵜𜵝𜵞𜵟𜵠𜵡𜵢𜵣𜵤𜵥𜵦𜵧𜵨𜵩𜵪𜵫𜵬𜵭𜵮𜵯𜵰𜺠𜵱𜵲𜵳𜵴𜵵𜵶𜵷𜵸𜵹𜵺𜵻𜵼𜵽𜵾𜵿𜶀𜶁𜶂𜶃𜶄𜶅𜶆𜶇𜶈𜶉𜶊𜶋𜶌𜶍𜶎𜶏▗𜶐𜶑𜶒𜶓▚𜶔𜶕𜶖𜶗▐𜶘𜶙𜶚𜶛▜𜶜𜶝𜶞𜶟𜶠𜶡𜶢𜶣𜶤𜶥𜶦𜶧𜶨𜶩𜶪𜶫▂𜶬𜶭𜶮𜶯𜶰𜶱𜶲𜶳𜶴𜶵𜶶𜶷𜶸𜶹𜶺𜶻𜶼𜶽𜶾𜶿𜷀𜷁𜷂𜷃𜷄𜷅𜷆𜷇𜷈𜷉𜷊𜷋𜷌𜷍𜷎𜷏𜷐𜷑𜷒𜷓𜷔𜷕𜷖𜷗𜷘𜷙𜷚▄𜷛𜷜𜷝𜷞▙𜷟𜷠𜷡𜷢▟𜷣▆𜷤𜷥█"
+
     def __init__( self, *args, **kwargs ) -> None:
         super().__init__( *args, **kwargs )
         self.y_pixels = kwargs.pop( 'y_pixels', 4 )
@@ -120,17 +364,13 @@ class OctantCellRenderer( CellRenderer ):
         return line
 
     def _render_octantcell(self, *, x: int, y: int, get_pixel: GetPixel) -> Segment:
-        offset, style = self._get_glyph_info(x, y, get_pixel) 
-
-        if self.pips:
-            glyph_lut="⠀⠁⠈⠉⠂⠃⠊⠋⠐⠑⠘⠙⠒⠓⠚⠛⠄⠅⠌⠍⠆⠇⠎⠏⠔⠕⠜⠝⠖⠗⠞⠟⠠⠡⠨⠩⠢⠣⠪⠫⠰⠱⠸⠹⠲⠳⠺⠻⠤⠥⠬⠭⠦⠧⠮⠯⠴⠵⠼⠽⠶⠷⠾⠿⡀⡁⡈⡉⡂⡃⡊⡋⡐⡑⡘⡙⡒⡓⡚⡛⡄⡅⡌⡍⡆⡇⡎⡏⡔⡕⡜⡝⡖⡗⡞⡟⡠⡡⡨⡩⡢⡣⡪⡫⡰⡱⡸⡹⡲⡳⡺⡻⡤⡥⡬⡭⡦⡧⡮⡯⡴⡵⡼⡽⡶⡷⡾⡿⢀⢁⢈⢉⢂⢃⢊⢋⢐⢑⢘⢙⢒⢓⢚⢛⢄⢅⢌⢍⢆⢇⢎⢏⢔⢕⢜⢝⢖⢗⢞⢟⢠⢡⢨⢩⢢⢣⢪⢫⢰⢱⢸⢹⢲⢳⢺⢻⢤⢥⢬⢭⢦⢧⢮⢯⢴⢵⢼⢽⢶⢷⢾⢿⣀⣁⣈⣉⣂⣃⣊⣋⣐⣑⣘⣙⣒⣓⣚⣛⣄⣅⣌⣍⣆⣇⣎⣏⣔⣕⣜⣝⣖⣗⣞⣟⣠⣡⣨⣩⣢⣣⣪⣫⣰⣱⣸⣹⣲⣳⣺⣻⣤⣥⣬⣭⣦⣧⣮⣯⣴⣵⣼⣽⣶⣷⣾⣿"
-        else:
-            glyph_lut=" 𜺨𜺫🮂𜴀▘𜴁𜴂𜴃𜴄▝𜴅𜴆𜴇𜴈▀𜴉𜴊𜴋𜴌🯦𜴍𜴎𜴏𜴐𜴑𜴒𜴓𜴔𜴕𜴖𜴗𜴘𜴙𜴚𜴛𜴜𜴝𜴞𜴟🯧𜴠𜴡𜴢𜴣𜴤𜴥𜴦𜴧𜴨𜴩𜴪𜴫𜴬𜴭𜴮𜴯𜴰𜴱𜴲𜴳𜴴𜴵🮅𜺣𜴶𜴷𜴸𜴹𜴺𜴻𜴼𜴽𜴾𜴿𜵀𜵁𜵂𜵃𜵄▖𜵅𜵆𜵇𜵈▌𜵉𜵊𜵋𜵌▞𜵍𜵎𜵏𜵐▛𜵑𜵒𜵓𜵔𜵕𜵖𜵗𜵘𜵙𜵚𜵛𜵜𜵝𜵞𜵟𜵠𜵡𜵢𜵣𜵤𜵥𜵦𜵧𜵨𜵩𜵪𜵫𜵬𜵭𜵮𜵯𜵰𜺠𜵱𜵲𜵳𜵴𜵵𜵶𜵷𜵸𜵹𜵺𜵻𜵼𜵽𜵾𜵿𜶀𜶁𜶂𜶃𜶄𜶅𜶆𜶇𜶈𜶉𜶊𜶋𜶌𜶍𜶎𜶏▗𜶐𜶑𜶒𜶓▚𜶔𜶕𜶖𜶗▐𜶘𜶙𜶚𜶛▜𜶜𜶝𜶞𜶟𜶠𜶡𜶢𜶣𜶤𜶥𜶦𜶧𜶨𜶩𜶪𜶫▂𜶬𜶭𜶮𜶯𜶰𜶱𜶲𜶳𜶴𜶵𜶶𜶷𜶸𜶹𜶺𜶻𜶼𜶽𜶾𜶿𜷀𜷁𜷂𜷃𜷄𜷅𜷆𜷇𜷈𜷉𜷊𜷋𜷌𜷍𜷎𜷏𜷐𜷑𜷒𜷓𜷔𜷕𜷖𜷗𜷘𜷙𜷚▄𜷛𜷜𜷝𜷞▙𜷟𜷠𜷡𜷢▟𜷣▆𜷤𜷥█"
-                                                                                     
-        return Segment( glyph_lut[offset], style )
+        offset, style = self._get_glyph_info(x, y, get_pixel)
+        return Segment( self.lut[offset], style )
 
 class SextantCellRenderer( CellRenderer ):
     """ Render to Block Sextant in Symbols for Legacy Computing Unicode block """
+    pips_lut = " 𜹑𜹒𜹓𜹔𜹕𜹖𜹗𜹘𜹙𜹚𜹛𜹜𜹝𜹞𜹟𜹠𜹡𜹢𜹣𜹤𜹥𜹦𜹧𜹨𜹩𜹪𜹫𜹬𜹭𜹮𜹯𜹰𜹱𜹲𜹳𜹴𜹵𜹶𜹷𜹸𜹹𜹺𜹻𜹼𜹽𜹾𜹿𜺀𜺁𜺂𜺃𜺄𜺅𜺆𜺇𜺈𜺉𜺊𜺋𜺌𜺍𜺎𜺏"
+    glyph_lut = " 🬀🬁🬂🬃🬄🬅🬆🬇🬈🬉🬊🬋🬌🬍🬎🬏🬐🬑🬒🬓▌🬔🬕🬖🬗🬘🬙🬚🬛🬜🬝🬞🬟🬠🬡🬢🬣🬤🬥🬦🬧▐🬨🬩🬪🬫🬬🬭🬮🬯🬰🬱🬲🬳🬴🬵🬶🬷🬸🬹🬺🬻█"
 
     def __init__( self, *args, **kwargs ) -> None:
         super().__init__( *args, **kwargs )
@@ -145,17 +385,13 @@ class SextantCellRenderer( CellRenderer ):
         return line
 
     def _render_sextantcell(self, *, x: int, y: int, get_pixel: GetPixel) -> Segment:
-        offset, style = self._get_glyph_info(x, y, get_pixel) 
-       
-        if self.pips:
-            glyph_lut = " 𜹑𜹒𜹓𜹔𜹕𜹖𜹗𜹘𜹙𜹚𜹛𜹜𜹝𜹞𜹟𜹠𜹡𜹢𜹣𜹤𜹥𜹦𜹧𜹨𜹩𜹪𜹫𜹬𜹭𜹮𜹯𜹰𜹱𜹲𜹳𜹴𜹵𜹶𜹷𜹸𜹹𜹺𜹻𜹼𜹽𜹾𜹿𜺀𜺁𜺂𜺃𜺄𜺅𜺆𜺇𜺈𜺉𜺊𜺋𜺌𜺍𜺎𜺏"
-        else:
-            glyph_lut = " 🬀🬁🬂🬃🬄🬅🬆🬇🬈🬉🬊🬋🬌🬍🬎🬏🬐🬑🬒🬓▌🬔🬕🬖🬗🬘🬙🬚🬛🬜🬝🬞🬟🬠🬡🬢🬣🬤🬥🬦🬧▐🬨🬩🬪🬫🬬🬭🬮🬯🬰🬱🬲🬳🬴🬵🬶🬷🬸🬹🬺🬻█"
-                                                                                     
-        return Segment( glyph_lut[offset], style )
+        offset, style = self._get_glyph_info(x, y, get_pixel)
+        return Segment( self.lut[offset], style )
 
 class QuadrantCellRenderer( CellRenderer ):
     """ Render to Block Quadtant in Symbols for Legacy Computing Unicode block """
+    pips_lut = " 𜰡𜰢𜰣𜰤𜰥𜰦𜰧𜰨𜰩𜰪𜰫𜰬𜰭𜰮𜰯"
+    glyph_lut = " ▘▝▀▖▌▞▛▗▚▐▜▄▙▟█"
 
     def __init__( self, *args, **kwargs ) -> None:
         super().__init__( *args, **kwargs )
@@ -170,14 +406,109 @@ class QuadrantCellRenderer( CellRenderer ):
         return line
 
     def _render_sextantcell(self, *, x: int, y: int, get_pixel: GetPixel) -> Segment:
-        offset, style = self._get_glyph_info(x, y, get_pixel) 
-       
-        if self.pips:
-            glyph_lut = " 𜰡𜰢𜰣𜰤𜰥𜰦𜰧𜰨𜰩𜰪𜰫𜰬𜰭𜰮𜰯"
+        offset, style = self._get_glyph_info(x, y, get_pixel)
+        return Segment( self.lut[offset], style )
+
+@lru_cache( maxsize=64 )
+def load_font( font_path: str, size: int ) -> ImageFont.FreeTypeFont:
+    """A truetype font, opened once per path and size."""
+    return ImageFont.truetype( font_path, size=size )
+
+class GlyphAtlas:
+    """LRU cache of rasterized characters and their cell segments.
+
+    Bitmaps are keyed by (font path, size, char) and are one font line
+    high (ascent plus descent) and one advance wide, so a phrase is their
+    side by side composition. Cell segments of a bitmap are also keyed by
+    the renderer settings that produced them."""
+
+    def __init__( self, maxsize: int = 4096 ) -> None:
+        self.maxsize = maxsize
+        self._bitmaps: OrderedDict[tuple, np.ndarray] = OrderedDict()
+        self._cells: OrderedDict[tuple, list[list[Segment]]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _get( self, cache: OrderedDict, key: tuple ):
+        value = cache.get( key )
+        if value is None:
+            self.misses += 1
         else:
-            glyph_lut = " ▘▝▀▖▌▞▛▗▚▐▜▄▙▟█"
-                                                                                     
-        return Segment( glyph_lut[offset], style )
+            self.hits += 1
+            cache.move_to_end( key )
+        return value
+
+    def _put( self, cache: OrderedDict, key: tuple, value ) -> None:
+        cache[ key ] = value
+        if len( cache ) > self.maxsize:
+            cache.popitem( last=False )
+
+    def clear( self ) -> None:
+        self._bitmaps.clear()
+        self._cells.clear()
+        self.hits = self.misses = 0
+
+    def bitmap( self, font_path: str, size: int, char: str ) -> np.ndarray:
+        """The line high, advance wide boolean bitmap of char."""
+        key = ( font_path, size, char )
+        bitmap = self._get( self._bitmaps, key )
+        if bitmap is None:
+            font = load_font( font_path, size )
+            ascent, descent = font.getmetrics()
+            advance = round( font.getlength( char ) )
+            if advance > 0:
+                pane = Image.new( '1', (advance, ascent + descent) )
+                ImageDraw.Draw( pane ).text( (0, 0), char, font=font, fill=1 )
+                bitmap = np.asarray( pane, dtype=bool )
+            else:
+                bitmap = np.zeros( (ascent + descent, 0), dtype=bool )
+            self._put( self._bitmaps, key, bitmap )
+        return bitmap
+
+    def phrase( self, font_path: str, size: int, phrase: str ) -> np.ndarray:
+        """Bitmap of phrase composed from cached characters by advance width."""
+        bitmaps = [ self.bitmap( font_path, size, char ) for char in phrase ]
+        if not bitmaps:
+            ascent, descent = load_font( font_path, size ).getmetrics()
+            return np.zeros( (ascent + descent, 0), dtype=bool )
+        return np.hstack( bitmaps )
+
+    def cells( self, font_path: str, size: int, char: str, renderer: CellRenderer ) -> list[list[Segment]]:
+        """The rows of cell segments of char, its bitmap padded to whole cells."""
+        key = ( font_path, size, char, renderer_key( renderer ) )
+        rows = self._get( self._cells, key )
+        if rows is None:
+            bitmap = self.bitmap( font_path, size, char )
+            width = -( -bitmap.shape[1] // renderer.x_pixels ) * renderer.x_pixels
+            rows = split_rows( renderer.render( bitmap_image( bitmap, width, renderer.y_pixels ), None ) ) if width else []
+            self._put( self._cells, key, rows )
+        return rows
+
+def renderer_key( renderer: CellRenderer ) -> tuple:
+    """The settings that decide what segments a renderer gives for a bitmap."""
+    return (
+        type( renderer ), renderer.x_pixels, renderer.y_pixels, renderer.weight,
+        renderer.mono, renderer.pips, getattr( renderer, 'quantize', None )
+        )
+
+def bitmap_image( bitmap: np.ndarray, width: int, y_pixels: int ) -> Image.Image:
+    """An 'L' image of bitmap padded right to width and down to whole cell rows."""
+    height = -( -bitmap.shape[0] // y_pixels ) * y_pixels
+    pane = np.zeros( (height, width), dtype=np.uint8 )
+    pane[ :bitmap.shape[0], :bitmap.shape[1] ] = bitmap * 255
+    return Image.fromarray( pane, 'L' )
+
+def split_rows( segments: list[Segment] ) -> list[list[Segment]]:
+    """Split renderer output at its newline segments into rows."""
+    rows = [[]]
+    for segment in segments:
+        if segment.text == "\n":
+            rows.append( [] )
+        else:
+            rows[-1].append( segment )
+    return rows[:-1] if not rows[-1] else rows
+
+atlas = GlyphAtlas()
 
 class ToPixels( Pixels ):
     """Extend Pixels to enable user specified font based string rendering with some PIL transforms"""
@@ -188,27 +519,172 @@ class ToPixels( Pixels ):
             style: str | Style | None = "default on default",
             renderer: Renderer = OctantCellRenderer(), 
             font_size: int = 11,
-            font_path: str = "./DepartureMono-Regular.woff"
+            font_path: str = "./DepartureMono-Regular.woff",
+            cell_aligned: bool = False,
+            atlas: GlyphAtlas = atlas
             ) -> Pixels:
+        """Render phrase in a font through a cell renderer.
+
+        Character bitmaps come from the glyph atlas and are placed by
+        advance width, then the phrase is rendered as one image. With
+        cell_aligned every character is padded to whole cells and the
+        cached cell segments of each character are joined instead, which
+        skips rendering altogether once the characters have been seen."""
 
         if isinstance( style, str ):
             style = Style.parse( style )
 
-        font = ImageFont.truetype( font_path, size=font_size )
-        l,t,r,b = font.getbbox( phrase )
-        pane = Image.new( '1', (r,b) )
-        mask = [x for x in font.getmask(phrase, mode='1')]
-        print( (r,b) )
-        print( mask )
-        pane.putdata(mask)
-        #pane.show()
-        segments = Pixels._segments_from_image(pane, renderer=renderer )
+        if cell_aligned:
+            rows = [ atlas.cells( font_path, font_size, char, renderer ) for char in phrase ]
+            lines = [ [ segment for char_rows in rows for segment in char_rows[ row ] ] for row in range( max( map( len, rows ), default=0 ) ) ]
+        else:
+            bitmap = atlas.phrase( font_path, font_size, phrase )
+            width = -( -bitmap.shape[1] // renderer.x_pixels ) * renderer.x_pixels
+            lines = split_rows( renderer.render( bitmap_image( bitmap, width, renderer.y_pixels ), None ) ) if width else []
+
         restyle_segments = []
-        for segment in segments:
-            restyle_segments.append( Segment(segment[0], style) )
+        for line in lines:
+            restyle_segments.extend( Segment(segment[0], style) for segment in line )
+            restyle_segments.append( Segment("\n", style) )
 
         return Pixels.from_segments(restyle_segments)
 
+class FrameStats( NamedTuple ):
+    """Cells redrawn and terminal output size of one frame."""
+    cells: int
+    bytes: int
+
+class PlaybackStats( NamedTuple ):
+    """Totals of one FrameRenderer.play run."""
+    frames: int
+    dropped: int
+    seconds: float
+    bytes: int
+
+    @property
+    def fps( self ) -> float:
+        return self.frames / self.seconds if self.seconds else 0.0
+
+    @property
+    def bytes_per_frame( self ) -> float:
+        return self.bytes / self.frames if self.frames else 0.0
+
+def image_frames( image: Image.Image ) -> Iterator[Image.Image]:
+    """The frames of an animated image (GIF, APNG, WebP...), one for a still."""
+    yield from ImageSequence.Iterator( image )
+
+class FrameRenderer:
+    """Renders a frame sequence through a CellRenderer as terminal deltas.
+
+    The source pixels, glyph offsets and colors of every cell of the last
+    frame are kept. A new frame recomputes only the cells whose pixels
+    changed and emits cursor moves plus styled glyphs for just the cells
+    whose glyph or colors changed. With delta off every frame is fully
+    recomputed and redrawn."""
+
+    def __init__(
+            self,
+            renderer: CellRenderer,
+            size: tuple[int, int] | None = None,
+            origin: tuple[int, int] = (0, 0),
+            color_system: ColorSystem | None = ColorSystem.TRUECOLOR,
+            delta: bool = True
+            ) -> None:
+        self.renderer = renderer
+        self.size = size
+        self.origin = origin
+        self.color_system = color_system
+        self.delta = delta
+        self.reset()
+
+    def reset( self ) -> None:
+        """Forget the last frame, so the next one is drawn in full."""
+        self._pixels = None
+        self._offsets = self._fg = self._bg = None
+        self.last = FrameStats( 0, 0 )
+
+    def frame( self, image: Image.Image ) -> str:
+        """The ANSI text that turns the last frame drawn into image."""
+        renderer = self.renderer
+        size = renderer._target_size( image, self.size )
+        rgba_image = image.convert( "RGBA" )
+        if rgba_image.size != size:
+            rgba_image = rgba_image.resize( size, resample=Resampling.NEAREST )
+        cells = renderer._cell_array( np.asarray( rgba_image ) )
+
+        if not self.delta or self._pixels is None or self._pixels.shape != cells.shape:
+            offsets, fg, bg = renderer._cell_info( cells )
+            changed = np.ones( offsets.shape, dtype=bool )
+        else:
+            dirty = ( cells != self._pixels ).any( axis=(-2, -1) )
+            offsets, fg, bg = self._offsets.copy(), self._fg.copy(), self._bg.copy()
+            if dirty.any():
+                offsets[ dirty ], fg[ dirty ], bg[ dirty ] = renderer._cell_info( cells[ dirty ] )
+            changed = dirty & ( ( offsets != self._offsets ) | ( fg != self._fg ) | ( bg != self._bg ) )
+        self._pixels, self._offsets, self._fg, self._bg = cells, offsets, fg, bg
+
+        text = self._emit( changed, offsets, fg, bg )
+        self.last = FrameStats( int( changed.sum() ), len( text.encode( "utf-8" ) ) )
+        return text
+
+    def _emit( self, changed: np.ndarray, offsets: np.ndarray, fg: np.ndarray, bg: np.ndarray ) -> str:
+        """Cursor moves and styled glyphs for every changed cell, with runs
+        of adjacent cells sharing one move and same styled cells one style."""
+        lut = self.renderer.lut
+        top, left = self.origin
+        out = []
+        for y in np.nonzero( changed.any( axis=1 ) )[0].tolist():
+            columns = np.nonzero( changed[ y ] )[0].tolist()
+            line_offsets, line_fg, line_bg = offsets[ y ].tolist(), fg[ y ].tolist(), bg[ y ].tolist()
+            last_x = None
+            run = []
+            run_colors = None
+            for x in columns:
+                colors = ( line_fg[ x ], line_bg[ x ] )
+                if x != last_x or colors != run_colors:
+                    if run:
+                        out.append( cell_style( *run_colors ).render( "".join( run ), color_system=self.color_system ) )
+                        run = []
+                    if x != last_x:
+                        out.append( f"\x1b[{top + y + 1};{left + x + 1}H" )
+                    run_colors = colors
+                run.append( lut[ line_offsets[ x ] ] )
+                last_x = x + 1
+            if run:
+                out.append( cell_style( *run_colors ).render( "".join( run ), color_system=self.color_system ) )
+        return "".join( out )
+
+    def play(
+            self,
+            frames: Iterable[Image.Image],
+            out: IO[str],
+            fps: float = 30.0,
+            drop: bool = True
+            ) -> PlaybackStats:
+        """Draw frames on out at up to fps frames per second.
+
+        Each frame is due one interval after the last; when drop is set a
+        frame that comes up more than an interval late is skipped rather
+        than drawn. An fps of 0 draws frames as fast as they render."""
+        interval = 1.0 / fps if fps else 0.0
+        count = dropped = total = 0
+        start = deadline = time.perf_counter()
+        for image in frames:
+            if interval and drop and time.perf_counter() > deadline + interval:
+                dropped += 1
+                deadline += interval
+                continue
+            out.write( self.frame( image ) )
+            out.flush()
+            count += 1
+            total += self.last.bytes
+            if interval:
+                deadline += interval
+                delay = deadline - time.perf_counter()
+                if delay > 0:
+                    time.sleep( delay )
+        return PlaybackStats( count, dropped, time.perf_counter() - start, total )
+
 #Test Code Playground
 if __name__ == "__main__":
     cons = Console()